@@ -0,0 +1,186 @@
+import json
+import mmap
+import os
+import time
+
+import numpy as np
+
+from forest_engine import contribution_tables
+
+# Compact single-file format for a compiled forest (see forest_engine.py).
+#
+#   8 bytes   magic b'CARDIOFR'
+#   4 bytes   little-endian uint32: length of the JSON header
+#   header    UTF-8 JSON: format version, feature names, classes, scaler
+#             parameters, training metrics, impurity feature importances and
+#             the dtype/shape/offset of every array
+#   arrays    raw little-endian arrays, each starting on a 64-byte boundary
+#
+# Nodes keep the breadth-first layout of compile_forest but are packed:
+# int16 feature ids, float32 thresholds, int32 left children (the right child
+# is always left + 1). Thresholds are rounded *down* to float32; inputs are
+# float32 too, so `x > threshold` decides exactly as the float64 split does.
+# Leaf values are stored either as float32 (`leaf_encoding='float32'`, about
+# 3e-8 off the float64 probabilities) or, by default, as uint16/uint32 codes
+# into a float64 palette of the distinct values, which is exact and usually
+# smaller. Arrays are read with np.frombuffer straight from a memory map;
+# palette codes stay mapped too and are decoded per leaf lookup, so a loaded
+# forest holds no private copy of its node or leaf arrays. The per-node
+# contribution tables (float64 deltas, int16 step features; see
+# forest_engine.contribution_tables) are stored as arrays too, so workers map
+# them instead of each building its own; files written without them still
+# load, and compute the tables at load.
+
+MAGIC = b'CARDIOFR'
+FORMAT_VERSION = 1
+ALIGN = 64
+LEAF_ENCODINGS = ('palette', 'float32')
+
+class CompactFormatError(ValueError):
+    pass
+
+def pack_forest(arrays, leaf_encoding='palette'):
+    # Compact arrays from compile_forest() output
+    if leaf_encoding not in LEAF_ENCODINGS:
+        raise ValueError(f"leaf_encoding must be one of {LEAF_ENCODINGS}")
+    if arrays["n_features"] > np.iinfo(np.int16).max or len(arrays["left"]) > np.iinfo(np.int32).max:
+        raise ValueError("Forest too large for the compact format")
+
+    threshold64 = np.asarray(arrays["threshold"], dtype=np.float64)
+    threshold = threshold64.astype(np.float32)
+    too_high = threshold.astype(np.float64) > threshold64
+    threshold[too_high] = np.nextafter(threshold[too_high], np.float32(-np.inf))
+
+    packed = {
+        "feature": np.asarray(arrays["feature"]).astype(np.int16),
+        "threshold": threshold,
+        "left": np.asarray(arrays["left"]).astype(np.int32),
+        "roots": np.asarray(arrays["roots"]).astype(np.int32),
+    }
+    class_values = arrays["class_values"] if "class_values" in arrays else np.asarray(arrays["value"]).T
+    if leaf_encoding == 'float32':
+        packed["class_values"] = np.ascontiguousarray(class_values, dtype=np.float32)
+    else:
+        palette, codes = np.unique(class_values, return_inverse=True)
+        code_dtype = np.uint16 if len(palette) <= np.iinfo(np.uint16).max + 1 else np.uint32
+        packed["leaf_palette"] = palette.astype(np.float64)
+        packed["leaf_codes"] = codes.reshape(class_values.shape).astype(code_dtype)
+    packed["node_delta"], step_feature, expected_value = contribution_tables(
+        arrays["feature"], arrays["left"], stored_leaf_values(packed)[-1], arrays["roots"], arrays["n_features"])
+    packed["step_feature"] = step_feature.astype(np.int16)
+    return packed, expected_value
+
+def stored_leaf_values(packed):
+    # Leaf values as a loaded forest sees them, so the stored contribution
+    # tables match the ones it would compute
+    if "class_values" in packed:
+        return packed["class_values"].astype(np.float64)
+    return packed["leaf_palette"][packed["leaf_codes"]]
+
+def save_compact_forest(arrays, path, feature_names=None, metrics=None, leaf_encoding='palette',
+                        model_version=None, lineage=None):
+    packed, expected_value = pack_forest(arrays, leaf_encoding)
+    header = {
+        "format": "cardio-forest",
+        "version": FORMAT_VERSION,
+        "model_version": model_version,
+        "created_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "feature_names": list(feature_names) if feature_names is not None else None,
+        "classes": np.asarray(arrays["classes"]).tolist(),
+        "n_features": int(arrays["n_features"]),
+        "n_estimators": len(arrays["roots"]),
+        "n_nodes": len(arrays["left"]),
+        "max_depth": int(arrays["max_depth"]),
+        "leaf_encoding": leaf_encoding,
+        # Mean root value of the last class, the base of the contributions
+        "expected_value": expected_value,
+        "feature_importances": np.asarray(arrays["feature_importances"]).tolist() if "feature_importances" in arrays else None,
+        # JSON floats round-trip float64 exactly
+        "scaler": {
+            "mean": np.asarray(arrays["scaler_mean"]).tolist(),
+            "scale": np.asarray(arrays["scaler_scale"]).tolist(),
+        } if "scaler_mean" in arrays else None,
+        "metrics": metrics or {},
+        # How this model was produced, e.g. the parent version and trees added
+        "lineage": lineage or {},
+        "arrays": {},
+    }
+
+    # Offsets are relative to the start of the data section, so the header can
+    # be written once its own length is known
+    offset = 0
+    for name, array in packed.items():
+        header["arrays"][name] = {"dtype": array.dtype.newbyteorder('<').str, "shape": list(array.shape), "offset": offset}
+        offset += -(-array.nbytes // ALIGN) * ALIGN
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = -(-(len(MAGIC) + 4 + len(header_bytes)) // ALIGN) * ALIGN
+    # Written next to the target and renamed over it, so a server loading the
+    # path sees either the old file or the complete new one
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(header_bytes).to_bytes(4, 'little'))
+        f.write(header_bytes)
+        f.write(b'\0' * (data_start - f.tell()))
+        for name, array in packed.items():
+            f.write(b'\0' * (data_start + header["arrays"][name]["offset"] - f.tell()))
+            f.write(np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<')).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return header
+
+def read_header(buffer):
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise CompactFormatError("Not a compact forest file")
+    header_length = int.from_bytes(bytes(buffer[len(MAGIC):len(MAGIC) + 4]), 'little')
+    header = json.loads(bytes(buffer[len(MAGIC) + 4:len(MAGIC) + 4 + header_length]).decode('utf-8'))
+    if header.get("format") != "cardio-forest" or header.get("version") != FORMAT_VERSION:
+        raise CompactFormatError(f"Unsupported compact forest version {header.get('version')!r}")
+    data_start = -(-(len(MAGIC) + 4 + header_length) // ALIGN) * ALIGN
+    return header, data_start
+
+def load_compact_forest_arrays(path, mmap_mode='r'):
+    # Arrays in the layout FlatForest expects. With mmap_mode='r' the node
+    # arrays are read-only views of the mapped file (no copy); with None the
+    # file is read into memory first.
+    with open(path, 'rb') as f:
+        if mmap_mode is None:
+            buffer = f.read()
+        else:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header, data_start = read_header(buffer)
+
+    def array(name):
+        spec = header["arrays"][name]
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"]))
+        return np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + spec["offset"]).reshape(spec["shape"])
+
+    arrays = {
+        "feature": array("feature"),
+        "threshold": array("threshold"),
+        "left": array("left"),
+        "roots": array("roots"),
+        "max_depth": header["max_depth"],
+        "classes": np.asarray(header["classes"]),
+        "n_features": header["n_features"],
+        "header": header,
+    }
+    if header["leaf_encoding"] == 'palette':
+        # Decoded by FlatForest as palette[codes[leaves]]
+        arrays["leaf_palette"] = array("leaf_palette")
+        arrays["leaf_codes"] = array("leaf_codes")
+    else:
+        arrays["class_values"] = array("class_values")
+    if header.get("feature_importances") is not None:
+        arrays["feature_importances"] = np.asarray(header["feature_importances"], dtype=np.float64)
+    if "node_delta" in header["arrays"]:
+        arrays["node_delta"] = array("node_delta")
+        arrays["step_feature"] = array("step_feature")
+        arrays["expected_value"] = header["expected_value"]
+    if header["scaler"] is not None:
+        arrays["scaler_mean"] = np.asarray(header["scaler"]["mean"], dtype=np.float64)
+        arrays["scaler_scale"] = np.asarray(header["scaler"]["scale"], dtype=np.float64)
+    return arrays
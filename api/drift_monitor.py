@@ -0,0 +1,167 @@
+import hashlib
+import json
+import threading
+
+import numpy as np
+
+# Input drift of live traffic against the training data, in constant memory.
+# At training time every model feature (BMI included) is summarized as a
+# histogram over at most DRIFT_BINS bins: one bin per value for discrete
+# features, training quantiles as edges otherwise. The sketch is stored in the
+# model's metadata sidecar. Scored rows are binned against the same edges
+# and added to a (features x bins) count matrix, so an update costs one
+# vectorized pass over the batch, whatever the traffic so far. Counts cover
+# the most recent window_rows to 2 * window_rows rows: two fixed-size
+# generations that rotate, with nothing stored per request. Scores are
+# computed from the counts on demand: PSI and the largest gap between the
+# binned CDFs (a KS statistic on the bin edges).
+
+DRIFT_BINS = 20
+REFERENCE_VERSION = 1
+DEFAULT_WINDOW_ROWS = 10000
+# Below this many live rows the scores are not meaningful
+MIN_ROWS = 200
+# Usual PSI reading: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 significant
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+# Share given to empty bins so PSI stays finite
+EPSILON = 1e-4
+# Larger batches bin one column at a time instead of broadcasting
+BROADCAST_ROWS = 4096
+
+def feature_edges(values, max_bins=DRIFT_BINS):
+    # Interior bin edges; a value lands in the bin of the edges <= it
+    values = values[np.isfinite(values)]
+    unique = np.unique(values)
+    if len(unique) <= max_bins:
+        return (unique[:-1] + unique[1:]) / 2
+    return np.unique(np.quantile(values, np.linspace(0, 1, max_bins + 1)[1:-1]))
+
+def build_reference(X, feature_names, max_bins=DRIFT_BINS):
+    # Training-time sketch of X (rows x features, unscaled model features)
+    X = np.asarray(X, dtype=np.float64)
+    edges = [feature_edges(X[:, j], max_bins) for j in range(X.shape[1])]
+    counts = DriftReference(edges).bin_counts(X)
+    return {
+        "version": REFERENCE_VERSION,
+        "rows": len(X),
+        "features": [{"name": name, "edges": e.tolist(), "counts": counts[j, :len(e) + 1].tolist()}
+                     for j, (name, e) in enumerate(zip(feature_names, edges))],
+    }
+
+class DriftReference:
+    # Bin edges padded to one (features x bins - 1) matrix, plus the training counts
+    def __init__(self, edges, counts=None, names=None, rows=0, key=None):
+        self.n_edges = np.array([len(e) for e in edges], dtype=np.intp)
+        self.n_bins = int(self.n_edges.max()) + 1
+        self.edges = np.full((len(edges), self.n_bins - 1), np.inf)
+        for j, e in enumerate(edges):
+            self.edges[j, :len(e)] = e
+        self.offsets = np.arange(len(edges), dtype=np.intp) * self.n_bins
+        self.counts = counts
+        self.names = names
+        self.rows = rows
+        self.key = key
+
+    @classmethod
+    def from_sketch(cls, sketch):
+        if sketch.get("version") != REFERENCE_VERSION:
+            raise ValueError(f"Unsupported drift reference version {sketch.get('version')!r}")
+        features = sketch["features"]
+        edges = [np.asarray(f["edges"], dtype=np.float64) for f in features]
+        reference = cls(edges, names=[f["name"] for f in features], rows=sketch["rows"],
+                        key=hashlib.sha256(json.dumps(sketch, sort_keys=True).encode()).hexdigest())
+        reference.counts = np.zeros((len(features), reference.n_bins), dtype=np.int64)
+        for j, f in enumerate(features):
+            reference.counts[j, :len(f["counts"])] = f["counts"]
+        return reference
+
+    def bin_counts(self, X):
+        # (features x bins) counts of the rows of X
+        if len(X) <= BROADCAST_ROWS:
+            bins = (X[:, :, None] >= self.edges).sum(axis=2)
+        else:
+            bins = np.empty(X.shape, dtype=np.intp)
+            for j in range(X.shape[1]):
+                bins[:, j] = np.searchsorted(self.edges[j, :self.n_edges[j]], X[:, j], side='right')
+        # +inf padding compares true for +inf inputs (e.g. BMI at height 0)
+        np.minimum(bins, self.n_edges, out=bins)
+        counts = np.bincount((bins + self.offsets).ravel(), minlength=len(self.offsets) * self.n_bins)
+        return counts.reshape(len(self.offsets), self.n_bins)
+
+def reference_from_metadata(metadata):
+    sketch = (metadata or {}).get("drift_reference")
+    return DriftReference.from_sketch(sketch) if sketch else None
+
+def drift_scores(reference_counts, live_counts, n_bins):
+    # Per-feature PSI and binned KS between two count matrices
+    expected = reference_counts / np.maximum(reference_counts.sum(axis=1, keepdims=True), 1)
+    actual = live_counts / np.maximum(live_counts.sum(axis=1, keepdims=True), 1)
+    valid = np.arange(expected.shape[1]) < n_bins[:, None]
+    expected_smooth = np.where(valid, np.maximum(expected, EPSILON), 1.0)
+    actual_smooth = np.where(valid, np.maximum(actual, EPSILON), 1.0)
+    psi = ((actual_smooth - expected_smooth) * np.log(actual_smooth / expected_smooth)).sum(axis=1)
+    ks = np.abs(np.cumsum(actual, axis=1) - np.cumsum(expected, axis=1)).max(axis=1)
+    return psi, ks
+
+def drift_status(psi):
+    if psi >= PSI_SIGNIFICANT:
+        return "significant"
+    if psi >= PSI_MODERATE:
+        return "moderate"
+    return "stable"
+
+class DriftMonitor:
+    def __init__(self, window_rows=DEFAULT_WINDOW_ROWS):
+        self.window_rows = window_rows
+        self.reference = None
+        self.rows_seen = 0
+        self._current = None
+        self._previous = None
+        self._current_rows = 0
+        self._previous_rows = 0
+        self._lock = threading.Lock()
+
+    def observe(self, reference, X):
+        # Add a scored batch (unscaled feature matrix) to the live counts. A
+        # different reference (a model trained on other data) starts over.
+        counts = reference.bin_counts(X)
+        with self._lock:
+            if self.reference is None or reference.key != self.reference.key:
+                self.reference = reference
+                self.rows_seen = 0
+                self._current = np.zeros_like(counts)
+                self._previous = np.zeros_like(counts)
+                self._current_rows = self._previous_rows = 0
+            self._current += counts
+            self._current_rows += len(X)
+            self.rows_seen += len(X)
+            if self._current_rows >= self.window_rows:
+                self._previous, self._current = self._current, self._previous
+                self._current[:] = 0
+                self._previous_rows, self._current_rows = self._current_rows, 0
+
+    def report(self, reference):
+        # Scores of the current window against `reference`; rows observed
+        # against another reference (before a model swap) do not count
+        with self._lock:
+            if self.reference is None or self.reference.key != reference.key:
+                live = np.zeros_like(reference.counts)
+                window = rows_seen = 0
+            else:
+                live = self._current + self._previous
+                window = self._current_rows + self._previous_rows
+                rows_seen = self.rows_seen
+        psi, ks = drift_scores(reference.counts, live, reference.n_edges + 1)
+        enough = window >= MIN_ROWS
+        features = [{"feature": name, "psi": float(p), "ks": float(k),
+                     "status": drift_status(p) if enough else "insufficient data"}
+                    for name, p, k in zip(reference.names, psi, ks)]
+        return {
+            "reference_rows": reference.rows,
+            "rows_seen": rows_seen,
+            "window_rows": window,
+            "max_psi": float(psi.max()) if enough else None,
+            "status": drift_status(psi.max()) if enough else "insufficient data",
+            "features": features,
+        }
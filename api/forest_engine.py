@@ -0,0 +1,287 @@
+import os
+
+import numpy as np
+
+# A fitted RandomForestClassifier flattened into contiguous node arrays.
+# Every tree is stored back to back; `roots` holds the offset of each tree.
+# Nodes are renumbered breadth first so that the right child of a split
+# always sits directly after its left child: one level of traversal is then
+# `node = left[node] + (x > threshold[node])`. Leaves point to themselves with
+# an infinite threshold, so a batch can be walked for `max_depth` levels
+# without checking which rows have already reached a leaf.
+
+def _breadth_first_order(tree):
+    # New position of every sklearn node id, with sibling pairs kept adjacent
+    order = [0]
+    for node in order:
+        if tree.children_left[node] != -1:
+            order.append(tree.children_left[node])
+            order.append(tree.children_right[node])
+    return np.asarray(order, dtype=np.int64)
+
+def compile_forest(forest, scaler=None):
+    trees = [estimator.tree_ for estimator in forest.estimators_]
+    node_counts = [tree.node_count for tree in trees]
+    roots = np.concatenate([[0], np.cumsum(node_counts)[:-1]]).astype(np.int64)
+
+    features, thresholds, lefts, values = [], [], [], []
+    for root, tree in zip(roots, trees):
+        order = _breadth_first_order(tree)
+        position = np.empty_like(order)
+        position[order] = np.arange(len(order))
+
+        is_leaf = tree.children_left[order] == -1
+        features.append(np.where(is_leaf, 0, tree.feature[order]))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold[order]))
+        lefts.append(np.where(is_leaf, np.arange(len(order)), position[tree.children_left[order]]) + root)
+
+        # Same normalisation as DecisionTreeClassifier.predict_proba
+        value = tree.value[order, 0, :].astype(np.float64)
+        normalizer = value.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        values.append(value / normalizer)
+
+    arrays = {
+        "feature": np.ascontiguousarray(np.concatenate(features), dtype=np.int64),
+        "threshold": np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+        "left": np.ascontiguousarray(np.concatenate(lefts), dtype=np.int64),
+        # Class-major leaf values: each class's row is contiguous, so the
+        # accumulation loop reads it in place, even from a memory-mapped file
+        "class_values": np.ascontiguousarray(np.concatenate(values).T, dtype=np.float64),
+        "roots": roots,
+        "max_depth": int(max(tree.max_depth for tree in trees)),
+        "classes": np.asarray(forest.classes_),
+        "n_features": int(forest.n_features_in_),
+        # Impurity importances need node impurities and weights, which are
+        # not compiled, so they are recorded here for /model-info
+        "feature_importances": np.asarray(forest.feature_importances_, dtype=np.float64),
+    }
+    if scaler is not None:
+        # Shipping the StandardScaler parameters with the forest lets the API
+        # score without importing sklearn at all
+        arrays["scaler_mean"] = np.asarray(scaler.mean_, dtype=np.float64)
+        arrays["scaler_scale"] = np.asarray(scaler.scale_, dtype=np.float64)
+    return arrays
+
+# joblib is imported lazily: it is only needed to read or write artifacts,
+# and importing it costs more than importing numpy
+
+def contribution_tables(feature, left, values, roots, n_features):
+    # Saabas-style attribution: every step from a node to its child moves
+    # the last class's value by child - parent, credited to the feature
+    # the parent split on. Per node: that delta (zero for roots) and the
+    # feature of the split taken *from* it; leaves get the extra column
+    # n_features, a sink for their self-loops that is dropped. `values` are
+    # the last class's node values. Returns (node_delta, step_feature,
+    # expected_value).
+    n_nodes = len(left)
+    nodes = np.arange(n_nodes)
+    is_split = left != nodes
+    parents = np.flatnonzero(is_split)
+    children = np.asarray(left[parents], dtype=np.int64)
+    delta = np.zeros(n_nodes, dtype=np.float64)
+    delta[children] = values[children] - values[parents]
+    delta[children + 1] = values[children + 1] - values[parents]
+    step_feature = np.where(is_split, feature, n_features)
+    return delta, step_feature, float(np.mean(values[roots]))
+
+def dump_atomic(obj, path):
+    # joblib.dump to a file next to the target, then renamed over it. Servers
+    # memory-map the artifacts (CARDIO_MMAP_MODE=r): rewriting a mapped file
+    # in place changes the pages under running workers, which can read
+    # garbage or die with SIGBUS, while a rename leaves them the old inode.
+    import joblib
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+def save_forest(arrays, path):
+    dump_atomic(arrays, path)
+
+def load_forest_arrays(path, mmap_mode=None):
+    import joblib
+    return joblib.load(path, mmap_mode=mmap_mode)
+
+def load_forest(path, mmap_mode=None):
+    return FlatForest(load_forest_arrays(path, mmap_mode))
+
+class FlatScaler:
+    # Same arithmetic as StandardScaler.transform (subtract mean, divide by scale)
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        if "scaler_mean" not in arrays:
+            return None
+        return cls(arrays["scaler_mean"], arrays["scaler_scale"])
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        X -= self.mean_
+        X /= self.scale_
+        return X
+
+class FlatForest:
+    # Rows are walked in chunks so the (n_trees, rows) node matrix stays small
+    CHUNK_CELLS = 1 << 21
+    # Batches up to this many rows sum leaf values with np.cumsum
+    CUMSUM_ROWS = 256
+
+    def __init__(self, arrays):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        if "leaf_codes" in arrays:
+            # Compact palette encoding (see compact_forest.py): per class, a
+            # row of codes into the float64 palette, decoded per lookup
+            leaf_rows = arrays["leaf_codes"]
+            self._palette = arrays["leaf_palette"]
+        elif "class_values" in arrays:
+            leaf_rows = arrays["class_values"]
+            self._palette = None
+        else:
+            # Artifacts compiled before class_values existed
+            leaf_rows = np.ascontiguousarray(arrays["value"].T)
+            self._palette = None
+        self.n_classes = len(leaf_rows)
+        self.roots = arrays["roots"]
+        self.max_depth = int(arrays["max_depth"])
+        self.classes_ = arrays["classes"]
+        self.n_features_in_ = int(arrays["n_features"])
+        self.n_estimators = len(self.roots)
+        # None for artifacts compiled before they were recorded
+        self.feature_importances_ = arrays.get("feature_importances")
+        # One contiguous leaf-value (or code) row per class for the
+        # accumulation loop; views, so worker processes mapping the same
+        # artifact share them
+        self._leaf_rows = list(leaf_rows)
+        # Bytes of the arrays built at load rather than read from the artifact
+        self.private_nbytes = 0
+        self._prepare_contributions(arrays)
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        return cls(compile_forest(forest))
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def apply(self, X):
+        # Leaf index (into the flat arrays) reached by every row in every tree,
+        # shape (n_trees, n_rows)
+        X = self._validate(X)
+        n_rows = X.shape[0]
+        flat_X = X.ravel()
+        row_offsets = np.arange(n_rows, dtype=np.int64) * self.n_features_in_
+
+        node = np.repeat(self.roots[:, np.newaxis], n_rows, axis=1)
+        for _ in range(self.max_depth):
+            go_right = flat_X[row_offsets + self.feature[node]] > self.threshold[node]
+            node = self.left[node] + go_right
+        return node
+
+    def predict_proba(self, X):
+        X = self._validate(X)
+        n_rows = X.shape[0]
+        proba = np.zeros((n_rows, self.n_classes), dtype=np.float64)
+
+        chunk = max(1, self.CHUNK_CELLS // max(1, self.n_estimators))
+        for start in range(0, n_rows, chunk):
+            leaves = self.apply(X[start:start + chunk])
+            proba[start:start + chunk] = self._accumulate_leaves(leaves)
+
+        proba /= self.n_estimators
+        return proba
+
+    def _accumulate_leaves(self, leaves):
+        # Sum of the leaf values over trees, (n_rows, n_classes). Accumulated
+        # tree by tree (same order as sklearn) so the float sums, and
+        # therefore the probabilities, match bit for bit.
+        # All trees' leaves are looked up (and palette codes decoded) in one
+        # pass. Small batches then sum with np.cumsum, which adds along the
+        # tree axis in the same order without a Python loop; large ones add
+        # tree by tree rather than write a second (n_trees, n_rows) matrix.
+        n_rows = leaves.shape[1]
+        out = np.zeros((n_rows, self.n_classes), dtype=np.float64)
+        if len(leaves) == 0:
+            return out
+        for k, leaf_row in enumerate(self._leaf_rows):
+            values = leaf_row[leaves]
+            if self._palette is not None:
+                values = self._palette[values]
+            if n_rows <= self.CUMSUM_ROWS:
+                out[:, k] = np.cumsum(values, axis=0, dtype=np.float64)[-1]
+            else:
+                total = np.zeros(n_rows, dtype=np.float64)
+                for tree_values in values:
+                    total += tree_values
+                out[:, k] = total
+        return out
+
+    def leaf_values(self, k=-1, nodes=None):
+        # Float64 values of class k at `nodes` (all nodes by default)
+        values = self._leaf_rows[k] if nodes is None else self._leaf_rows[k][nodes]
+        return np.asarray(values, dtype=np.float64) if self._palette is None else self._palette[values]
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def _prepare_contributions(self, arrays):
+        # The compact artifact carries the tables (mapped, shared between
+        # workers); other sources compute them here
+        if "node_delta" in arrays:
+            self._node_delta = arrays["node_delta"]
+            self._step_feature = arrays["step_feature"]
+            self.expected_value = float(arrays["expected_value"])
+            return
+        self._node_delta, step_feature, self.expected_value = contribution_tables(
+            self.feature, self.left, self.leaf_values(-1), self.roots, self.n_features_in_)
+        self._step_feature = step_feature.astype(np.int64)
+        self.private_nbytes += self._node_delta.nbytes + self._step_feature.nbytes
+
+    def predict_contributions(self, X):
+        # Probabilities as predict_proba, plus per-feature contributions to the
+        # last class's probability: for every row,
+        # expected_value + contributions.sum() == proba[:, -1] (up to rounding).
+        # One walk gives both, so this costs little more than predict_proba.
+        X = self._validate(X)
+        n_rows = X.shape[0]
+        n_columns = self.n_features_in_ + 1
+        proba = np.zeros((n_rows, self.n_classes), dtype=np.float64)
+        contributions = np.zeros((n_rows, n_columns), dtype=np.float64)
+
+        chunk = max(1, self.CHUNK_CELLS // max(1, self.n_estimators))
+        for start in range(0, n_rows, chunk):
+            X_chunk = X[start:start + chunk]
+            rows = X_chunk.shape[0]
+            flat_X = X_chunk.ravel()
+            row_offsets = np.arange(rows, dtype=np.int64) * self.n_features_in_
+            cell_offsets = np.arange(rows, dtype=np.int64) * n_columns
+            totals = np.zeros(rows * n_columns, dtype=np.float64)
+
+            node = np.repeat(self.roots[:, np.newaxis], rows, axis=1)
+            for _ in range(self.max_depth):
+                go_right = flat_X[row_offsets + self.feature[node]] > self.threshold[node]
+                child = self.left[node] + go_right
+                cells = cell_offsets + self._step_feature[node]
+                totals += np.bincount(cells.ravel(), weights=self._node_delta[child].ravel(), minlength=rows * n_columns)
+                node = child
+
+            contributions[start:start + chunk] = totals.reshape(rows, n_columns)
+            proba[start:start + chunk] = self._accumulate_leaves(node)
+
+        proba /= self.n_estimators
+        contributions /= self.n_estimators
+        return proba, contributions[:, :-1]
+
+    def _validate(self, X):
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected input of shape (n_samples, {self.n_features_in_}), got {X.shape}")
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN or infinity.")
+        return X
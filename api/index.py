@@ -1,11 +1,48 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import joblib
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from pydantic import BaseModel, Field, ValidationError
+from typing import Annotated, List, Optional
 
+import asyncio
+import contextlib
+import functools
+import hmac
+import math
+import operator
 import os
 
-app = FastAPI(title="Cardio Risk API", version="1.0", root_path="/api")
+import numpy as np
+
+from drift_monitor import DEFAULT_WINDOW_ROWS, DriftMonitor
+from metrics import Metrics, MetricsMiddleware
+from micro_batcher import BatcherFull, MicroBatcher
+from model_info import RenderedInfo, info_from_metadata, info_from_model
+from model_registry import ModelLoadError, ModelRegistry, UnknownModelVersion
+from prediction_cache import PredictionCache
+from scoring import FEATURES, FIELD_RANGES, INPUT_FIELDS, build_feature_matrix, build_predictions, build_sweep_matrix, explain_matrix, score_matrix, score_with_forest, warm_up
+from wire_format import (ARROW_CONTENT_TYPE, BINARY_CONTENT_TYPES, CONTENT_TYPE, UnsupportedFormat, WireFormatError,
+                         read_body, validate_columns, write_body)
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # CARDIO_PRELOAD=on (set by serve.py) loads the model when a worker starts
+    # rather than on its first request
+    if os.environ.get('CARDIO_PRELOAD') == 'on':
+        try:
+            await run_in_threadpool(registry.get)
+        except ModelLoadError:
+            pass  # /ready and /predict report it
+    watcher = asyncio.create_task(watch_model(model_watch)) if model_watch > 0 else None
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    batcher.shutdown()
+
+app = FastAPI(title="Cardio Risk API", version="1.0", root_path="/api", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,160 +52,492 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-try:
-    # Use relative path for Vercel deployment
-    base_dir = os.path.dirname(__file__)
-    model_path = os.path.join(base_dir, 'cardio_model_final.pkl')
-    scaler_path = os.path.join(base_dir, 'scaler.pkl')
-    
-    model = joblib.load(model_path)
-    scaler = joblib.load(scaler_path)
-    print("Model and Scaler loaded successfully.")
-except Exception as e:
-    print(f"Error loading model/scaler: {e}")
-    model = None
-    scaler = None
+@app.exception_handler(RequestValidationError)
+async def validation_error(request, exc):
+    # FastAPI's 422 body, except that a rejected NaN or infinity is echoed as
+    # a string: JSON has no literal for it
+    errors = [dict(error, input=str(error["input"]))
+              if isinstance(error.get("input"), float) and not math.isfinite(error["input"]) else error
+              for error in exc.errors()]
+    return JSONResponse(status_code=422, content={"detail": jsonable_encoder(errors)})
+
+# Use relative path for Vercel deployment.
+# Artifacts are loaded on first use (or by calling /ready), not at import time,
+# to keep serverless cold starts fast.
+# Set CARDIO_MMAP_MODE=none to read the compiled forest into memory instead
+# of memory-mapping it.
+# A deployed risk_table.npy is used unless CARDIO_RISK_TABLE=off.
+mmap_mode = os.environ.get('CARDIO_MMAP_MODE', 'r')
+registry = ModelRegistry(
+    os.path.dirname(__file__),
+    mmap_mode=None if mmap_mode == 'none' else mmap_mode,
+    use_risk_table=os.environ.get('CARDIO_RISK_TABLE', 'on') != 'off',
+)
+
+# Repeated what-if submissions from the form are answered from memory.
+# CARDIO_CACHE_SIZE=0 disables the cache.
+prediction_cache = PredictionCache(
+    max_entries=int(os.environ.get('CARDIO_CACHE_SIZE', 4096)),
+    ttl_seconds=float(os.environ.get('CARDIO_CACHE_TTL', 3600)),
+)
+
+# Per-stage request timing for /metrics; CARDIO_METRICS=off turns it off
+metrics = Metrics(enabled=os.environ.get('CARDIO_METRICS', 'on') != 'off')
+
+# New models are swapped in without a restart (see ModelRegistry.reload):
+# POST /admin/reload with the X-Admin-Token header set to CARDIO_ADMIN_TOKEN
+# (the admin endpoints are disabled when it is unset), or
+# CARDIO_MODEL_WATCH=<seconds> to poll the artifacts and reload when a new
+# one is published over them. With serve.py every worker has its own copy of
+# the model reference, so use the watcher there.
+admin_token = os.environ.get('CARDIO_ADMIN_TOKEN', '')
+model_watch = float(os.environ.get('CARDIO_MODEL_WATCH', 0))
+
+async def watch_model(interval):
+    while True:
+        await asyncio.sleep(interval)
+        if registry.changed():
+            try:
+                await run_in_threadpool(registry.reload, None, warm_up)
+            except ModelLoadError:
+                pass  # logged and reported in /health; retried on the next change
+
+# Live inputs are compared with the training data's feature histograms (see
+# drift_monitor.py): every scored /predict and /predict/batch row is added to
+# fixed-size per-feature counts, and /drift reports PSI and KS per feature.
+# CARDIO_DRIFT_WINDOW sets the rows per window; CARDIO_DRIFT=off turns it off.
+drift_enabled = os.environ.get('CARDIO_DRIFT', 'on') != 'off'
+drift = DriftMonitor(window_rows=int(os.environ.get('CARDIO_DRIFT_WINDOW', DEFAULT_WINDOW_ROWS)))
+
+def observe_drift(bundle, X, timer):
+    # Rows scored by a model being swapped out are left out, so they cannot
+    # reset the counts to the old model's reference
+    if drift_enabled and bundle.drift_reference is not None and bundle is registry.get():
+        with timer('drift'):
+            drift.observe(bundle.drift_reference, X)
+
+def get_bundle():
+    try:
+        return registry.get()
+    except ModelLoadError as e:
+        raise HTTPException(status_code=503, detail=f"Model not loaded: {e}")
+
+# Every prediction carries per-feature contributions to its risk probability
+# (Saabas-style, from the same forest walk); CARDIO_CONTRIBUTIONS=off drops
+# them and lets the risk table answer on-grid rows again
+explain = os.environ.get('CARDIO_CONTRIBUTIONS', 'on') != 'off'
+
+def score_for_response(bundle, X, timer):
+    if explain:
+        return explain_matrix(bundle, X, timer)
+    probabilities, predictions = score_matrix(bundle, X, timer)
+    return probabilities, predictions, None
+
+def score_without_contributions(bundle, X, timer):
+    # The path score_for_response takes, minus the contributions, so a sweep's
+    # baseline equals /predict's risk_probability for the same patient
+    if explain:
+        return score_with_forest(bundle, X, timer)
+    return score_matrix(bundle, X, timer)
+
+def score_patients(items):
+    # items: (bundle, request fields) pairs. Rows scored by the same model share
+    # one feature matrix and one forest pass; results come back in item order.
+    timer = functools.partial(metrics.span, '/predict')
+    results = [None] * len(items)
+    groups = {}
+    for i, (bundle, _) in enumerate(items):
+        groups.setdefault(id(bundle), (bundle, []))[1].append(i)
+    for bundle, rows in groups.values():
+        with timer('features'):
+            columns = {field: [items[i][1][field] for i in rows] for field in INPUT_FIELDS}
+            X = build_feature_matrix(columns)
+        probabilities, predictions, contributions = score_for_response(bundle, X, timer)
+        observe_drift(bundle, X, timer)
+        with timer('insights'):
+            for i, result in zip(rows, build_predictions(columns, X, probabilities, predictions,
+                                                         contributions, bundle.forest.expected_value)):
+                result["model_version"] = bundle.version
+                results[i] = result
+    return results
+
+# Concurrent /predict calls are scored together on a worker thread: requests
+# that arrive while a batch is being scored form the next batch (up to
+# CARDIO_BATCH_SIZE rows). CARDIO_BATCH_WAIT_MS additionally holds an idle
+# worker back to collect a batch; 0 (the default) measured best here, since
+# waiting only adds latency when the worker would otherwise be free.
+# Beyond CARDIO_BATCH_QUEUE waiting requests, /predict answers 503.
+# CARDIO_BATCHING=off scores every request on its own.
+batching = os.environ.get('CARDIO_BATCHING', 'on') != 'off'
+batcher = MicroBatcher(
+    score_patients,
+    max_batch_size=int(os.environ.get('CARDIO_BATCH_SIZE', 64)),
+    max_wait=float(os.environ.get('CARDIO_BATCH_WAIT_MS', 0)) / 1000,
+    max_queue=int(os.environ.get('CARDIO_BATCH_QUEUE', 1024)),
+)
+
+def field_range(field, **kwargs):
+    low, high = FIELD_RANGES[field]
+    return Field(ge=low, le=high, **kwargs)
 
 class PatientData(BaseModel):
-    age: int 
-    gender: int 
-    height: int 
-    weight: float 
-    ap_hi: int 
-    ap_lo: int 
-    cholesterol: int 
-    gluc: int 
-    smoke: int 
-    alco: int 
-    active: int 
+    # Checked before a request is queued (see FIELD_RANGES): one bad value
+    # would otherwise fail the whole scoring batch
+    age: int = field_range('age')
+    gender: int = field_range('gender')
+    height: int = field_range('height')
+    weight: float = field_range('weight', allow_inf_nan=False)
+    ap_hi: int = field_range('ap_hi')
+    ap_lo: int = field_range('ap_lo')
+    cholesterol: int = field_range('cholesterol')
+    gluc: int = field_range('gluc')
+    smoke: int = field_range('smoke')
+    alco: int = field_range('alco')
+    active: int = field_range('active')
 
 @app.get("/")
 def home():
     return {"message": "Cardio Risk Prediction API is running."}
 
+class PatientColumns(BaseModel):
+    # Columnar layout: one list per PatientData field, all of equal length,
+    # with the same per-value checks
+    age: List[Annotated[int, field_range('age')]]
+    gender: List[Annotated[int, field_range('gender')]]
+    height: List[Annotated[int, field_range('height')]]
+    weight: List[Annotated[float, field_range('weight', allow_inf_nan=False)]]
+    ap_hi: List[Annotated[int, field_range('ap_hi')]]
+    ap_lo: List[Annotated[int, field_range('ap_lo')]]
+    cholesterol: List[Annotated[int, field_range('cholesterol')]]
+    gluc: List[Annotated[int, field_range('gluc')]]
+    smoke: List[Annotated[int, field_range('smoke')]]
+    alco: List[Annotated[int, field_range('alco')]]
+    active: List[Annotated[int, field_range('active')]]
+
+class PatientBatch(BaseModel):
+    # Either a list of patients or the same data as columns
+    patients: Optional[List[PatientData]] = None
+    columns: Optional[PatientColumns] = None
+
+MAX_BATCH_ROWS = 50000
+
+class SweepAxis(BaseModel):
+    # One varied field: explicit values, or `steps` evenly spaced from start to stop
+    feature: str
+    values: Optional[List[Annotated[float, Field(allow_inf_nan=False)]]] = None
+    start: Optional[Annotated[float, Field(allow_inf_nan=False)]] = None
+    stop: Optional[Annotated[float, Field(allow_inf_nan=False)]] = None
+    steps: int = 50
+
+class SweepRequest(BaseModel):
+    patient: PatientData
+    axes: List[SweepAxis]
+
+MAX_SWEEP_STEPS = 200
+MAX_SWEEP_POINTS = 10000
+
+def sweep_values(axis):
+    if axis.feature not in INPUT_FIELDS:
+        raise HTTPException(status_code=422, detail=f"Unknown feature {axis.feature!r}; expected one of {INPUT_FIELDS}.")
+    # Swept values must stay within the feature's PatientData range; the
+    # endpoints are checked before the grid is generated from them
+    low, high = FIELD_RANGES[axis.feature]
+    given = axis.values if axis.values is not None else [v for v in (axis.start, axis.stop) if v is not None]
+    if any(not low <= value <= high for value in given):
+        raise HTTPException(status_code=422, detail=f"{axis.feature} values must lie in [{low}, {high}].")
+    if axis.values is not None:
+        values = axis.values
+    elif axis.start is not None and axis.stop is not None:
+        if not 2 <= axis.steps <= MAX_SWEEP_STEPS:
+            raise HTTPException(status_code=422, detail=f"steps must be between 2 and {MAX_SWEEP_STEPS}.")
+        step = (axis.stop - axis.start) / (axis.steps - 1)
+        values = [axis.start + i * step for i in range(axis.steps)]
+    else:
+        raise HTTPException(status_code=422, detail=f"Give either values or start and stop for {axis.feature!r}.")
+    if not 1 <= len(values) <= MAX_SWEEP_STEPS:
+        raise HTTPException(status_code=422, detail=f"Each axis takes 1 to {MAX_SWEEP_STEPS} values.")
+    return values
+
+@app.get("/health")
+def health():
+    # Liveness only: never triggers a model load
+    return {"status": "ok", "model": registry.status(), "cache": prediction_cache.stats(), "batching": dict(batcher.stats(), enabled=batching)}
+
+@app.get("/ready")
+def ready():
+    # Loads the serving artifacts if needed, so it doubles as a warm-up hook
+    try:
+        registry.get()
+    except ModelLoadError:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "model": registry.status()})
+    return {"status": "ready", "model": registry.status()}
+
 @app.post("/predict")
-def predict_risk(data: PatientData):
-    if not model or not scaler:
-        raise HTTPException(status_code=500, detail="Model not loaded.")
-    
-    input_data = data.dict()
+async def predict_risk(data: PatientData):
+    metrics.observe_since_request('/predict', 'parse_validate')
+    timer = functools.partial(metrics.span, '/predict')
+    # The first request loads the model; keep that off the event loop
+    bundle = get_bundle() if registry.loaded else await run_in_threadpool(get_bundle)
     
-    # Calculate derived features using standard Python
-    # df['age_years'] = df['age'] 
-    age_years = input_data['age']
+    with timer('to_dict'):
+        input_data = data.dict()
     
-    # df['bmi'] = df['weight'] / ((df['height'] / 100) ** 2)
-    height_m = input_data['height'] / 100
-    bmi = input_data['weight'] / (height_m ** 2)
+    # Canonical key: the request fields in feature order, weight as float
+    with timer('cache_lookup'):
+        cache_key = tuple(float(input_data[field]) if field == 'weight' else input_data[field] for field in INPUT_FIELDS)
+        cached = prediction_cache.get(cache_key, bundle.model_hash)
+    if cached is not None:
+        return cached
     
-    # Feature order MUST match training
-    # features = ['age_years', 'gender', 'height', 'weight', 'ap_hi', 'ap_lo', 
-    #             'cholesterol', 'gluc', 'smoke', 'alco', 'active', 'bmi']
+    # Scored together with whatever other /predict calls are waiting, through
+    # the same feature and scoring path as /predict/batch
+    if batching:
+        try:
+            result = await batcher.submit((bundle, input_data))
+        except BatcherFull:
+            raise HTTPException(status_code=503, detail="Too many pending predictions, retry shortly.",
+                                headers={"Retry-After": "1"})
+    else:
+        result = (await run_in_threadpool(score_patients, [(bundle, input_data)]))[0]
     
-    # Create feature vector (list of values)
-    feature_vector = [
-        age_years,
-        input_data['gender'],
-        input_data['height'],
-        input_data['weight'],
-        input_data['ap_hi'],
-        input_data['ap_lo'],
-        input_data['cholesterol'],
-        input_data['gluc'],
-        input_data['smoke'],
-        input_data['alco'],
-        input_data['active'],
-        bmi
-    ]
+    with timer('cache_store'):
+        prediction_cache.put(cache_key, result, bundle.model_hash)
+    return result
+
+# Binary columnar bodies (see wire_format.py) skip JSON and per-patient
+# pydantic models; they take larger batches, up to CARDIO_BINARY_MAX_ROWS
+MAX_BINARY_BATCH_ROWS = int(os.environ.get('CARDIO_BINARY_MAX_ROWS', 1000000))
+
+@app.post("/predict/batch", openapi_extra={"requestBody": {"content": {
+    "application/json": {"schema": PatientBatch.model_json_schema()},
+    CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}},
+    ARROW_CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}},
+}, "required": True}})
+async def predict_risk_batch(request: Request):
+    # JSON (PatientBatch) or a binary columnar body, chosen by Content-Type;
+    # binary requests get a binary response in the same format
+    content_type = request.headers.get('content-type', 'application/json').split(';')[0].strip().lower()
+    body = await request.body()
+    if content_type in BINARY_CONTENT_TYPES:
+        return await run_in_threadpool(predict_batch_binary, body, content_type)
+    try:
+        batch = PatientBatch.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError([dict(error, loc=("body",) + tuple(error["loc"])) for error in e.errors()])
+    metrics.observe_since_request('/predict/batch', 'parse_validate')
+    return await run_in_threadpool(predict_batch_json, batch)
+
+def predict_batch_json(batch):
+    timer = functools.partial(metrics.span, '/predict/batch')
+    bundle = get_bundle()
     
-    # Reshape for sklearn (1 sample, n features)
-    # X = df[features] -> became DataFrame
-    # We use numpy array or just list of lists
-    X = [feature_vector]
-        
-    X_scaled = scaler.transform(X)
+    if (batch.patients is None) == (batch.columns is None):
+        raise HTTPException(status_code=422, detail="Provide exactly one of 'patients' or 'columns'.")
     
-    prediction = model.predict(X_scaled)[0]
-    probability = model.predict_proba(X_scaled)[0][1] 
+    with timer('to_dict'):
+        if batch.patients is not None:
+            rows = [patient.dict() for patient in batch.patients]
+            columns = {field: [row[field] for row in rows] for field in INPUT_FIELDS}
+        else:
+            columns = batch.columns.dict()
+            lengths = {len(columns[field]) for field in INPUT_FIELDS}
+            if len(lengths) != 1:
+                raise HTTPException(status_code=422, detail="All columns must have the same length.")
     
-    # Generate Personalized Insights (Backend Logic)
-    risk_factors = []
+    n_rows = len(columns['age'])
+    if n_rows > MAX_BATCH_ROWS:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {MAX_BATCH_ROWS} rows).")
+    if not n_rows:
+        return {"count": 0, "model_version": bundle.version, "predictions": []}
     
-    # 1. BMI Analysis
-    if bmi > 30:
-        risk_factors.append({"factor": "BMI", "value": f"{bmi:.1f}", "status": "Obese", "severity": "High"})
-    elif bmi > 25:
-        risk_factors.append({"factor": "BMI", "value": f"{bmi:.1f}", "status": "Overweight", "severity": "Medium"})
-        
-    # 2. Blood Pressure Analysis
-    ap_hi = input_data['ap_hi']
-    ap_lo = input_data['ap_lo']
-    if ap_hi > 140 or ap_lo > 90:
-        risk_factors.append({"factor": "Blood Pressure", "value": f"{ap_hi}/{ap_lo}", "status": "Hypertension", "severity": "High"})
-    elif ap_hi > 120 and ap_lo > 80:
-        risk_factors.append({"factor": "Blood Pressure", "value": f"{ap_hi}/{ap_lo}", "status": "Elevated", "severity": "Low"})
-        
-    # 3. Age Analysis
-    if age_years > 60:
-        risk_factors.append({"factor": "Age", "value": f"{age_years}", "status": "Senior", "severity": "Medium"})
-        
-    # 4. Cholesterol & Glucose (Categorical)
-    chol_map = {1: "Normal", 2: "Above Normal", 3: "High"}
-    gluc_map = {1: "Normal", 2: "Above Normal", 3: "High"}
+    with timer('features'):
+        X = build_feature_matrix(columns)
+    probabilities, predictions, contributions = score_for_response(bundle, X, timer)
+    observe_drift(bundle, X, timer)
     
-    chol = input_data['cholesterol']
-    if chol > 1:
-        risk_factors.append({"factor": "Cholesterol", "value": chol_map.get(chol, "Unknown"), "status": "High Levels", "severity": "High" if chol == 3 else "Medium"})
-
-    gluc = input_data['gluc']
-    if gluc > 1:
-        risk_factors.append({"factor": "Glucose", "value": gluc_map.get(gluc, "Unknown"), "status": "High Levels", "severity": "High" if gluc == 3 else "Medium"})
-        
-    # 5. Lifestyle
-    if input_data['smoke'] == 1:
-        risk_factors.append({"factor": "Smoking", "value": "Yes", "status": "Smoker", "severity": "High"})
-    if input_data['alco'] == 1:
-        risk_factors.append({"factor": "Alcohol", "value": "Yes", "status": "Consumer", "severity": "Medium"})
-    if input_data['active'] == 0:
-        risk_factors.append({"factor": "Activity", "value": "No", "status": "Sedentary", "severity": "High"})
-
+    with timer('insights'):
+        results = build_predictions(columns, X, probabilities, predictions,
+                                    contributions, bundle.forest.expected_value)
     return {
-        "risk_prediction": int(prediction),
-        "risk_probability": float(probability),
-        "message": "High Risk" if prediction == 1 else "Low Risk",
-        "analysis": {
-            "bmi": float(f"{bmi:.1f}"),
-            "risk_factors": risk_factors
-        }
+        "count": n_rows,
+        "model_version": bundle.version,
+        "predictions": results
     }
 
-@app.get("/model-info")
-def get_model_info():
-    if not model:
-        raise HTTPException(status_code=500, detail="Model not loaded.")
+def predict_batch_binary(body, content_type):
+    # Typed columns back: risk_probability (float64), risk_prediction (int8),
+    # bmi (float64) and, with contributions on, contribution_<feature>
+    # (float64) with base_value in the metadata. No insight rules.
+    timer = functools.partial(metrics.span, '/predict/batch')
+    bundle = get_bundle()
+    try:
+        with timer('parse_validate'):
+            _, columns = read_body(body, content_type)
+            n_rows = validate_columns(columns)
+    except UnsupportedFormat as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except WireFormatError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if n_rows > MAX_BINARY_BATCH_ROWS:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {MAX_BINARY_BATCH_ROWS} rows).")
     
-    # Feature names matching the training columns
-    features = ['Age', 'Gender', 'Height', 'Weight', 'AP Hi', 'AP Lo', 
-                'Cholesterol', 'Glucose', 'Smoke', 'Alcohol', 'Active', 'BMI']
+    with timer('features'):
+        X = build_feature_matrix(columns)
+    if n_rows:
+        probabilities, predictions, contributions = score_for_response(bundle, X, timer)
+        observe_drift(bundle, X, timer)
+    else:
+        probabilities, predictions = np.empty(0), np.empty(0, dtype=np.int8)
+        contributions = np.empty((0, len(FEATURES))) if explain else None
     
-    # Get feature importances
-    importances = model.feature_importances_
-    
-    # Create a list of dictionaries for easier frontend consumption
-    feature_importance_list = [
-        {"feature": name, "importance": float(imp)} 
-        for name, imp in zip(features, importances)
-    ]
+    with timer('serialize'):
+        output = {
+            "risk_probability": probabilities,
+            "risk_prediction": predictions.astype(np.int8),
+            "bmi": X[:, 11],
+        }
+        metadata = {"model_version": bundle.version}
+        if contributions is not None:
+            for j, feature in enumerate(FEATURES):
+                output[f"contribution_{feature}"] = contributions[:, j]
+            metadata["base_value"] = bundle.forest.expected_value
+        content = write_body(output, content_type, **metadata)
+    return Response(content=content, media_type=content_type)
+
+@app.post("/predict/sweep")
+def predict_sweep(sweep: SweepRequest):
+    # Risk curve (one axis) or surface (two axes) for one patient, scored as a
+    # single matrix instead of one /predict call per point
+    metrics.observe_since_request('/predict/sweep', 'parse_validate')
+    timer = functools.partial(metrics.span, '/predict/sweep')
+    bundle = get_bundle()
     
-    # Sort by importance descending
-    feature_importance_list.sort(key=lambda x: x['importance'], reverse=True)
+    if not 1 <= len(sweep.axes) <= 2 or len({axis.feature for axis in sweep.axes}) != len(sweep.axes):
+        raise HTTPException(status_code=422, detail="Give one or two axes over different features.")
+    axes = [(axis.feature, sweep_values(axis)) for axis in sweep.axes]
+    shape = [len(values) for _, values in axes]
+    if functools.reduce(operator.mul, shape) > MAX_SWEEP_POINTS:
+        raise HTTPException(status_code=413, detail=f"Sweep too large (max {MAX_SWEEP_POINTS} points).")
     
+    input_data = sweep.patient.dict()
+    with timer('features'):
+        X = build_sweep_matrix(input_data, axes)
+    probabilities, _ = score_without_contributions(bundle, X, timer)
     return {
-        "model_type": "Random Forest Classifier",
-        "accuracy": 0.73, 
-        "feature_importances": feature_importance_list
+        "model_version": bundle.version,
+        "axes": [{"feature": field, "values": values} for field, values in axes],
+        "baseline_probability": float(probabilities[-1]),
+        # Nested as [first axis][second axis] for two axes
+        "risk_probability": probabilities[:-1].reshape(shape).tolist(),
     }
 
+@app.get("/model-info")
+def get_model_info(if_none_match: Optional[str] = Header(None)):
+    try:
+        bundle = registry.get()
+        info = bundle.model_info
+        if info is None:
+            # Built once per model: from the training-time sidecar, or from the
+            # served forest when none is deployed
+            if bundle.metadata is not None:
+                info = RenderedInfo(info_from_metadata(bundle.metadata, bundle.version))
+            else:
+                info = RenderedInfo(info_from_model(bundle.forest, bundle.version, bundle.metrics))
+            bundle.model_info = info
+    except ModelLoadError as e:
+        raise HTTPException(status_code=503, detail=f"Model not loaded: {e}")
+    
+    # Clients revalidate with If-None-Match; the ETag changes with the model
+    headers = {"ETag": info.etag, "Cache-Control": "no-cache"}
+    if info.matches(if_none_match):
+        return Response(status_code=304, headers=headers)
+    return Response(content=info.body, media_type="application/json", headers=headers)
+
+@app.get("/drift")
+def get_drift():
+    # Drift of recent inputs from the serving model's training data: per
+    # feature PSI and KS over the current window of scored rows
+    bundle = get_bundle()
+    if bundle.drift_reference is None:
+        raise HTTPException(status_code=503, detail="No drift reference: the deployed model's metadata sidecar has no "
+                                                    "training sketch (retrain to write one).")
+    if not drift_enabled:
+        raise HTTPException(status_code=503, detail="Drift monitoring is off (CARDIO_DRIFT=off).")
+    return dict(drift.report(bundle.drift_reference), model_version=bundle.version)
+
+def check_admin(token):
+    if not admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if token is None or not hmac.compare_digest(token, admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+
+class ReloadRequest(BaseModel):
+    # A name from /admin/models, or None for the deployed default artifacts
+    version: Optional[str] = None
+
+@app.post("/admin/reload")
+async def reload_model(request: Optional[ReloadRequest] = None, x_admin_token: Optional[str] = Header(None)):
+    check_admin(x_admin_token)
+    version = request.version if request is not None else None
+    # Loading and warm-up run on a worker thread; requests keep being served
+    # by the current model until the swap
+    try:
+        bundle = await run_in_threadpool(registry.reload, version, warm_up)
+    except UnknownModelVersion as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ModelLoadError as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed, model unchanged: {e}")
+    return {"status": "reloaded", "model_version": bundle.version, "model": registry.status()}
+
+@app.get("/admin/models")
+def list_models(x_admin_token: Optional[str] = Header(None)):
+    check_admin(x_admin_token)
+    return {"active": registry.status()["model_version"], "versions": registry.versions()}
+
+@app.get("/metrics")
+def get_metrics():
+    # Prometheus text format: request and stage histograms, plus model and
+    # cache state. Served even with CARDIO_METRICS=off (timings then stay empty).
+    status = registry.status()
+    cache = prediction_cache.stats()
+    load_time = status["load_time_ms"] / 1000 if status["load_time_ms"] is not None else None
+    gauges = [
+        ("cardio_model_loaded", "Whether the serving model is loaded", "gauge", [({}, int(status["loaded"]))]),
+        ("cardio_model_load_seconds", "Time the last model load took", "gauge", [({}, load_time)]),
+        ("cardio_model_info", "Version and hash of the loaded model artifacts", "gauge",
+         [({"model_version": status["model_version"], "model_hash": status["model_hash"]}, 1)] if status["model_hash"] else []),
+        ("cardio_model_reloads_total", "Model reloads", "counter",
+         [({"result": "ok"}, registry.reloads), ({"result": "failed"}, registry.reload_failures)]),
+        ("cardio_artifact_load_seconds", "Load time per artifact", "gauge",
+         [({"artifact": name}, info["load_time_ms"] / 1000) for name, info in status["artifacts"].items()]),
+        ("cardio_artifact_size_bytes", "Size on disk per artifact", "gauge",
+         [({"artifact": name}, info["size_bytes"]) for name, info in status["artifacts"].items()]),
+        ("cardio_cache_entries", "Entries in the /predict cache", "gauge", [({}, cache["entries"])]),
+        ("cardio_cache_max_entries", "Capacity of the /predict cache", "gauge", [({}, cache["max_entries"])]),
+    ]
+    for counter in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        gauges.append((f"cardio_cache_{counter}_total", f"/predict cache {counter}", "counter", [({}, cache[counter])]))
+    batch_stats = batcher.stats()
+    gauges.append(("cardio_batch_queued", "/predict requests waiting for a batch", "gauge", [({}, batch_stats["queued"])]))
+    for counter in ("batches", "rows", "rejected", "errors"):
+        gauges.append((f"cardio_batch_{counter}_total", f"Micro-batcher {counter}", "counter", [({}, batch_stats[counter])]))
+    bundle = registry.get() if registry.loaded else None
+    if drift_enabled and bundle is not None and bundle.drift_reference is not None:
+        report = drift.report(bundle.drift_reference)
+        gauges.append(("cardio_drift_rows", "Scored rows in the drift window", "gauge", [({}, report["window_rows"])]))
+        gauges.append(("cardio_drift_psi", "Population stability index of recent inputs vs training, by feature", "gauge",
+                       [({"feature": f["feature"]}, f["psi"]) for f in report["features"]]))
+        gauges.append(("cardio_drift_ks", "Largest binned CDF gap of recent inputs vs training, by feature", "gauge",
+                       [({"feature": f["feature"]}, f["ks"]) for f in report["features"]]))
+    histograms = [
+        ("cardio_batch_size", "Rows per micro-batch", [({}, batcher.batch_sizes)]),
+        ("cardio_batch_queue_wait_seconds", "Time a /predict request waited for its batch", [({}, batcher.queue_wait)]),
+    ]
+    return PlainTextResponse(metrics.render(gauges, histograms), media_type="text/plain; version=0.0.4")
+
+# Added last, once every route exists, so the middleware knows the valid paths
+app.add_middleware(MetricsMiddleware, metrics=metrics, paths=[route.path for route in app.routes])
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
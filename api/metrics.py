@@ -0,0 +1,189 @@
+import bisect
+import contextlib
+import threading
+import time
+from contextvars import ContextVar
+
+# Hot-path timing for the API, exposed in the Prometheus text format.
+# Stage spans are measured with time.perf_counter (monotonic) and folded into
+# fixed-bucket histograms, so memory does not grow with traffic and recording
+# a span costs a bisect and a few additions under a lock. With metrics
+# disabled, span() returns a shared no-op context manager and the middleware
+# passes requests straight through.
+
+# Upper bounds in seconds, from 25 us to 10 s
+DEFAULT_BUCKETS = (0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+NULL_SPAN = contextlib.nullcontext()
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        # One count per bucket plus the +Inf overflow
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+class Span:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+class Metrics:
+    def __init__(self, enabled=True, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self.in_flight = 0
+        # When the current request entered the app (set by MetricsMiddleware)
+        self.request_start = ContextVar('request_start', default=None)
+        self._stages = {}
+        self._requests = {}
+        self._responses = {}
+        self._lock = threading.Lock()
+
+    def span(self, endpoint, stage):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self._histogram(self._stages, (endpoint, stage)))
+
+    def observe(self, endpoint, stage, seconds):
+        if self.enabled:
+            self._histogram(self._stages, (endpoint, stage)).observe(seconds)
+
+    def observe_since_request(self, endpoint, stage):
+        # Time from the request entering the app up to now: body parsing,
+        # routing and pydantic validation when called first thing in a handler
+        start = self.request_start.get()
+        if self.enabled and start is not None:
+            self.observe(endpoint, stage, time.perf_counter() - start)
+
+    def observe_request(self, path, status, seconds):
+        self._histogram(self._requests, path).observe(seconds)
+        with self._lock:
+            key = (path, status)
+            self._responses[key] = self._responses.get(key, 0) + 1
+
+    def _histogram(self, histograms, key):
+        histogram = histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = histograms.setdefault(key, Histogram(self.buckets))
+        return histogram
+
+    def render(self, gauges=(), histograms=()):
+        # gauges: (name, help, type, [(labels dict, value), ...]) from the caller;
+        # histograms: (name, help, [(labels dict, Histogram), ...])
+        lines = []
+        write_family(lines, 'cardio_metrics_enabled', "Whether request timing is on", 'gauge', [({}, int(self.enabled))])
+        write_family(lines, 'cardio_requests_in_flight', "Requests currently being handled", 'gauge', [({}, self.in_flight)])
+        with self._lock:
+            responses = sorted(self._responses.items())
+            requests = sorted(self._requests.items())
+            stages = sorted(self._stages.items())
+        write_family(lines, 'cardio_requests_total', "Responses by path and status code", 'counter',
+                     [({'path': path, 'status': str(status)}, count) for (path, status), count in responses])
+        write_histograms(lines, 'cardio_request_duration_seconds', "Time from request to response start, by path",
+                         [({'path': path}, histogram) for path, histogram in requests])
+        write_histograms(lines, 'cardio_stage_duration_seconds', "Time spent in each handler stage",
+                         [({'endpoint': endpoint, 'stage': stage}, histogram) for (endpoint, stage), histogram in stages])
+        for name, help_text, samples in histograms:
+            write_histograms(lines, name, help_text, samples)
+        for name, help_text, metric_type, samples in gauges:
+            write_family(lines, name, help_text, metric_type, samples)
+        return "\n".join(lines) + "\n"
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+def format_value(value):
+    if value is None:
+        return "NaN"
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+def write_family(lines, name, help_text, metric_type, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {metric_type}")
+    for labels, value in samples:
+        lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+
+def write_histograms(lines, name, help_text, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, histogram in samples:
+        counts, total, count = histogram.snapshot()
+        cumulative = 0
+        for bound, bucket_count in zip(histogram.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float('inf') else repr(bound)
+            lines.append(f"{name}_bucket{format_labels(dict(labels, le=le))} {cumulative}")
+        lines.append(f"{name}_sum{format_labels(labels)} {total!r}")
+        lines.append(f"{name}_count{format_labels(labels)} {count}")
+
+class MetricsMiddleware:
+    # Plain ASGI middleware (cheaper than BaseHTTPMiddleware): counts in-flight
+    # requests, times each request up to the start of its response and records
+    # the status code. Paths outside `paths` are grouped as "other" so stray
+    # URLs cannot create new series.
+    def __init__(self, app, metrics, paths):
+        self.app = app
+        self.metrics = metrics
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        metrics = self.metrics
+        if scope['type'] != 'http' or not metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        path = scope['path']
+        root_path = scope.get('root_path', '')
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        if path not in self.paths:
+            path = 'other'
+
+        start = time.perf_counter()
+        status = [500]
+        observed = [False]
+
+        async def send_and_time(message):
+            if message['type'] == 'http.response.start' and not observed[0]:
+                status[0] = message['status']
+                observed[0] = True
+                metrics.observe_request(path, status[0], time.perf_counter() - start)
+            await send(message)
+
+        token = metrics.request_start.set(start)
+        metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_and_time)
+        finally:
+            metrics.in_flight -= 1
+            metrics.request_start.reset(token)
+            if not observed[0]:
+                metrics.observe_request(path, status[0], time.perf_counter() - start)
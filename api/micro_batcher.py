@@ -0,0 +1,146 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import Histogram
+
+# Micro-batching for concurrent single-row requests.
+# Callers await submit(item). Items are queued until either `max_batch_size`
+# of them are waiting or the oldest has waited `max_wait` seconds; the batch
+# is then scored by one score_fn(items) call on a dedicated worker thread and
+# every caller's future gets its own result. At most `workers` batches run at
+# once, so while the worker is busy new requests pile up into the next batch:
+# under load batches grow by themselves and the fixed per-call cost of
+# feature assembly and the forest pass is shared by the whole batch.
+# When `max_queue` items are already waiting, submit() raises BatcherFull
+# instead of letting latency grow without bound. If score_fn raises on a
+# batch, its items are scored again one by one, so only the caller whose item
+# fails gets the exception.
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+class BatcherFull(RuntimeError):
+    pass
+
+class MicroBatcher:
+    def __init__(self, score_fn, max_batch_size=64, max_wait=0.002, max_queue=1024, workers=1):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.workers = workers
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        # Time from submit() to the batch being handed to the worker
+        self.queue_wait = Histogram()
+        self.batches = 0
+        self.rows = 0
+        self.rejected = 0
+        self.errors = 0
+        self._executor = None
+        self._loop = None
+        self._pending = deque()
+        self._running = 0
+        self._timer = None
+
+    @property
+    def queued(self):
+        return len(self._pending)
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # A new event loop (e.g. one per TestClient request); nothing can
+            # still be pending on the old one
+            self._loop = loop
+            self._pending.clear()
+            self._running = 0
+            self._timer = None
+        if len(self._pending) >= self.max_queue:
+            self.rejected += 1
+            raise BatcherFull(f"{len(self._pending)} requests already queued")
+        future = loop.create_future()
+        self._pending.append((item, future, loop.time()))
+        self._dispatch()
+        return await future
+
+    def _dispatch(self):
+        # Caller is on the event loop thread
+        loop = self._loop
+        while self._running < self.workers and self._pending:
+            if len(self._pending) < self.max_batch_size:
+                remaining = self._pending[0][2] + self.max_wait - loop.time()
+                if remaining > 0:
+                    if self._timer is None:
+                        self._timer = loop.call_later(remaining, self._on_timer)
+                    return
+            n_rows = min(len(self._pending), self.max_batch_size)
+            batch = [self._pending.popleft() for _ in range(n_rows)]
+            self._running += 1
+            loop.create_task(self._run(batch))
+        if self._timer is not None and not self._pending:
+            self._timer.cancel()
+            self._timer = None
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    async def _run(self, batch):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        for _, _, submitted in batch:
+            self.queue_wait.observe(now - submitted)
+        self.batch_sizes.observe(len(batch))
+        self.batches += 1
+        self.rows += len(batch)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='predict-batch')
+        try:
+            results = await loop.run_in_executor(self._executor, self.score_fn, [item for item, _, _ in batch])
+        except Exception as e:
+            self.errors += 1
+            if len(batch) == 1:
+                if not batch[0][1].done():
+                    batch[0][1].set_exception(e)
+            else:
+                await self._run_each(loop, batch)
+        else:
+            for (_, future, _), result in zip(batch, results):
+                # A caller that went away has a cancelled future
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._running -= 1
+            self._dispatch()
+
+    async def _run_each(self, loop, batch):
+        for item, future, _ in batch:
+            if future.done():
+                continue
+            try:
+                result = (await loop.run_in_executor(self._executor, self.score_fn, [item]))[0]
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_queue": self.max_queue,
+            "workers": self.workers,
+            "queued": self.queued,
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
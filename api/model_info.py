@@ -0,0 +1,82 @@
+import hashlib
+import json
+
+# /model-info body, built once per model and served as-is.
+# The training scripts write a metadata sidecar next to the forest
+# (cardio_model_meta.json, or versions/cardio_forest-<version>.json) holding
+# holdout metrics and impurity and permutation feature importances. It lists
+# the hashes of the artifacts it describes, so a sidecar left over from
+# another model is ignored rather than served. Without one, importances come
+# from the served forest itself (recorded when it was compiled) and accuracy
+# is null unless the compact header has it.
+
+MODEL_META_FILE = 'cardio_model_meta.json'
+META_VERSION = 1
+
+# Display names for the training columns, in feature order
+DISPLAY_NAMES = ['Age', 'Gender', 'Height', 'Weight', 'AP Hi', 'AP Lo',
+                 'Cholesterol', 'Glucose', 'Smoke', 'Alcohol', 'Active', 'BMI']
+
+def importance_list(values, stds=None):
+    # Sorted by importance descending, for easier frontend consumption
+    items = []
+    for i, (name, value) in enumerate(zip(DISPLAY_NAMES, values)):
+        item = {"feature": name, "importance": float(value)}
+        if stds is not None:
+            item["std"] = float(stds[i])
+        items.append(item)
+    items.sort(key=lambda x: x['importance'], reverse=True)
+    return items
+
+def load_metadata(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+    if metadata.get("version") != META_VERSION:
+        raise ValueError(f"Unsupported metadata version {metadata.get('version')!r}")
+    return metadata
+
+def info_from_metadata(metadata, model_version):
+    metrics = metadata["metrics"]
+    info = {
+        "model_type": "Random Forest Classifier",
+        "model_version": model_version,
+        "accuracy": metrics["accuracy"],
+        "metrics": metrics,
+        "feature_importances": importance_list(metadata["feature_importances"]),
+        "permutation_importances": None,
+        "trained_at": metadata.get("trained_at"),
+        "n_train": metadata.get("n_train"),
+        "n_test": metadata.get("n_test"),
+        "params": metadata.get("params"),
+    }
+    permutation = metadata.get("permutation_importances")
+    if permutation is not None:
+        info["permutation_importances"] = importance_list(permutation["mean"], permutation["std"])
+    return info
+
+def info_from_model(forest, model_version, metrics=None):
+    # No sidecar: impurity importances of the served forest (empty for
+    # artifacts compiled before they were recorded), and the holdout accuracy
+    # only if the compact artifact recorded it
+    metrics = metrics or {}
+    importances = forest.feature_importances_
+    return {
+        "model_type": "Random Forest Classifier",
+        "model_version": model_version,
+        "accuracy": metrics.get("accuracy"),
+        "metrics": metrics,
+        "feature_importances": importance_list(importances) if importances is not None else [],
+        "permutation_importances": None,
+    }
+
+class RenderedInfo:
+    # Serialized body and its strong ETag
+    def __init__(self, info):
+        self.body = json.dumps(info).encode('utf-8')
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+
+    def matches(self, if_none_match):
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or self.etag in tags or f'W/{self.etag}' in tags
@@ -0,0 +1,350 @@
+import hashlib
+import mmap
+import os
+import re
+import threading
+import time
+
+from compact_forest import CompactFormatError, load_compact_forest_arrays, read_header
+from drift_monitor import reference_from_metadata
+from forest_engine import FlatForest, FlatScaler, load_forest_arrays
+from model_info import MODEL_META_FILE, load_metadata
+from risk_table import load_table
+
+# Lazy, cached access to the serving artifacts.
+# Nothing is read from disk (and neither joblib nor sklearn is imported) until
+# the first request needs the model, or until /ready is called to warm up.
+# When the compiled forest carries the scaler parameters, predictions never
+# touch sklearn; the pickled RandomForestClassifier is only unpickled for
+# /model-info or to compile a forest when no compiled artifact is deployed.
+#
+# reload() swaps in a new model while the API keeps serving: the new bundle is
+# built and warmed up on the calling thread, then replaces the reference in
+# one assignment. Requests that already hold the old bundle finish on it.
+# Published versions live in versions/ (see data_analysis/incremental_train.py)
+# and can be loaded by name, e.g. to roll back.
+
+MODEL_FILE = 'cardio_model_final.pkl'
+SCALER_FILE = 'scaler.pkl'
+FOREST_FILE = 'cardio_forest.joblib'
+# Packed single-file export (see compact_forest.py); preferred when present
+COMPACT_FOREST_FILE = 'cardio_forest.bin'
+RISK_TABLE_FILE = 'risk_table.npy'
+RISK_TABLE_META_FILE = 'risk_table.json'
+VERSIONS_DIR = 'versions'
+# Published version names (timestamps from incremental_train.py); anything
+# else, e.g. a path, is refused before it reaches the filesystem
+VERSION_PATTERN = re.compile(r'[A-Za-z0-9][A-Za-z0-9._-]*')
+# Files whose change means a different default model (see changed())
+WATCHED_FILES = (COMPACT_FOREST_FILE, FOREST_FILE, MODEL_FILE, SCALER_FILE)
+
+class ModelLoadError(RuntimeError):
+    pass
+
+class UnknownModelVersion(ModelLoadError):
+    pass
+
+class ServingBundle:
+    def __init__(self, forest, scaler, model_hash, risk_table=None, version=None, risk_table_status="absent",
+                 metadata=None, metadata_status="absent", metrics=None, drift_reference=None,
+                 model=None):
+        self.forest = forest
+        self.scaler = scaler
+        # sha256 over the artifact files this bundle was built from
+        self.model_hash = model_hash
+        # Optional precomputed lookup table (see risk_table.py)
+        self.risk_table = risk_table
+        self.risk_table_status = risk_table_status
+        # Published version name, or a prefix of the hash for unversioned files
+        self.version = version or model_hash[:12]
+        # Training-time metrics and importances from the sidecar (see model_info.py)
+        self.metadata = metadata
+        self.metadata_status = metadata_status
+        # Metrics recorded in the compact artifact header, if any
+        self.metrics = metrics or {}
+        # Training-data sketch live inputs are compared with (see drift_monitor.py)
+        self.drift_reference = drift_reference
+        # Rendered /model-info response, built on first use
+        self.model_info = None
+        # The pickled forest, when the bundle was compiled from it
+        self.model = model
+
+def version_path(version, extension='.bin'):
+    if not VERSION_PATTERN.fullmatch(version) or '..' in version:
+        raise UnknownModelVersion(f"Invalid model version {version!r}")
+    return os.path.join(VERSIONS_DIR, f"cardio_forest-{version}{extension}")
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+def hash_files(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+class ModelRegistry:
+    def __init__(self, base_dir, mmap_mode='r', use_risk_table=True):
+        self.base_dir = base_dir
+        # 'r' memory-maps the compiled node arrays instead of copying them
+        self.mmap_mode = mmap_mode
+        self.use_risk_table = use_risk_table
+        self._lock = threading.Lock()
+        # Serializes reloads; requests never wait on it
+        self._reload_lock = threading.Lock()
+        self._bundle = None
+        self._model = None
+        self._error = None
+        self._artifacts = {}
+        self._load_time = None
+        self._signature = None
+        self._last_reload = None
+        self.reloads = 0
+        self.reload_failures = 0
+
+    def path(self, filename):
+        return os.path.join(self.base_dir, filename)
+
+    def get(self):
+        bundle = self._bundle
+        if bundle is not None:
+            return bundle
+        with self._lock:
+            if self._bundle is None:
+                self._load_bundle()
+            return self._bundle
+
+    def get_model(self):
+        model = self._model
+        if model is not None:
+            return model
+        with self._lock:
+            if self._model is None:
+                self._model = self._load_artifact('model', MODEL_FILE, self._joblib_load)
+            return self._model
+
+    @property
+    def loaded(self):
+        return self._bundle is not None
+
+    def status(self):
+        return {
+            "loaded": self.loaded,
+            "load_time_ms": self._load_time,
+            "model_hash": self._bundle.model_hash if self._bundle is not None else None,
+            "model_version": self._bundle.version if self._bundle is not None else None,
+            "mmap_mode": self.mmap_mode,
+            "artifacts": dict(self._artifacts),
+            "risk_table": self._risk_table_info(),
+            "metadata": self._bundle.metadata_status if self._bundle is not None else "absent",
+            "last_reload": self._last_reload,
+            "error": self._error,
+        }
+
+    def _risk_table_info(self):
+        bundle = self._bundle
+        if bundle is None:
+            return {"status": "absent"}
+        if bundle.risk_table is not None:
+            return dict(bundle.risk_table.status(), status="loaded")
+        return {"status": bundle.risk_table_status}
+
+    def _load_bundle(self):
+        start = time.perf_counter()
+        signature = self.signature()
+        artifacts = {}
+        try:
+            bundle = self._build_bundle(None, artifacts)
+        except ModelLoadError as e:
+            self._error = str(e)
+            raise
+        self._bundle = bundle
+        if bundle.model is not None:
+            self._model = bundle.model
+        self._artifacts.update(artifacts)
+        self._signature = signature
+        self._error = None
+        self._load_time = round((time.perf_counter() - start) * 1000, 3)
+        print(f"Model {bundle.version} loaded in {self._load_time} ms.")
+
+    def _build_bundle(self, version, artifacts):
+        # A new bundle from the default artifacts, or from versions/ by name.
+        # Touches no registry state, so the current bundle keeps serving.
+        model = None
+        try:
+            if version is not None:
+                filename = version_path(version)
+                if not os.path.exists(self.path(filename)):
+                    raise UnknownModelVersion(f"Unknown model version {version!r}")
+                arrays = self._load_artifact('forest', filename, self._compact_load, artifacts)
+                forest = FlatForest(arrays)
+                scaler = FlatScaler.from_arrays(arrays)
+                sources = [filename]
+            elif os.path.exists(self.path(COMPACT_FOREST_FILE)):
+                arrays = self._load_artifact('forest', COMPACT_FOREST_FILE, self._compact_load, artifacts)
+                forest = FlatForest(arrays)
+                scaler = FlatScaler.from_arrays(arrays)
+                sources = [COMPACT_FOREST_FILE]
+            elif os.path.exists(self.path(FOREST_FILE)):
+                arrays = self._load_artifact('forest', FOREST_FILE, self._forest_load, artifacts)
+                forest = FlatForest(arrays)
+                scaler = FlatScaler.from_arrays(arrays)
+                sources = [FOREST_FILE]
+            else:
+                # No compiled artifact deployed: compile the pickled forest,
+                # read afresh so a reload never reuses the cached one
+                arrays = {}
+                model = self._load_artifact('model', MODEL_FILE, self._joblib_load, artifacts)
+                forest = FlatForest.from_sklearn(model)
+                scaler = None
+                sources = [MODEL_FILE]
+            if scaler is None:
+                scaler = self._load_artifact('scaler', SCALER_FILE, self._joblib_load, artifacts)
+                sources.append(SCALER_FILE)
+            model_hash = hash_files([self.path(filename) for filename in sources])
+            risk_table, risk_table_status = self._load_risk_table(model_hash, artifacts)
+            meta_file = version_path(version, '.json') if version is not None else MODEL_META_FILE
+            metadata, metadata_status = self._load_metadata(meta_file, model_hash, artifacts)
+            drift_reference = reference_from_metadata(metadata)
+        except ModelLoadError:
+            raise
+        except Exception as e:
+            # e.g. a compiled artifact written by an incompatible version
+            message = f"Error preparing model: {e}"
+            print(message)
+            raise ModelLoadError(message) from e
+        header = arrays.get("header") or {}
+        return ServingBundle(forest, scaler, model_hash, risk_table, header.get("model_version"), risk_table_status,
+                             metadata, metadata_status, header.get("metrics"), drift_reference, model)
+
+    def reload(self, version=None, warmup=None):
+        # Build, warm up and swap in a model; on failure the current one stays.
+        # `warmup(bundle)` scores a sample batch and raises if the result is unusable.
+        with self._reload_lock:
+            start = time.perf_counter()
+            signature = self.signature()
+            artifacts = {}
+            previous = self._bundle
+            try:
+                bundle = self._build_bundle(version, artifacts)
+                if warmup is not None:
+                    warmup(bundle)
+            except Exception as e:
+                self.reload_failures += 1
+                message = str(e) if isinstance(e, ModelLoadError) else f"Warm-up failed: {e}"
+                self._last_reload = {"status": "failed", "requested": version, "error": message,
+                                     "at": time.strftime('%Y-%m-%dT%H:%M:%S')}
+                print(f"Model reload failed, still serving {previous.version if previous else 'nothing'}: {message}")
+                if isinstance(e, ModelLoadError):
+                    raise
+                raise ModelLoadError(message) from e
+            with self._lock:
+                self._bundle = bundle
+                # The pickle the new bundle was compiled from, or None so that
+                # get_model() reads the one now on disk
+                self._model = bundle.model
+                self._artifacts.update(artifacts)
+                if version is None:
+                    self._signature = signature
+                self._error = None
+            self.reloads += 1
+            self._load_time = round((time.perf_counter() - start) * 1000, 3)
+            self._last_reload = {"status": "ok", "requested": version, "previous": previous.version if previous else None,
+                                 "version": bundle.version, "time_ms": self._load_time,
+                                 "at": time.strftime('%Y-%m-%dT%H:%M:%S')}
+            print(f"Model {bundle.version} swapped in after {self._load_time} ms "
+                  f"(was {previous.version if previous else 'not loaded'}).")
+            return bundle
+
+    def signature(self):
+        # Identity of the default artifacts on disk; publishing renames a new
+        # file over one of them, which changes its inode
+        return tuple(file_signature(self.path(filename)) for filename in WATCHED_FILES)
+
+    def changed(self):
+        # Whether the default artifacts differ from the ones last loaded
+        return self._signature is not None and self.signature() != self._signature
+
+    def versions(self):
+        # Published versions, oldest first, with their training metrics
+        directory = self.path(VERSIONS_DIR)
+        if not os.path.isdir(directory):
+            return []
+        current = self._bundle.version if self._bundle is not None else None
+        found = []
+        for name in sorted(os.listdir(directory)):
+            if not (name.startswith('cardio_forest-') and name.endswith('.bin')):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    header, _ = read_header(buffer)
+            except (OSError, ValueError, CompactFormatError):
+                continue
+            version = name[len('cardio_forest-'):-len('.bin')]
+            found.append({
+                "version": version,
+                "created_at": header.get("created_at"),
+                "n_estimators": header.get("n_estimators"),
+                "size_bytes": os.path.getsize(path),
+                "metrics": header.get("metrics"),
+                "lineage": header.get("lineage"),
+                "active": version == current,
+            })
+        return found
+
+    def _load_risk_table(self, model_hash, artifacts):
+        if not self.use_risk_table:
+            return None, "disabled"
+        if not os.path.exists(self.path(RISK_TABLE_FILE)):
+            return None, "absent"
+        table = self._load_artifact('risk_table', RISK_TABLE_FILE, self._table_load, artifacts)
+        if table.model_hash != model_hash:
+            # Built from a different model: serving it would give wrong answers
+            print(f"Ignoring {RISK_TABLE_FILE}: it was built for another model.")
+            return None, "stale (built for another model), ignored"
+        return table, "loaded"
+
+    def _load_metadata(self, filename, model_hash, artifacts):
+        if not os.path.exists(self.path(filename)):
+            return None, "absent"
+        metadata = self._load_artifact('metadata', filename, load_metadata, artifacts)
+        if model_hash not in metadata.get("model_hashes", []):
+            print(f"Ignoring {filename}: it describes another model.")
+            return None, "stale (describes another model), ignored"
+        return metadata, "loaded"
+
+    def _joblib_load(self, path):
+        import joblib
+        return joblib.load(path)
+
+    def _forest_load(self, path):
+        return load_forest_arrays(path, mmap_mode=self.mmap_mode)
+
+    def _compact_load(self, path):
+        return load_compact_forest_arrays(path, mmap_mode=self.mmap_mode)
+
+    def _table_load(self, path):
+        return load_table(path, self.path(RISK_TABLE_META_FILE), mmap_mode=self.mmap_mode)
+
+    def _load_artifact(self, name, filename, loader, artifacts=None):
+        path = self.path(filename)
+        start = time.perf_counter()
+        try:
+            artifact = loader(path)
+        except Exception as e:
+            message = f"Error loading {filename}: {e}"
+            print(message)
+            raise ModelLoadError(message) from e
+        (self._artifacts if artifacts is None else artifacts)[name] = {
+            "path": filename,
+            "size_bytes": os.path.getsize(path),
+            "load_time_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+        return artifact
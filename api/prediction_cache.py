@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+
+# In-process LRU cache for /predict responses, keyed on the canonical input
+# tuple. Entries expire after `ttl_seconds`, the cache never holds more than
+# `max_entries`, and everything is dropped as soon as a request arrives for a
+# model whose artifact hash differs from the one the entries were computed with.
+
+class PredictionCache:
+    def __init__(self, max_entries=4096, ttl_seconds=3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._model_hash = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key, model_hash):
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._check_model(model_hash)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, model_hash):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._check_model(model_hash)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "model_hash": self._model_hash,
+            }
+
+    def _check_model(self, model_hash):
+        # Caller holds the lock
+        if model_hash != self._model_hash:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self._model_hash = model_hash
@@ -0,0 +1,188 @@
+import json
+import string
+
+import numpy as np
+
+# Declarative "Personalized Insights" rules.
+# Each rule reports one factor. Its tiers are checked in order and the first
+# tier whose conditions hold sets the status and severity (an if/elif chain).
+# A tier's conditions are [field, operator, threshold] triples combined with
+# "all" (and) or "any" (or). Fields are request fields plus the derived "bmi".
+# The value shown for a factor is either a format string over the row's
+# fields, a label looked up from a field, or fixed text.
+#
+# The same structure can be loaded from a JSON file (see load_rules), so
+# thresholds and labels can be changed without editing code.
+
+RISK_RULES = [
+    {
+        "factor": "BMI",
+        "value": {"format": "{bmi:.1f}"},
+        "tiers": [
+            {"all": [["bmi", ">", 30]], "status": "Obese", "severity": "High"},
+            {"all": [["bmi", ">", 25]], "status": "Overweight", "severity": "Medium"},
+        ],
+    },
+    {
+        "factor": "Blood Pressure",
+        "value": {"format": "{ap_hi}/{ap_lo}"},
+        "tiers": [
+            {"any": [["ap_hi", ">", 140], ["ap_lo", ">", 90]], "status": "Hypertension", "severity": "High"},
+            {"all": [["ap_hi", ">", 120], ["ap_lo", ">", 80]], "status": "Elevated", "severity": "Low"},
+        ],
+    },
+    {
+        "factor": "Age",
+        "value": {"format": "{age}"},
+        "tiers": [
+            {"all": [["age", ">", 60]], "status": "Senior", "severity": "Medium"},
+        ],
+    },
+    {
+        "factor": "Cholesterol",
+        "value": {"field": "cholesterol", "labels": {"1": "Normal", "2": "Above Normal", "3": "High"}, "default": "Unknown"},
+        "tiers": [
+            {"all": [["cholesterol", "==", 3]], "status": "High Levels", "severity": "High"},
+            {"all": [["cholesterol", ">", 1]], "status": "High Levels", "severity": "Medium"},
+        ],
+    },
+    {
+        "factor": "Glucose",
+        "value": {"field": "gluc", "labels": {"1": "Normal", "2": "Above Normal", "3": "High"}, "default": "Unknown"},
+        "tiers": [
+            {"all": [["gluc", "==", 3]], "status": "High Levels", "severity": "High"},
+            {"all": [["gluc", ">", 1]], "status": "High Levels", "severity": "Medium"},
+        ],
+    },
+    {
+        "factor": "Smoking",
+        "value": {"text": "Yes"},
+        "tiers": [
+            {"all": [["smoke", "==", 1]], "status": "Smoker", "severity": "High"},
+        ],
+    },
+    {
+        "factor": "Alcohol",
+        "value": {"text": "Yes"},
+        "tiers": [
+            {"all": [["alco", "==", 1]], "status": "Consumer", "severity": "Medium"},
+        ],
+    },
+    {
+        "factor": "Activity",
+        "value": {"text": "No"},
+        "tiers": [
+            {"all": [["active", "==", 0]], "status": "Sedentary", "severity": "High"},
+        ],
+    },
+]
+
+OPERATORS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+def load_rules(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def compile_value(spec):
+    # ("text", text) | ("label", field, labels, default) | ("format", positional template, fields)
+    if "text" in spec:
+        return ("text", spec["text"])
+    if "field" in spec:
+        return ("label", spec["field"], spec["labels"], spec.get("default", ""))
+    names = []
+    template = ""
+    for literal, name, format_spec, conversion in string.Formatter().parse(spec["format"]):
+        template += literal.replace("{", "{{").replace("}", "}}")
+        if name is not None:
+            if name not in names:
+                names.append(name)
+            template += "{" + str(names.index(name)) + ("!" + conversion if conversion else "") + (":" + format_spec if format_spec else "") + "}"
+    return ("format", template, names)
+
+class RiskRuleEngine:
+    def __init__(self, rules=RISK_RULES):
+        for rule in rules:
+            for tier in rule["tiers"]:
+                for _, op, _ in tier.get("all", []) + tier.get("any", []):
+                    if op not in OPERATORS:
+                        raise ValueError(f"Unknown operator {op!r} in rule {rule['factor']!r}")
+        self.rules = rules
+        self._compiled = [
+            (
+                rule["factor"],
+                rule["tiers"],
+                [tier["status"] for tier in rule["tiers"]],
+                [tier["severity"] for tier in rule["tiers"]],
+                compile_value(rule["value"]),
+            )
+            for rule in rules
+        ]
+
+    def evaluate(self, columns, bmi):
+        # columns: request field -> array (one entry per row); bmi: array.
+        # Returns one list of risk-factor dicts per row, in rule order.
+        fields = {name: np.asarray(values) for name, values in columns.items()}
+        fields["bmi"] = np.asarray(bmi)
+        n_rows = len(fields["bmi"])
+        results = [[] for _ in range(n_rows)]
+
+        for factor, tiers, statuses, severities, value_spec in self._compiled:
+            tier_of = np.full(n_rows, -1, dtype=np.int64)
+            for k, tier in enumerate(tiers):
+                tier_of[(tier_of < 0) & self._condition(tier, fields, n_rows)] = k
+            fired = np.flatnonzero(tier_of >= 0)
+            if not len(fired):
+                continue
+
+            # Only now drop to Python objects, and only for the rows that fired
+            values = self._values(value_spec, fields, fired)
+            for row, k, value in zip(fired.tolist(), tier_of[fired].tolist(), values):
+                results[row].append({"factor": factor, "value": value, "status": statuses[k], "severity": severities[k]})
+        return results
+
+    def _condition(self, tier, fields, n_rows):
+        if "any" in tier:
+            mask = np.zeros(n_rows, dtype=bool)
+            for name, op, threshold in tier["any"]:
+                mask |= OPERATORS[op](fields[name], threshold)
+            return mask
+        mask = np.ones(n_rows, dtype=bool)
+        for name, op, threshold in tier["all"]:
+            mask &= OPERATORS[op](fields[name], threshold)
+        return mask
+
+    def _values(self, value_spec, fields, rows):
+        kind = value_spec[0]
+        if kind == "text":
+            return [value_spec[1]] * len(rows)
+        if kind == "label":
+            _, field, labels, default = value_spec
+            uniques, inverse = np.unique(fields[field][rows], return_inverse=True)
+            strings = [labels.get(str(v), default) for v in uniques.tolist()]
+        else:
+            # Format each distinct combination of values once. Every field is
+            # de-duplicated on its own (so ints stay ints when formatted) and
+            # the per-field codes are combined into one code per row.
+            _, template, names = value_spec
+            field_uniques = []
+            codes = np.zeros(len(rows), dtype=np.int64)
+            for name in names:
+                uniques, inverse = np.unique(fields[name][rows], return_inverse=True)
+                codes = codes * len(uniques) + inverse
+                field_uniques.append(uniques.tolist())
+            combos, inverse = np.unique(codes, return_inverse=True)
+            strings = []
+            for code in combos.tolist():
+                parts = []
+                for uniques in reversed(field_uniques):
+                    code, i = divmod(code, len(uniques))
+                    parts.append(uniques[i])
+                strings.append(template.format(*reversed(parts)))
+        return [strings[i] for i in inverse.tolist()]
@@ -0,0 +1,167 @@
+import json
+import os
+
+import numpy as np
+
+# Precomputed risk probabilities over a grid of request values.
+# Every model input is a small integer except weight, which is sampled every
+# `weight_step`; each of the 11 request fields becomes one table axis holding
+# the values seen most often in cardio_train.csv. A request is answered by
+# index arithmetic when all of its values are on the grid (a weight exactly
+# on a step, not merely near one), and by the model otherwise.
+
+# Request fields, in the column order of the API feature matrix
+FIELDS = ['age', 'gender', 'height', 'weight', 'ap_hi', 'ap_lo',
+          'cholesterol', 'gluc', 'smoke', 'alco', 'active']
+WEIGHT_COLUMN = FIELDS.index('weight')
+
+# Axes that always keep every value, whatever their frequency
+CATEGORICAL_AXES = {
+    'gender': [1, 2],
+    'cholesterol': [1, 2, 3],
+    'gluc': [1, 2, 3],
+    'smoke': [0, 1],
+    'alco': [0, 1],
+    'active': [0, 1],
+}
+
+def quantize_weight(weight, weight_step):
+    return np.rint(np.asarray(weight, dtype=np.float64) / weight_step).astype(np.int64)
+
+def choose_axes(columns, weight_step, coverage):
+    # Per axis, the most frequent values that together cover `coverage` of rows
+    axes = {}
+    for field in FIELDS:
+        if field in CATEGORICAL_AXES:
+            axes[field] = list(CATEGORICAL_AXES[field])
+            continue
+        values = np.asarray(columns[field])
+        values = quantize_weight(values, weight_step) if field == 'weight' else np.rint(values).astype(np.int64)
+        uniques, counts = np.unique(values, return_counts=True)
+        order = np.argsort(-counts, kind='stable')
+        covered = np.cumsum(counts[order]) / counts.sum()
+        keep = int(np.searchsorted(covered, coverage)) + 1
+        axes[field] = sorted(int(v) for v in uniques[order[:keep]])
+    return axes
+
+def grid_matrix(axes, weight_step, flat_indices):
+    # 12-column feature matrix (including BMI) for the given flat table cells
+    shape = [len(axes[field]) for field in FIELDS]
+    positions = np.unravel_index(flat_indices, shape)
+    X = np.empty((len(flat_indices), len(FIELDS) + 1), dtype=np.float64)
+    for j, field in enumerate(FIELDS):
+        X[:, j] = np.asarray(axes[field], dtype=np.float64)[positions[j]]
+    X[:, WEIGHT_COLUMN] *= weight_step
+    height_m = X[:, 2] / 100
+    X[:, 11] = X[:, WEIGHT_COLUMN] / (height_m ** 2)
+    return X
+
+def build_table(axes, weight_step, forest, scaler, chunk_size=200000, progress=None):
+    shape = tuple(len(axes[field]) for field in FIELDS)
+    table = np.empty(int(np.prod(shape)), dtype=np.float32)
+    for start in range(0, table.size, chunk_size):
+        cells = np.arange(start, min(start + chunk_size, table.size))
+        X = grid_matrix(axes, weight_step, cells)
+        table[cells] = forest.predict_proba(scaler.transform(X))[:, 1]
+        if progress is not None:
+            progress(cells[-1] + 1, table.size)
+    return table.reshape(shape)
+
+def save_table(table, meta, table_path, meta_path):
+    # Renamed into place: the table is memory-mapped by running servers (see
+    # forest_engine.dump_atomic). The metadata goes last, so a reader never
+    # pairs new metadata with the old table.
+    tmp_path = f"{table_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, table)
+    os.replace(tmp_path, table_path)
+    tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, meta_path)
+
+def load_table(table_path, meta_path, mmap_mode='r'):
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    return RiskTable(np.load(table_path, mmap_mode=mmap_mode), meta)
+
+class RiskTable:
+    def __init__(self, table, meta):
+        self.table = table
+        self.meta = meta
+        self.weight_step = float(meta['weight_step'])
+        self.model_hash = meta.get('model_hash')
+        self._flat = table.reshape(-1)
+
+        # Per axis: (feature column, smallest value, value -> position lookup)
+        self._axes = []
+        for column, field in enumerate(FIELDS):
+            values = np.asarray(meta['axes'][field], dtype=np.int64)
+            lut = np.full(values.max() - values.min() + 1, -1, dtype=np.int64)
+            lut[values - values.min()] = np.arange(len(values))
+            self._axes.append((column, int(values.min()), lut))
+        self._strides = np.cumprod((1,) + table.shape[:0:-1])[::-1].astype(np.int64)
+        # Plain-Python copies for the single-row path
+        self._row_axes = [(column, minimum, lut.tolist(), int(stride))
+                          for (column, minimum, lut), stride in zip(self._axes, self._strides)]
+
+    @property
+    def nbytes(self):
+        return int(self.table.nbytes)
+
+    def lookup(self, X):
+        # Probabilities for rows whose values all lie on the grid (NaN elsewhere)
+        # and the mask of those rows
+        n_rows = X.shape[0]
+        if n_rows == 1:
+            # A single /predict row: scalar arithmetic beats NumPy dispatch
+            value = self._lookup_row(X[0].tolist())
+            return np.array([np.nan if value is None else value]), np.array([value is not None])
+
+        flat_index = np.zeros(n_rows, dtype=np.int64)
+        in_grid = np.ones(n_rows, dtype=bool)
+        for (column, minimum, lut), stride in zip(self._axes, self._strides):
+            values = X[:, column]
+            if column == WEIGHT_COLUMN:
+                weights = values
+                values = quantize_weight(weights, self.weight_step)
+                # Same product as grid_matrix, so on-step weights compare equal
+                in_grid &= weights == values.astype(np.float64) * self.weight_step
+            else:
+                in_grid &= values == np.floor(values)
+                values = values.astype(np.int64)
+            offset = values - minimum
+            inside = (offset >= 0) & (offset < len(lut))
+            position = lut[np.where(inside, offset, 0)]
+            in_grid &= inside & (position >= 0)
+            flat_index += position * stride
+
+        proba = np.full(n_rows, np.nan, dtype=np.float64)
+        proba[in_grid] = self._flat[flat_index[in_grid]]
+        return proba, in_grid
+
+    def _lookup_row(self, row):
+        flat_index = 0
+        for column, minimum, lut, stride in self._row_axes:
+            value = row[column]
+            if column == WEIGHT_COLUMN:
+                step = round(value / self.weight_step)
+                if value != step * self.weight_step:
+                    return None
+                value = step
+            elif value != int(value):
+                return None
+            offset = int(value) - minimum
+            if offset < 0 or offset >= len(lut) or lut[offset] < 0:
+                return None
+            flat_index += lut[offset] * stride
+        return float(self._flat[flat_index])
+
+    def status(self):
+        return {
+            "cells": int(self.table.size),
+            "shape": list(self.table.shape),
+            "size_bytes": self.nbytes,
+            "weight_step": self.weight_step,
+            "exactness": self.meta.get('exactness'),
+        }
@@ -0,0 +1,148 @@
+import os
+
+import numpy as np
+
+from metrics import NULL_SPAN
+from risk_rules import RISK_RULES, RiskRuleEngine, load_rules
+
+# Feature assembly, scoring and insight generation shared by the API
+# endpoints and the offline scoring tools. Everything here works on whole
+# batches; a single patient is a batch of one.
+
+# CARDIO_RISK_RULES may point to a JSON rules file replacing the built-in table
+rules_path = os.environ.get('CARDIO_RISK_RULES')
+risk_engine = RiskRuleEngine(load_rules(rules_path) if rules_path else RISK_RULES)
+
+# Raw request fields, in the order they appear in the feature vector
+INPUT_FIELDS = ['age', 'gender', 'height', 'weight', 'ap_hi', 'ap_lo',
+                'cholesterol', 'gluc', 'smoke', 'alco', 'active']
+
+# Accepted range (inclusive) of every request field: plausible values, wider
+# than the cleaned training data. Checked per value by the pydantic models in
+# index.py and vectorized by wire_format.validate_columns, so an out-of-range
+# row is a 422 rather than a scoring failure.
+FIELD_RANGES = {
+    'age': (1, 120), 'gender': (1, 2), 'height': (50, 250), 'weight': (10.0, 300.0),
+    'ap_hi': (40, 300), 'ap_lo': (20, 200), 'cholesterol': (1, 3), 'gluc': (1, 3),
+    'smoke': (0, 1), 'alco': (0, 1), 'active': (0, 1),
+}
+
+# Feature order MUST match training
+FEATURES = ['age_years', 'gender', 'height', 'weight', 'ap_hi', 'ap_lo',
+            'cholesterol', 'gluc', 'smoke', 'alco', 'active', 'bmi']
+
+def build_feature_matrix(columns):
+    # columns: field name -> sequence of values (one entry per patient)
+    n_rows = len(columns['age'])
+    X = np.empty((n_rows, len(FEATURES)), dtype=np.float64)
+    
+    # df['age_years'] = df['age'] (the API already receives age in years)
+    for j, field in enumerate(INPUT_FIELDS):
+        X[:, j] = columns[field]
+    
+    # df['bmi'] = df['weight'] / ((df['height'] / 100) ** 2)
+    height_m = X[:, 2] / 100
+    X[:, 11] = X[:, 3] / (height_m ** 2)
+    return X
+
+def build_sweep_matrix(input_data, axes):
+    # What-if grid for one patient: axes are (field, values) pairs, and every
+    # combination of their values becomes a row (first axis slowest), with
+    # the other fields fixed to the patient's. BMI follows height and weight.
+    # The last row is the unchanged patient, so one pass scores both.
+    grids = np.meshgrid(*[np.asarray(values, dtype=np.float64) for _, values in axes], indexing='ij')
+    n_rows = grids[0].size + 1
+    columns = {field: np.full(n_rows, float(input_data[field])) for field in INPUT_FIELDS}
+    for (field, _), grid in zip(axes, grids):
+        columns[field][:-1] = grid.ravel()
+    return build_feature_matrix(columns)
+
+# Sample batch a model must score before it serves (see ModelRegistry.reload):
+# 64 patients spread over the input ranges, so both classes and many paths of
+# every tree are exercised and the mapped node pages are faulted in
+WARMUP_COLUMNS = {
+    'age': [30 + (7 * i) % 41 for i in range(64)],
+    'gender': [1 + i % 2 for i in range(64)],
+    'height': [150 + (11 * i) % 45 for i in range(64)],
+    'weight': [50.0 + (13 * i) % 70 for i in range(64)],
+    'ap_hi': [100 + (17 * i) % 90 for i in range(64)],
+    'ap_lo': [60 + (9 * i) % 50 for i in range(64)],
+    'cholesterol': [1 + i % 3 for i in range(64)],
+    'gluc': [1 + (i // 3) % 3 for i in range(64)],
+    'smoke': [(i // 2) % 2 for i in range(64)],
+    'alco': [(i // 5) % 2 for i in range(64)],
+    'active': [(i // 4) % 2 for i in range(64)],
+}
+
+def warm_up(bundle):
+    # Raises if the model cannot score the sample batch sensibly
+    probabilities, _ = score_matrix(bundle, build_feature_matrix(WARMUP_COLUMNS))
+    if not np.all((probabilities >= 0) & (probabilities <= 1)):
+        raise ValueError("model returned probabilities outside [0, 1]")
+
+def no_timer(stage):
+    return NULL_SPAN
+
+def score_matrix(bundle, X, timer=no_timer):
+    # One scale call and one forest pass for the whole batch. The flat forest
+    # reproduces RandomForestClassifier.predict_proba bit for bit, and the
+    # label is derived the same way RandomForestClassifier.predict does it.
+    # Rows covered by the precomputed risk table (if deployed) skip the forest.
+    # timer(stage) returns a context manager timing that stage (see metrics.py).
+    classes = bundle.forest.classes_
+    if bundle.risk_table is not None:
+        with timer('risk_table'):
+            probability, in_grid = bundle.risk_table.lookup(X)
+            labels = classes.take((probability > 0.5).astype(np.int64))
+        rest = np.flatnonzero(~in_grid)
+        if len(rest):
+            probability[rest], labels[rest] = score_with_forest(bundle, X[rest], timer)
+        return probability, labels
+    return score_with_forest(bundle, X, timer)
+
+def score_with_forest(bundle, X, timer=no_timer):
+    with timer('scale'):
+        X_scaled = bundle.scaler.transform(X)
+    with timer('predict_proba'):
+        proba = bundle.forest.predict_proba(X_scaled)
+        labels = bundle.forest.classes_.take(np.argmax(proba, axis=1))
+    return proba[:, 1], labels
+
+def explain_matrix(bundle, X, timer=no_timer):
+    # score_with_forest plus per-feature contributions to the risk probability
+    # (see FlatForest.predict_contributions), from the same forest walk. The
+    # risk table stores no paths, so explained rows always use the forest.
+    with timer('scale'):
+        X_scaled = bundle.scaler.transform(X)
+    with timer('predict_contributions'):
+        proba, contributions = bundle.forest.predict_contributions(X_scaled)
+        labels = bundle.forest.classes_.take(np.argmax(proba, axis=1))
+    return proba[:, 1], labels, contributions
+
+def build_risk_factors(input_data, bmi):
+    # Personalized Insights for a single patient (see risk_rules.py)
+    columns = {field: [input_data[field]] for field in INPUT_FIELDS}
+    return risk_engine.evaluate(columns, [bmi])[0]
+
+def build_predictions(columns, X, probabilities, predictions, contributions=None, base_value=None):
+    # Response bodies for a scored batch; the insight rules run once over the
+    # whole batch rather than once per patient
+    bmis = X[:, 11]
+    risk_factors = risk_engine.evaluate(columns, bmis)
+    results = [
+        {
+            "risk_prediction": int(prediction),
+            "risk_probability": float(probability),
+            "message": "High Risk" if prediction == 1 else "Low Risk",
+            "analysis": {
+                "bmi": float(f"{bmi:.1f}"),
+                "risk_factors": factors
+            }
+        }
+        for bmi, probability, prediction, factors in zip(bmis.tolist(), probabilities.tolist(), predictions.tolist(), risk_factors)
+    ]
+    if contributions is not None:
+        # base_value + sum of the contributions == risk_probability
+        for result, row in zip(results, contributions.tolist()):
+            result["contributions"] = {"base_value": base_value, "features": dict(zip(FEATURES, row))}
+    return results
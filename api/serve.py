@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+
+import uvicorn
+
+from model_info import MODEL_META_FILE
+from model_registry import COMPACT_FOREST_FILE, FOREST_FILE, MODEL_FILE, RISK_TABLE_META_FILE, SCALER_FILE, hash_files
+
+# Multi-process serving for machines with several cores.
+# The compiled forest is memory-mapped read-only (CARDIO_MMAP_MODE=r), so
+# every worker maps the same pages of cardio_forest.bin from the OS page
+# cache instead of unpickling its own copy: N workers cost about the model
+# RAM of one. The file carries the contribution tables too, so workers build
+# no per-node arrays of their own. The parent prepares the artifact once,
+# compiling it from the pickled forest if it is not deployed, and every
+# worker loads it at startup (CARDIO_PRELOAD=on) so no request pays for the
+# load.
+#
+#   python serve.py --workers 4 --port 8000
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def prepare_artifacts(base_dir):
+    # Without a compiled forest every worker would unpickle and compile the
+    # sklearn model into private memory; do it once here instead. A deployed
+    # cardio_forest.joblib is used as is (its workers compute the
+    # contribution tables privately).
+    compact_path = os.path.join(base_dir, COMPACT_FOREST_FILE)
+    if os.path.exists(compact_path) or os.path.exists(os.path.join(base_dir, FOREST_FILE)):
+        return
+    import joblib
+    from compact_forest import save_compact_forest
+    from forest_engine import compile_forest
+    from scoring import FEATURES
+    print(f"{COMPACT_FOREST_FILE} not found, compiling it from {MODEL_FILE}...")
+    pickle_paths = [os.path.join(base_dir, MODEL_FILE), os.path.join(base_dir, SCALER_FILE)]
+    forest = joblib.load(pickle_paths[0])
+    scaler = joblib.load(pickle_paths[1])
+    save_compact_forest(compile_forest(forest, scaler), compact_path, feature_names=FEATURES)
+    adopt_compiled(base_dir, hash_files(pickle_paths), hash_files([compact_path]))
+
+def rewrite_json(path, update):
+    with open(path, 'r', encoding='utf-8') as f:
+        document = json.load(f)
+    update(document)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    os.replace(tmp_path, path)
+
+def adopt_compiled(base_dir, pickle_hash, compact_hash):
+    # The registry keys the sidecar and the risk table on the hash of the
+    # artifact it serves, which is now the freshly compiled file. It scores
+    # exactly as the pickle it came from, so whatever described the pickle
+    # describes it too; anything describing another model would be dropped,
+    # which is worth a warning here rather than a line in every worker's log.
+    meta_path = os.path.join(base_dir, MODEL_META_FILE)
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            hashes = json.load(f).get("model_hashes", [])
+        if pickle_hash in hashes:
+            rewrite_json(meta_path, lambda metadata: metadata["model_hashes"].append(compact_hash))
+            print(f"Added {COMPACT_FOREST_FILE} to the models {MODEL_META_FILE} describes.")
+        else:
+            print(f"Warning: {MODEL_META_FILE} describes another model; /model-info falls back to the forest "
+                  f"and drift monitoring is off.")
+    table_meta_path = os.path.join(base_dir, RISK_TABLE_META_FILE)
+    if os.path.exists(table_meta_path):
+        with open(table_meta_path, 'r', encoding='utf-8') as f:
+            table_hash = json.load(f).get("model_hash")
+        if table_hash == pickle_hash:
+            rewrite_json(table_meta_path, lambda meta: meta.update(model_hash=compact_hash))
+            print(f"Keyed the risk table on {COMPACT_FOREST_FILE}.")
+        else:
+            print("Warning: the risk table was built for another model and will be ignored.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Cardio Risk API with several worker processes.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--log-level', default='info')
+    args = parser.parse_args()
+
+    prepare_artifacts(API_DIR)
+    # Inherited by the workers
+    os.environ.setdefault('CARDIO_MMAP_MODE', 'r')
+    os.environ['CARDIO_PRELOAD'] = 'on'
+    if os.environ['CARDIO_MMAP_MODE'] == 'none':
+        print("CARDIO_MMAP_MODE=none: every worker holds its own copy of the model.")
+
+    uvicorn.run('index:app', host=args.host, port=args.port, workers=args.workers,
+                app_dir=API_DIR, log_level=args.log_level)
+
+if __name__ == "__main__":
+    main()
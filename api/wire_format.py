@@ -0,0 +1,170 @@
+import json
+
+import numpy as np
+
+from scoring import FIELD_RANGES, INPUT_FIELDS
+
+# Binary columnar bodies for /predict/batch, chosen by Content-Type.
+#
+# application/x-cardio-columns, a packed NumPy layout in the style of the
+# compact forest file (see compact_forest.py):
+#
+#   8 bytes   magic b'CARDIOCB'
+#   4 bytes   little-endian uint32: length of the JSON header
+#   header    UTF-8 JSON: {"format": "cardio-columns", "version": 1,
+#             "rows": n, "columns": {name: {"dtype": "<f8", "offset": o}},
+#             ...}; extra keys carry response metadata such as model_version
+#   columns   one 1-D array of `rows` values per column, at `offset` bytes
+#             from the data section, which starts at the first 64-byte
+#             boundary after the header
+#
+# Requests carry the 11 PatientData fields as any integer or float dtype;
+# columns are wrapped with np.frombuffer, without copying, and checked with a
+# few vectorized comparisons instead of one pydantic model per patient.
+#
+# application/vnd.apache.arrow.stream, an Arrow IPC stream with one column per
+# field, is accepted too when pyarrow is installed (it is not an API
+# dependency). Responses use the request's format.
+
+MAGIC = b'CARDIOCB'
+FORMAT_VERSION = 1
+ALIGN = 64
+CONTENT_TYPE = 'application/x-cardio-columns'
+ARROW_CONTENT_TYPE = 'application/vnd.apache.arrow.stream'
+BINARY_CONTENT_TYPES = (CONTENT_TYPE, ARROW_CONTENT_TYPE)
+# PatientData fields declared as int; weight is the only float
+INTEGER_FIELDS = [field for field in INPUT_FIELDS if field != 'weight']
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
+class WireFormatError(ValueError):
+    pass
+
+class UnsupportedFormat(WireFormatError):
+    pass
+
+def pack_columns(columns, **header_fields):
+    # columns: name -> 1-D array, all of the same length
+    arrays = {name: np.ascontiguousarray(values) for name, values in columns.items()}
+    lengths = {len(array) for array in arrays.values()}
+    if len(lengths) > 1:
+        raise WireFormatError("All columns must have the same length.")
+    header = dict(header_fields, format="cardio-columns", version=FORMAT_VERSION,
+                  rows=lengths.pop() if lengths else 0, columns={})
+    offset = 0
+    for name, array in arrays.items():
+        array = array.astype(array.dtype.newbyteorder('<'), copy=False)
+        arrays[name] = array
+        header["columns"][name] = {"dtype": array.dtype.str, "offset": offset}
+        offset += -(-array.nbytes // ALIGN) * ALIGN
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = -(-(len(MAGIC) + 4 + len(header_bytes)) // ALIGN) * ALIGN
+    body = np.zeros(data_start + offset, dtype=np.uint8)
+    prefix = MAGIC + len(header_bytes).to_bytes(4, 'little') + header_bytes
+    body[:len(prefix)] = np.frombuffer(prefix, dtype=np.uint8)
+    for name, array in arrays.items():
+        start = data_start + header["columns"][name]["offset"]
+        body[start:start + array.nbytes] = array.view(np.uint8)
+    return body.tobytes()
+
+def unpack_columns(body):
+    # (header, name -> read-only array viewing `body`)
+    if len(body) < len(MAGIC) + 4 or bytes(body[:len(MAGIC)]) != MAGIC:
+        raise WireFormatError("Not a cardio-columns body.")
+    header_length = int.from_bytes(bytes(body[len(MAGIC):len(MAGIC) + 4]), 'little')
+    try:
+        header = json.loads(bytes(body[len(MAGIC) + 4:len(MAGIC) + 4 + header_length]).decode('utf-8'))
+    except ValueError as e:
+        raise WireFormatError(f"Unreadable header: {e}") from e
+    if header.get("format") != "cardio-columns" or header.get("version") != FORMAT_VERSION:
+        raise WireFormatError(f"Unsupported cardio-columns version {header.get('version')!r}")
+    data_start = -(-(len(MAGIC) + 4 + header_length) // ALIGN) * ALIGN
+    rows = header.get("rows")
+    if not isinstance(rows, int) or rows < 0:
+        raise WireFormatError("Header 'rows' must be a non-negative integer.")
+    columns = {}
+    for name, spec in header.get("columns", {}).items():
+        try:
+            dtype = np.dtype(spec["dtype"])
+            offset = data_start + int(spec["offset"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise WireFormatError(f"Bad column spec for {name!r}: {e}") from e
+        if dtype.kind not in 'biuf':
+            raise WireFormatError(f"Column {name!r} has unsupported dtype {dtype.str}.")
+        if offset < data_start or offset + rows * dtype.itemsize > len(body):
+            raise WireFormatError(f"Column {name!r} lies outside the body.")
+        columns[name] = np.frombuffer(body, dtype=dtype, count=rows, offset=offset)
+    return header, columns
+
+def read_arrow(body):
+    if pyarrow is None:
+        raise UnsupportedFormat("Arrow bodies need pyarrow on the server; use application/x-cardio-columns.")
+    try:
+        table = pyarrow.ipc.open_stream(body).read_all()
+    except pyarrow.ArrowException as e:
+        raise WireFormatError(f"Unreadable Arrow stream: {e}") from e
+    columns = {}
+    for name in table.column_names:
+        column = table.column(name)
+        if column.null_count:
+            raise WireFormatError(f"Column {name!r} has nulls.")
+        if not (pyarrow.types.is_integer(column.type) or pyarrow.types.is_floating(column.type)
+                or pyarrow.types.is_boolean(column.type)):
+            raise WireFormatError(f"Column {name!r} has unsupported type {column.type}.")
+        # Zero-copy for a single chunk of a fixed-width type
+        columns[name] = column.chunk(0).to_numpy(zero_copy_only=False) if column.num_chunks == 1 else column.to_numpy()
+    return {"rows": table.num_rows}, columns
+
+def write_arrow(columns, **metadata):
+    if pyarrow is None:
+        raise UnsupportedFormat("Arrow responses need pyarrow on the server.")
+    table = pyarrow.table({name: pyarrow.array(values) for name, values in columns.items()},
+                          metadata={key: json.dumps(value) for key, value in metadata.items()})
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def read_body(body, content_type):
+    if content_type == ARROW_CONTENT_TYPE:
+        return read_arrow(body)
+    return unpack_columns(body)
+
+def write_body(columns, content_type, **metadata):
+    if content_type == ARROW_CONTENT_TYPE:
+        return write_arrow(columns, **metadata)
+    return pack_columns(columns, **metadata)
+
+def validate_columns(columns):
+    # Vectorized equivalent of the PatientData checks: every field present,
+    # finite, integer-valued where the field is an int, and within its
+    # FIELD_RANGES bounds. Returns the row count.
+    missing = [field for field in INPUT_FIELDS if field not in columns]
+    if missing:
+        raise WireFormatError(f"Missing columns: {missing}")
+    errors = []
+    for field in INPUT_FIELDS:
+        values = columns[field]
+        low, high = FIELD_RANGES[field]
+        # Integer bounds compare exactly against any integer dtype, uint64
+        # included; non-finite floats are reported once, not as out of range
+        bad = (values < low) | (values > high)
+        if values.dtype.kind == 'f':
+            finite = np.isfinite(values)
+            bad &= finite
+            invalid = ~finite
+            if field in INTEGER_FIELDS:
+                invalid |= values != np.round(values)
+            if invalid.any():
+                errors.append(f"{field}: {int(invalid.sum())} rows not {'integers' if field in INTEGER_FIELDS else 'finite'} "
+                              f"(first at row {int(np.argmax(invalid))})")
+        if bad.any():
+            errors.append(f"{field}: {int(bad.sum())} rows outside [{low}, {high}] (first at row {int(np.argmax(bad))})")
+    if errors:
+        raise WireFormatError("Invalid values: " + "; ".join(errors))
+    return len(columns['age'])
@@ -0,0 +1,257 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api')
+sys.path.insert(0, API_DIR)
+
+from dataset_cache import DATA_PATH, load_dataset
+
+# Latency and throughput benchmarks for the prediction API.
+# The FastAPI app is driven in-process through httpx's ASGI transport (the
+# transport FastAPI's TestClient is built on, used asynchronously so requests
+# can overlap) and/or through a local uvicorn server over HTTP. Each endpoint
+# is hit at several concurrency levels; the scoring stages behind /predict are
+# also timed on their own. Results can be saved as a baseline and later runs
+# compared against it; the script exits non-zero when a gated metric is worse
+# than the baseline by more than --threshold.
+#
+#   python benchmark_api.py --save-baseline        # after an accepted change
+#   python benchmark_api.py --check                # gate a model or code change
+
+BASELINE_PATH = 'benchmark_baseline.json'
+CONCURRENCY = [1, 4, 16]
+N_PATIENTS = 2000
+
+# Gated metrics and whether larger values are better. p99 is reported but not
+# gated: on a shared machine it is too noisy to fail a build on.
+GATED = {'p50_ms': False, 'p95_ms': False, 'rps': True, 'median_us': False}
+# Changes smaller than this (in the metric's unit) are noise, whatever the ratio
+NOISE_FLOOR = {'p50_ms': 0.5, 'p95_ms': 1.0, 'rps': 0.0, 'median_us': 50.0}
+
+def sample_patients(n, seed=0):
+    # Realistic request bodies: cleaned training rows in the API's units
+    df = load_dataset(DATA_PATH)
+    rows = df.sample(n=min(n, len(df)), random_state=seed)
+    patients = []
+    for row in rows.itertuples(index=False):
+        patients.append({
+            'age': int(round(row.age_years)), 'gender': int(row.gender), 'height': int(row.height),
+            'weight': float(row.weight), 'ap_hi': int(row.ap_hi), 'ap_lo': int(row.ap_lo),
+            'cholesterol': int(row.cholesterol), 'gluc': int(row.gluc), 'smoke': int(row.smoke),
+            'alco': int(row.alco), 'active': int(row.active),
+        })
+    return patients
+
+def summarize(latencies, elapsed):
+    latencies = np.asarray(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+        'rps': round(len(latencies) / elapsed, 1),
+    }
+
+async def drive(client, method, path, bodies, n_requests, concurrency):
+    # `concurrency` workers issue requests back to back until n_requests are done
+    latencies = []
+    counter = iter(range(n_requests))
+
+    async def worker():
+        for i in counter:
+            body = bodies[i % len(bodies)] if bodies else None
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise RuntimeError(f"{method} {path} returned {response.status_code}: {response.text[:200]}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start)
+
+async def run_endpoints(client, label, patients, args):
+    results = {}
+    # 50x50 weight x ap_hi what-if surfaces around the first patients
+    sweeps = [{'patient': patient, 'axes': [{'feature': 'weight', 'start': 50, 'stop': 130, 'steps': 50},
+                                            {'feature': 'ap_hi', 'start': 100, 'stop': 180, 'steps': 50}]}
+              for patient in patients[:20]]
+    endpoints = [('POST', '/predict', patients, args.requests), ('GET', '/model-info', None, args.requests // 2),
+                 ('POST', '/predict/sweep', sweeps, max(args.requests // 20, 5))]
+    for method, path, bodies, n_requests in endpoints:
+        # Warm-up: loads the artifacts and fills any lazy state
+        await drive(client, method, path, bodies, 20, 1)
+        for concurrency in args.concurrency:
+            name = f"{label} {path} c={concurrency}"
+            results[name] = await drive(client, method, path, bodies, n_requests, concurrency)
+            print_result(name, results[name])
+    return results
+
+async def bench_inprocess(patients, args):
+    import index
+    transport = httpx.ASGITransport(app=index.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+        return await run_endpoints(client, 'inprocess', patients, args), index.registry.status()
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+async def bench_uvicorn(patients, args):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'index:app', '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+        cwd=API_DIR, env=dict(os.environ),
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', timeout=30) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    if (await client.get('/ready')).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("uvicorn did not become ready")
+                await asyncio.sleep(0.2)
+            return await run_endpoints(client, 'uvicorn', patients, args)
+    finally:
+        server.terminate()
+        server.wait()
+
+def time_stage(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings = np.asarray(timings) * 1e6
+    return {'median_us': round(float(np.median(timings)), 2), 'p95_us': round(float(np.percentile(timings, 95)), 2)}
+
+def bench_stages(patients, args):
+    # The stages behind /predict, without HTTP or validation
+    import index
+    from scoring import INPUT_FIELDS, build_feature_matrix, build_predictions, score_with_forest
+    bundle = index.registry.get()
+    results = {}
+    for batch_size in (1, 1000):
+        rows = patients[:batch_size]
+        columns = {field: [row[field] for row in rows] for field in INPUT_FIELDS}
+        X = build_feature_matrix(columns)
+        X_scaled = bundle.scaler.transform(X)
+        probabilities, predictions = score_with_forest(bundle, X)
+        repeats = args.repeats if batch_size == 1 else max(args.repeats // 20, 5)
+        stages = {
+            'feature_assembly': lambda: build_feature_matrix(columns),
+            'scaling': lambda: bundle.scaler.transform(X),
+            'predict_proba': lambda: bundle.forest.predict_proba(X_scaled),
+            'predict_contributions': lambda: bundle.forest.predict_contributions(X_scaled),
+            'insights': lambda: build_predictions(columns, X, probabilities, predictions),
+        }
+        for stage, fn in stages.items():
+            name = f"stage {stage} n={batch_size}"
+            results[name] = time_stage(fn, repeats)
+            print(f"{name:<40} {results[name]['median_us']:>10.1f} us median {results[name]['p95_us']:>10.1f} us p95")
+    return results
+
+def print_result(name, result):
+    print(f"{name:<40} p50 {result['p50_ms']:>8.3f} ms  p95 {result['p95_ms']:>8.3f} ms  "
+          f"p99 {result['p99_ms']:>8.3f} ms  {result['rps']:>8.1f} req/s")
+
+def environment(model_status):
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'model_hash': model_status.get('model_hash'),
+        'risk_table': model_status.get('risk_table', {}).get('status'),
+    }
+
+def compare(results, baseline, threshold):
+    # Returns the list of (metric, baseline, current, change) that regressed
+    regressions = []
+    print(f"\n--- Against baseline (threshold {threshold:.0%}) ---")
+    for name, metrics in results.items():
+        reference = baseline['results'].get(name)
+        if reference is None:
+            continue
+        for metric, higher_is_better in GATED.items():
+            if metric not in metrics or metric not in reference or not reference[metric]:
+                continue
+            change = metrics[metric] / reference[metric] - 1
+            worse = -change if higher_is_better else change
+            noise = abs(metrics[metric] - reference[metric]) <= NOISE_FLOOR[metric]
+            flag = 'REGRESSION' if worse > threshold and not noise else ''
+            print(f"{name:<40} {metric:<10} {reference[metric]:>10} -> {metrics[metric]:>10} ({change:+.1%}) {flag}")
+            if flag:
+                regressions.append((name, metric, reference[metric], metrics[metric], change))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the prediction API and compare with a baseline.")
+    parser.add_argument('--mode', choices=['inprocess', 'uvicorn', 'both'], default='inprocess')
+    parser.add_argument('--concurrency', type=lambda s: [int(c) for c in s.split(',')], default=CONCURRENCY)
+    parser.add_argument('--requests', type=int, default=500,
+                        help="Requests per /predict run (half for /model-info, a twentieth for /predict/sweep)")
+    parser.add_argument('--repeats', type=int, default=2000, help="Repeats per single-row stage timing")
+    parser.add_argument('--cache', action='store_true', help="Keep the /predict response cache on (off by default)")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true', help="Exit with status 1 if a gated metric regressed")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed relative slowdown, e.g. 0.25 = 25%%")
+    parser.add_argument('--output', help="Also write this run's results to a JSON file")
+    args = parser.parse_args()
+
+    if not args.cache:
+        # Measure the model, not dictionary lookups; applies to the uvicorn child too
+        os.environ['CARDIO_CACHE_SIZE'] = '0'
+
+    patients = sample_patients(N_PATIENTS)
+    results = {}
+    model_status = {}
+    if args.mode in ('inprocess', 'both'):
+        endpoint_results, model_status = asyncio.run(bench_inprocess(patients, args))
+        results.update(endpoint_results)
+    if args.mode in ('uvicorn', 'both'):
+        results.update(asyncio.run(bench_uvicorn(patients, args)))
+    print()
+    results.update(bench_stages(patients, args))
+
+    import index
+    run = {'environment': environment(model_status or index.registry.status()), 'results': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(run, f, indent=2)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline['environment'] != run['environment']:
+            print(f"\nNote: baseline recorded on a different environment or model: {json.dumps(baseline['environment'])}")
+        regressions = compare(results, baseline, args.threshold)
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(run, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+
+    if args.check and regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
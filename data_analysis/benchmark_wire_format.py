@@ -0,0 +1,145 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+import numpy as np
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api')
+sys.path.insert(0, API_DIR)
+
+from dataset_cache import DATA_PATH, load_dataset
+from wire_format import ARROW_CONTENT_TYPE, CONTENT_TYPE, pack_columns, pyarrow, unpack_columns
+
+# JSON against the binary columnar formats on /predict/batch (see
+# api/wire_format.py), end to end: client encoding, the request through the
+# FastAPI app in-process (httpx ASGI transport, as in benchmark_api.py) and
+# client decoding. JSON requests are capped at the endpoint's MAX_BATCH_ROWS
+# (50,000), so larger JSON batches are sent as consecutive requests of that
+# size, as a JSON client has to; binary batches go in one request. Rows are
+# the cleaned training rows tiled to the requested size.
+#
+#   python benchmark_wire_format.py --rows 1000,100000,1000000
+#   python benchmark_wire_format.py --contributions off --formats json,packed
+
+ROWS = [1000, 100000, 1000000]
+FORMATS = ['json', 'packed', 'arrow']
+
+def dataset_columns():
+    df = load_dataset(DATA_PATH)
+    return {
+        'age': np.floor(df['age_years'].to_numpy()).astype(np.int32), 'gender': df['gender'].to_numpy(np.int8),
+        'height': df['height'].to_numpy(np.int16), 'weight': df['weight'].to_numpy(np.float64),
+        'ap_hi': df['ap_hi'].to_numpy(np.int16), 'ap_lo': df['ap_lo'].to_numpy(np.int16),
+        'cholesterol': df['cholesterol'].to_numpy(np.int8), 'gluc': df['gluc'].to_numpy(np.int8),
+        'smoke': df['smoke'].to_numpy(np.int8), 'alco': df['alco'].to_numpy(np.int8), 'active': df['active'].to_numpy(np.int8),
+    }
+
+def patient_columns(source, n_rows):
+    return {name: np.resize(values, n_rows) for name, values in source.items()}
+
+def arrow_body(columns):
+    table = pyarrow.table(columns)
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+async def run_json(client, columns, max_rows):
+    n_rows = len(columns['age'])
+    timings = {'encode_s': 0.0, 'request_s': 0.0, 'decode_s': 0.0, 'sent_bytes': 0, 'received_bytes': 0}
+    probabilities = []
+    for start in range(0, n_rows, max_rows):
+        t0 = time.perf_counter()
+        body = json.dumps({'columns': {name: values[start:start + max_rows].tolist() for name, values in columns.items()}}).encode()
+        t1 = time.perf_counter()
+        response = await client.post('/predict/batch', content=body, headers={'content-type': 'application/json'})
+        t2 = time.perf_counter()
+        response.raise_for_status()
+        predictions = response.json()['predictions']
+        probabilities.append(np.fromiter((p['risk_probability'] for p in predictions), dtype=np.float64, count=len(predictions)))
+        t3 = time.perf_counter()
+        timings['encode_s'] += t1 - t0
+        timings['request_s'] += t2 - t1
+        timings['decode_s'] += t3 - t2
+        timings['sent_bytes'] += len(body)
+        timings['received_bytes'] += len(response.content)
+        del predictions, response
+    return timings, np.concatenate(probabilities)
+
+async def run_binary(client, columns, content_type):
+    t0 = time.perf_counter()
+    body = pack_columns(columns) if content_type == CONTENT_TYPE else arrow_body(columns)
+    t1 = time.perf_counter()
+    response = await client.post('/predict/batch', content=body, headers={'content-type': content_type})
+    t2 = time.perf_counter()
+    response.raise_for_status()
+    if content_type == CONTENT_TYPE:
+        _, output = unpack_columns(response.content)
+        probabilities = output['risk_probability']
+    else:
+        probabilities = pyarrow.ipc.open_stream(response.content).read_all()['risk_probability'].to_numpy()
+    t3 = time.perf_counter()
+    return {'encode_s': t1 - t0, 'request_s': t2 - t1, 'decode_s': t3 - t2,
+            'sent_bytes': len(body), 'received_bytes': len(response.content)}, probabilities
+
+async def bench(args):
+    import index
+    transport = httpx.ASGITransport(app=index.app)
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url='http://benchmark', timeout=None) as client:
+        source = dataset_columns()
+        warm = patient_columns(source, 100)
+        await run_json(client, warm, index.MAX_BATCH_ROWS)
+        for contributions in args.contributions:
+            index.explain = contributions
+            for n_rows in args.rows:
+                columns = patient_columns(source, n_rows)
+                reference = None
+                for name in args.formats:
+                    if name == 'json':
+                        timings, probabilities = await run_json(client, columns, index.MAX_BATCH_ROWS)
+                    else:
+                        timings, probabilities = await run_binary(client, columns, CONTENT_TYPE if name == 'packed' else ARROW_CONTENT_TYPE)
+                    if reference is None:
+                        reference = probabilities
+                    total = timings['encode_s'] + timings['request_s'] + timings['decode_s']
+                    result = dict(timings, format=name, rows=n_rows, contributions=contributions, total_s=total,
+                                  rows_per_s=n_rows / total, same_probabilities=bool(np.array_equal(probabilities, reference)))
+                    results.append(result)
+                    print_result(result)
+    return results
+
+def print_result(r):
+    print(f"{r['format']:<7} {r['rows']:>9,} {'on' if r['contributions'] else 'off':>5} {r['encode_s']:>9.3f} {r['request_s']:>9.3f} "
+          f"{r['decode_s']:>9.3f} {r['total_s']:>9.3f} {r['rows_per_s']:>12,.0f} {r['sent_bytes'] / 1e6:>8.1f} "
+          f"{r['received_bytes'] / 1e6:>9.1f} {'yes' if r['same_probabilities'] else 'NO':>5}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JSON and binary columnar /predict/batch bodies.")
+    parser.add_argument('--rows', type=lambda s: [int(n) for n in s.split(',')], default=ROWS)
+    parser.add_argument('--formats', type=lambda s: s.split(','), default=FORMATS, help=f"Subset of {FORMATS}")
+    parser.add_argument('--contributions', choices=['on', 'off', 'both'], default='both',
+                        help="Score with per-feature contributions (the API default), without, or both")
+    parser.add_argument('--output', help="Also write the results to a JSON file")
+    args = parser.parse_args()
+    args.contributions = {'on': [True], 'off': [False], 'both': [True, False]}[args.contributions]
+    if pyarrow is None and 'arrow' in args.formats:
+        print("pyarrow is not installed, skipping the Arrow format.")
+        args.formats = [name for name in args.formats if name != 'arrow']
+    # Measure the formats, not the drift monitor or the response cache
+    os.environ['CARDIO_CACHE_SIZE'] = '0'
+    os.environ['CARDIO_DRIFT'] = 'off'
+
+    print(f"{'format':<7} {'rows':>9} {'expl':>5} {'encode s':>9} {'request s':>9} {'decode s':>9} {'total s':>9} "
+          f"{'rows/s':>12} {'sent MB':>8} {'recv MB':>9} {'same':>5}")
+    results = asyncio.run(bench(args))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
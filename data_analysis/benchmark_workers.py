@@ -0,0 +1,157 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+
+from benchmark_api import API_DIR, free_port, sample_patients, summarize
+
+# Memory and throughput of api/serve.py as the number of workers grows.
+# For every worker count (and model loading mode) a server is started, loaded
+# from several client processes, and then every worker's memory is read from
+# /proc: RSS, PSS (resident memory with shared pages divided among the
+# processes sharing them) and the resident pages of the model artifact itself.
+# Linux only.
+#
+#   python benchmark_workers.py --max-workers 4
+
+# Either model artifact the registry can map
+FOREST_FILES = ('cardio_forest.bin', 'cardio_forest.joblib')
+
+def children(pid):
+    found = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            with open(f'/proc/{entry}/cmdline', 'rb') as f:
+                cmdline = f.read()
+        except (FileNotFoundError, ProcessLookupError, IndexError):
+            continue
+        if ppid == pid and b'resource_tracker' not in cmdline:
+            found.append(int(entry))
+    return found
+
+def memory(pid):
+    # KiB totals over all mappings, plus those of the model artifact
+    totals = {'rss': 0, 'pss': 0, 'private': 0, 'model_rss': 0, 'model_pss': 0}
+    in_model = False
+    with open(f'/proc/{pid}/smaps', 'r') as f:
+        for line in f:
+            fields = line.split()
+            if not fields[0].endswith(':'):
+                # Mapping header: address range, perms, offset, dev, inode, path
+                in_model = len(fields) >= 6 and fields[-1].endswith(FOREST_FILES)
+                continue
+            key, value = fields[0][:-1], int(fields[1]) if len(fields) > 1 and fields[1].isdigit() else 0
+            if key == 'Rss':
+                totals['rss'] += value
+                if in_model:
+                    totals['model_rss'] += value
+            elif key == 'Pss':
+                totals['pss'] += value
+                if in_model:
+                    totals['model_pss'] += value
+            elif key in ('Private_Clean', 'Private_Dirty'):
+                totals['private'] += value
+    return totals
+
+def client(port, patients, n_requests, concurrency):
+    async def run():
+        async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', timeout=60) as http:
+            latencies = []
+
+            async def worker(offset):
+                for i in range(offset, n_requests, concurrency):
+                    start = time.perf_counter()
+                    response = await http.post('/predict', json=patients[i % len(patients)])
+                    latencies.append(time.perf_counter() - start)
+                    response.raise_for_status()
+
+            await asyncio.gather(*(worker(k) for k in range(concurrency)))
+            return latencies
+    return asyncio.run(run())
+
+def start_server(workers, port, mmap_mode):
+    env = dict(os.environ, CARDIO_MMAP_MODE=mmap_mode, CARDIO_CACHE_SIZE='0')
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(API_DIR, 'serve.py'), '--workers', str(workers),
+         '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+        env=env, stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("serve.py exited")
+        pids = children(server.pid) if workers > 1 else [server.pid]
+        try:
+            if len(pids) >= workers and httpx.get(f'http://127.0.0.1:{port}/ready', timeout=5).status_code == 200:
+                return server, pids
+        except httpx.TransportError:
+            pass
+        time.sleep(0.3)
+    server.terminate()
+    raise RuntimeError("server did not become ready")
+
+def measure(workers, mmap_mode, patients, args):
+    port = free_port()
+    server, pids = start_server(workers, port, mmap_mode)
+    try:
+        n_clients = args.clients or workers
+        per_client = args.requests // n_clients
+        # Warm-up so every worker has touched the model pages
+        with ProcessPoolExecutor(n_clients) as pool:
+            list(pool.map(client, [port] * n_clients, [patients] * n_clients, [50] * n_clients, [args.concurrency] * n_clients))
+            start = time.perf_counter()
+            runs = list(pool.map(client, [port] * n_clients, [patients] * n_clients,
+                                 [per_client] * n_clients, [args.concurrency] * n_clients))
+            elapsed = time.perf_counter() - start
+        latencies = [latency for run in runs for latency in run]
+        result = summarize(latencies, elapsed)
+        usage = [memory(pid) for pid in pids]
+    finally:
+        server.terminate()
+        server.wait()
+    mib = 1024
+    return {
+        'mode': mmap_mode,
+        'workers': workers,
+        'rss_per_worker_mb': sum(u['rss'] for u in usage) / len(usage) / mib,
+        'private_per_worker_mb': sum(u['private'] for u in usage) / len(usage) / mib,
+        'pss_total_mb': sum(u['pss'] for u in usage) / mib,
+        'model_rss_per_worker_mb': sum(u['model_rss'] for u in usage) / len(usage) / mib,
+        'model_pss_total_mb': sum(u['model_pss'] for u in usage) / mib,
+        'rps': result['rps'],
+        'p50_ms': result['p50_ms'],
+        'p95_ms': result['p95_ms'],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker memory and aggregate throughput of serve.py.")
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--modes', default='r,none', help="CARDIO_MMAP_MODE values to compare")
+    parser.add_argument('--requests', type=int, default=2000, help="Requests per measurement, split over the clients")
+    parser.add_argument('--clients', type=int, default=0, help="Client processes (default: one per worker)")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent requests per client")
+    args = parser.parse_args()
+
+    patients = sample_patients(2000)
+    forest_file = next(name for name in FOREST_FILES if os.path.exists(os.path.join(API_DIR, name)))
+    print(f"{os.cpu_count()} CPUs; model file {forest_file}, {os.path.getsize(os.path.join(API_DIR, forest_file)) / 2**20:.1f} MiB")
+    print(f"\n{'mode':<5} {'workers':>7} {'RSS/worker':>11} {'private/wkr':>11} {'PSS total':>10} "
+          f"{'model RSS/wkr':>13} {'model PSS tot':>13} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for mode in args.modes.split(','):
+        for workers in range(1, args.max_workers + 1):
+            row = measure(workers, mode, patients, args)
+            print(f"{row['mode']:<5} {row['workers']:>7} {row['rss_per_worker_mb']:>9.1f}MB {row['private_per_worker_mb']:>9.1f}MB "
+                  f"{row['pss_total_mb']:>8.1f}MB {row['model_rss_per_worker_mb']:>11.1f}MB {row['model_pss_total_mb']:>11.1f}MB "
+                  f"{row['rps']:>8.1f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f}")
+
+if __name__ == "__main__":
+    main()
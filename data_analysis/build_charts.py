@@ -0,0 +1,316 @@
+import argparse
+import hashlib
+import importlib.metadata
+import inspect
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from dataset_cache import DATA_PATH, RAW_PARAMS, load_dataset
+
+# Builds the EDA charts served from public/charts (the step_* figures of
+# Cardio.ipynb) without running the notebook. Each chart is a function of the
+# cached dataset: the raw rows with age in years and BMI derived, loaded
+# memory-mapped through dataset_cache.py. The "cleaned" charts apply the
+# notebook's blood pressure rules on top. A chart's key hashes its function's
+# source, the shared helpers and settings, the plotting library versions and
+# the bytes of the columns it reads. chart_manifest.json records the key and
+# the output's hash per chart, and only charts whose key changed (or whose
+# output is missing or was modified) are redrawn. Stale charts are rendered in
+# a process pool, one chart per task.
+#
+#   python build_charts.py                     # rebuild what changed
+#   python build_charts.py --dry-run           # list what would be rebuilt
+#   python build_charts.py step_19 --force     # redraw one chart
+
+CHARTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'public', 'charts')
+MANIFEST_PATH = 'chart_manifest.json'
+
+# Part of every chart's key
+SETTINGS = {
+    'dpi': 100,
+    # Points drawn by the BP scatter (step 19), sampled per class
+    'scatter_max_points': 5000,
+    'seed': 42,
+}
+LIBRARIES = ('matplotlib', 'seaborn', 'pandas', 'numpy')
+
+# Notebook step 13: drop illogical and extreme blood pressure readings
+EDA_CLEANING_COLUMNS = ['ap_hi', 'ap_lo']
+
+def eda_clean(df):
+    keep = ((df['ap_lo'] < df['ap_hi']) & (df['ap_hi'] >= 80) & (df['ap_hi'] <= 250)
+            & (df['ap_lo'] >= 40) & (df['ap_lo'] <= 140))
+    return df[keep]
+
+def whole_years(df):
+    # The notebook truncates age to whole years
+    return (df['age'] / 365.25).astype(int)
+
+def downsample(df, max_points, by, seed=SETTINGS['seed']):
+    # At most max_points rows, keeping each `by` group's share
+    if len(df) <= max_points:
+        return df
+    fraction = max_points / len(df)
+    return df.groupby(by, group_keys=False).sample(frac=fraction, random_state=seed)
+
+# --- Charts: each draws one figure with plt/sns from the frame it is given ---
+
+def age_distribution(df, plt, sns):
+    plt.figure(figsize=(7, 5))
+    sns.histplot(whole_years(df), kde=True, bins=30)
+    plt.title('Step 7: Age Distribution (in Years)')
+    plt.xlabel('Age in Years')
+    plt.ylabel('Frequency')
+
+def raw_distributions(df, plt, sns):
+    fig, axes = plt.subplots(nrows=2, ncols=2, figsize=(12, 10))
+    for i, (ax, col) in enumerate(zip(axes.flatten(), ['height', 'weight', 'ap_hi', 'ap_lo'])):
+        sns.histplot(df[col], kde=True, ax=ax, bins=30)
+        ax.set_title(f'Step {8 if i < 2 else 9} (Raw): Distribution of {col.title().replace("_", " ")}')
+    plt.tight_layout()
+
+def cardio_distribution(df, plt, sns):
+    plt.figure(figsize=(6, 4))
+    sns.countplot(x='cardio', data=df)
+    plt.title('Step 10: Raw Distribution of Cardiovascular Disease')
+    plt.xlabel('Cardio (0: No Disease, 1: Disease)')
+    plt.ylabel('Count')
+
+def categorical_distributions(df, plt, sns):
+    fig, axes = plt.subplots(nrows=2, ncols=3, figsize=(15, 8))
+    for ax, col in zip(axes.flatten(), ['gender', 'cholesterol', 'gluc', 'smoke', 'alco', 'active']):
+        sns.countplot(x=col, data=df, ax=ax)
+        ax.set_title(f"Step 11: Distribution of {col.title()}")
+    plt.tight_layout()
+
+def outlier_boxplots(df, plt, sns):
+    fig, axes = plt.subplots(nrows=2, ncols=2, figsize=(12, 10))
+    for ax, col in zip(axes.flatten(), ['height', 'weight', 'ap_hi', 'ap_lo']):
+        sns.boxplot(y=df[col], ax=ax)
+        ax.set_title(f'Step 12: Box Plot of {col.title()} (Raw Data)')
+    plt.tight_layout()
+
+def correlation_heatmap(df, plt, sns):
+    features = ['height', 'weight', 'ap_hi', 'ap_lo', 'cholesterol', 'gluc', 'smoke', 'alco', 'active', 'cardio']
+    corr_matrix = df[features].assign(age_years=whole_years(df))[['age_years'] + features].corr()
+    plt.figure(figsize=(12, 10))
+    sns.heatmap(corr_matrix, annot=True, fmt=".2f", cmap='coolwarm', linewidths=.5)
+    plt.title('Step 14: Correlation Matrix Heatmap (Cleaned Data)')
+
+def risk_vs_age(df, plt, sns):
+    age_risk = df['cardio'].groupby(whole_years(df).rename('age_years')).mean().reset_index()
+    plt.figure(figsize=(10, 6))
+    sns.lineplot(x='age_years', y='cardio', data=age_risk, marker='o')
+    plt.title('Step 15: Cardiovascular Disease Risk vs. Age (Cleaned Data)')
+    plt.xlabel('Age in Years')
+    plt.ylabel('Proportion with Cardiovascular Disease (Cardio=1)')
+    plt.grid(True, axis='y', alpha=0.5)
+
+def categorical_risk(df, plt, sns):
+    fig, axes = plt.subplots(nrows=1, ncols=2, figsize=(12, 6))
+    for ax, col, label in zip(axes, ['cholesterol', 'gluc'], ['Cholesterol', 'Glucose']):
+        risk = df.groupby(col)['cardio'].mean().reset_index()
+        sns.barplot(x=col, y='cardio', data=risk, ax=ax)
+        ax.set_title(f'Step 16: Cardio Risk by {label} Level')
+        ax.set_xlabel(f'{label} Level (1: Normal, 3: High)')
+        ax.set_ylabel('Proportion with Cardio Disease')
+        ax.set_ylim(0, 1)
+    plt.tight_layout()
+
+def bmi_boxplot(df, plt, sns):
+    plt.figure(figsize=(7, 6))
+    sns.boxplot(x='cardio', y='bmi', data=df)
+    plt.title('Step 17: BMI vs. Cardiovascular Disease (Cleaned Data)')
+    plt.xlabel('Cardio (0: No Disease, 1: Disease)')
+    plt.ylabel('Body Mass Index (BMI)')
+
+def bp_boxplots(df, plt, sns):
+    fig, axes = plt.subplots(nrows=1, ncols=2, figsize=(12, 6))
+    for ax, col, label in zip(axes, ['ap_hi', 'ap_lo'], ['Systolic', 'Diastolic']):
+        sns.boxplot(x='cardio', y=col, data=df, ax=ax)
+        ax.set_title(f'Step 18: {label} BP ({col}) vs. Cardio')
+        ax.set_xlabel('Cardio (0: No Disease, 1: Disease)')
+        ax.set_ylabel(f'{label} BP ({col})')
+    plt.tight_layout()
+
+def bp_scatter(df, plt, sns):
+    # Drawing all ~69k markers costs seconds and shows nothing more than a
+    # class-stratified sample does
+    sample = downsample(df[['ap_hi', 'ap_lo', 'cardio']], SETTINGS['scatter_max_points'], 'cardio')
+    plt.figure(figsize=(10, 8))
+    sns.scatterplot(x='ap_hi', y='ap_lo', hue='cardio', data=sample, alpha=0.6, palette='Set1', s=20)
+    plt.title('Step 19: Systolic vs. Diastolic BP, Colored by Cardio (Sampled Data)')
+    plt.xlabel('Systolic BP (ap_hi)')
+    plt.ylabel('Diastolic BP (ap_lo)')
+    plt.legend(title='Cardio')
+
+def smoke_alco_heatmap(df, plt, sns):
+    combined_risk_pivot = df.pivot_table(index='smoke', columns='alco', values='cardio', aggfunc='mean')
+    plt.figure(figsize=(7, 6))
+    sns.heatmap(combined_risk_pivot, annot=True, fmt=".3f", cmap='YlOrRd', linewidths=.5)
+    plt.title('Step 20: Cardio Risk by Smoking and Alcohol Consumption')
+    plt.xlabel('Alcohol (0: No, 1: Yes)')
+    plt.ylabel('Smoke (0: No, 1: Yes)')
+
+# filename -> (function, cleaned, columns read)
+CHARTS = {
+    'step_07_age_distribution.png': (age_distribution, False, ['age']),
+    'steps_08_09_raw_distributions.png': (raw_distributions, False, ['height', 'weight', 'ap_hi', 'ap_lo']),
+    'step_10_cardio_distribution_raw.png': (cardio_distribution, False, ['cardio']),
+    'step_11_categorical_distributions.png': (categorical_distributions, False,
+                                              ['gender', 'cholesterol', 'gluc', 'smoke', 'alco', 'active']),
+    'step_12_outlier_boxplots_raw.png': (outlier_boxplots, False, ['height', 'weight', 'ap_hi', 'ap_lo']),
+    'step_14_correlation_heatmap.png': (correlation_heatmap, True,
+                                        ['age', 'height', 'weight', 'cholesterol', 'gluc', 'smoke', 'alco', 'active', 'cardio']),
+    'step_15_cardio_risk_vs_age.png': (risk_vs_age, True, ['age', 'cardio']),
+    'step_16_categorical_risk_barplots.png': (categorical_risk, True, ['cholesterol', 'gluc', 'cardio']),
+    'step_17_bmi_vs_cardio_boxplot.png': (bmi_boxplot, True, ['bmi', 'cardio']),
+    'step_18_bp_vs_cardio_boxplots.png': (bp_boxplots, True, ['ap_hi', 'ap_lo', 'cardio']),
+    'step_19_bp_scatter_by_cardio.png': (bp_scatter, True, ['ap_hi', 'ap_lo', 'cardio']),
+    'step_20_smoke_alco_combined_risk_heatmap.png': (smoke_alco_heatmap, True, ['smoke', 'alco', 'cardio']),
+}
+
+# Code every chart depends on besides its own function
+SHARED_CODE = (eda_clean, whole_years, downsample)
+
+def library_versions():
+    versions = {}
+    for name in LIBRARIES:
+        try:
+            versions[name] = importlib.metadata.version(name)
+        except importlib.metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+def file_sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def chart_keys(df, names):
+    # filename -> key over code, settings, library versions and input columns
+    shared = hashlib.sha256()
+    for function in SHARED_CODE:
+        shared.update(inspect.getsource(function).encode())
+    shared.update(json.dumps({'settings': SETTINGS, 'libraries': library_versions()}, sort_keys=True).encode())
+    column_hashes = {}
+    keys = {}
+    for name in names:
+        function, cleaned, columns = CHARTS[name]
+        digest = shared.copy()
+        digest.update(inspect.getsource(function).encode())
+        digest.update(b'cleaned' if cleaned else b'raw')
+        for column in sorted(set(columns) | (set(EDA_CLEANING_COLUMNS) if cleaned else set())):
+            if column not in column_hashes:
+                values = np.ascontiguousarray(df[column].to_numpy())
+                column_hashes[column] = hashlib.sha256(values.dtype.str.encode() + values.tobytes()).hexdigest()
+            digest.update(f"{column}={column_hashes[column]};".encode())
+        keys[name] = digest.hexdigest()
+    return keys
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {"charts": {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+def stale_reason(name, key, output_dir, manifest):
+    path = os.path.join(output_dir, name)
+    entry = manifest["charts"].get(os.path.abspath(path))
+    if not os.path.exists(path):
+        return "missing"
+    if entry is None:
+        return "not in manifest"
+    if entry["key"] != key:
+        return "inputs or code changed"
+    if entry["output_sha256"] != file_sha256(path):
+        return "output modified"
+    return None
+
+# Per worker process: the frames charts are drawn from
+_frames = {}
+
+def chart_frame(cleaned):
+    if not _frames:
+        _frames['raw'] = load_dataset(DATA_PATH, params=RAW_PARAMS)
+        _frames['cleaned'] = eda_clean(_frames['raw'])
+    return _frames['cleaned' if cleaned else 'raw']
+
+def render(name, output_dir):
+    # Runs in a worker: draw one chart and move it into place
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    start = time.perf_counter()
+    function, cleaned, _ = CHARTS[name]
+    function(chart_frame(cleaned), plt, sns)
+    path = os.path.join(output_dir, name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    plt.savefig(tmp_path, format='png', dpi=SETTINGS['dpi'])
+    plt.close('all')
+    os.replace(tmp_path, path)
+    return name, time.perf_counter() - start, file_sha256(path)
+
+def build(names, output_dir, workers=0):
+    # [(name, seconds, output sha256)] in the order of `names`
+    workers = min(workers or os.cpu_count() or 1, len(names))
+    if workers <= 1:
+        return [render(name, output_dir) for name in names]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render, name, output_dir) for name in names]
+        return [future.result() for future in futures]
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the EDA charts whose inputs or code changed.")
+    parser.add_argument('charts', nargs='*', help="Only these charts (file name or a prefix such as step_19)")
+    parser.add_argument('--output-dir', default=CHARTS_DIR)
+    parser.add_argument('--force', action='store_true', help="Redraw even if up to date")
+    parser.add_argument('--workers', type=int, default=0, help="Worker processes (0 = all cores, 1 = in this process)")
+    parser.add_argument('--dry-run', action='store_true', help="Only report which charts are stale")
+    parser.add_argument('--manifest', default=MANIFEST_PATH)
+    args = parser.parse_args()
+
+    names = [name for name in CHARTS if not args.charts or any(name.startswith(prefix) for prefix in args.charts)]
+    if not names:
+        raise SystemExit(f"No chart matches {args.charts}; known: {', '.join(CHARTS)}")
+
+    start = time.perf_counter()
+    keys = chart_keys(chart_frame(False), names)
+    manifest = load_manifest(args.manifest)
+    stale = {}
+    for name in names:
+        reason = "forced" if args.force else stale_reason(name, keys[name], args.output_dir, manifest)
+        if reason:
+            stale[name] = reason
+    print(f"{len(stale)} of {len(names)} charts to rebuild (checked in {time.perf_counter() - start:.2f} s)")
+    for name, reason in stale.items():
+        print(f"  {name:<46} {reason}")
+    if args.dry_run or not stale:
+        return
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    start = time.perf_counter()
+    results = build(list(stale), args.output_dir, args.workers)
+    wall = time.perf_counter() - start
+    for name, seconds, output_sha256 in results:
+        manifest["charts"][os.path.abspath(os.path.join(args.output_dir, name))] = {
+            "key": keys[name], "output_sha256": output_sha256, "render_s": round(seconds, 3),
+            "built_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        print(f"  {name:<46} {seconds:>6.2f} s")
+    save_manifest(manifest, args.manifest)
+    print(f"Rebuilt {len(results)} charts in {wall:.2f} s wall ({sum(r[1] for r in results):.2f} s of rendering)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import time
+import numpy as np
+
+from train_model_pipeline import DATA_PATH, load_dataset, split_data
+from model_registry import ModelRegistry
+from risk_table import FIELDS, RiskTable, build_table, choose_axes, save_table
+
+# Optional offline stage: run after train_model_pipeline.py and copy
+# risk_table.npy / risk_table.json into api/ next to the model artifacts.
+# The forest is loaded through the API's ModelRegistry, so the table is built
+# from (and keyed on the hash of) the artifact the API serves: the compact
+# cardio_forest.bin when present.
+
+TABLE_PATH = 'risk_table.npy'
+TABLE_META_PATH = 'risk_table.json'
+
+def api_columns(df):
+    # Request-domain values: the API receives age in whole years
+    columns = {field: df[field].to_numpy() for field in FIELDS if field != 'age'}
+    columns['age'] = df['age_years'].round().astype(int).to_numpy()
+    return columns
+
+def feature_matrix(columns):
+    X = np.empty((len(columns['age']), len(FIELDS) + 1), dtype=np.float64)
+    for j, field in enumerate(FIELDS):
+        X[:, j] = columns[field]
+    X[:, 11] = X[:, 3] / ((X[:, 2] / 100) ** 2)
+    return X
+
+def measure_exactness(table, forest, scaler, X):
+    expected = forest.predict_proba(scaler.transform(X))[:, 1]
+    proba, in_grid = table.lookup(X)
+    diff = np.abs(proba[in_grid] - expected[in_grid])
+    return {
+        "holdout_rows": int(len(X)),
+        "in_grid_fraction": round(float(in_grid.mean()), 4),
+        "max_abs_error": float(diff.max()) if diff.size else 0.0,
+        "mean_abs_error": float(diff.mean()) if diff.size else 0.0,
+        "label_agreement": float(np.mean((proba[in_grid] > 0.5) == (expected[in_grid] > 0.5))) if diff.size else 1.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the /predict risk lookup table.")
+    parser.add_argument('--weight-step', type=float, default=2.0, help="Weight quantization step in kg")
+    parser.add_argument('--coverage', type=float, default=0.8, help="Fraction of training rows each axis must cover")
+    parser.add_argument('--max-cells', type=int, default=20_000_000, help="Refuse to build larger tables")
+    parser.add_argument('--model-dir', default='.', help="Directory holding the model artifacts to be deployed")
+    args = parser.parse_args()
+
+    df = load_dataset(DATA_PATH)
+    X_train, X_test, _, _ = split_data(df)
+    train_columns = api_columns(df.loc[X_train.index])
+
+    axes = choose_axes(train_columns, args.weight_step, args.coverage)
+    shape = [len(axes[field]) for field in FIELDS]
+    cells = int(np.prod(shape))
+    print("Axis sizes: " + ", ".join(f"{field}={size}" for field, size in zip(FIELDS, shape)))
+    print(f"Table cells: {cells:,} ({cells * 4 / 1e6:.1f} MB as float32)")
+    if cells > args.max_cells:
+        raise SystemExit(f"Table would have {cells:,} cells (limit {args.max_cells:,}); lower --coverage or raise --weight-step.")
+
+    bundle = ModelRegistry(args.model_dir, mmap_mode=None, use_risk_table=False).get()
+    forest, scaler = bundle.forest, bundle.scaler
+
+    start = time.perf_counter()
+    def progress(done, total):
+        print(f"\r  {done:,}/{total:,} cells", end='', flush=True)
+    table = build_table(axes, args.weight_step, forest, scaler, progress=progress)
+    print(f"\nBuilt in {time.perf_counter() - start:.1f} s")
+
+    meta = {
+        "fields": FIELDS,
+        "axes": axes,
+        "weight_step": args.weight_step,
+        "coverage": args.coverage,
+        # The digest the API registry computes for the same artifacts, so a
+        # table built for another model is never served
+        "model_hash": bundle.model_hash,
+    }
+    meta["exactness"] = measure_exactness(RiskTable(table, meta), forest, scaler, feature_matrix(api_columns(df.loc[X_test.index])))
+    save_table(table, meta, TABLE_PATH, TABLE_META_PATH)
+
+    print(f"\nMemory footprint: {table.nbytes / 1e6:.1f} MB ({TABLE_PATH})")
+    print("Exactness on the holdout set:")
+    for key, value in meta["exactness"].items():
+        print(f"  {key}: {value}")
+    print(f"Saved {TABLE_PATH} and {TABLE_META_PATH}")
+
+if __name__ == "__main__":
+    main()
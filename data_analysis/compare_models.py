@@ -0,0 +1,155 @@
+import argparse
+import json
+import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+from sklearn.naive_bayes import GaussianNB
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+
+from train_model_pipeline import DATA_PATH, load_dataset, split_data
+
+# Side-by-side comparison of candidate models on speed as well as score.
+# The scaled train/test arrays are written once as .npy files and every
+# worker process memory-maps them read-only, so the pool shares one copy of
+# the data instead of receiving pickled copies. Each worker fits one model
+# and makes a single predict_proba pass over the test set; labels and every
+# metric come from those probabilities. Prediction latency is measured
+# separately on a fixed 1,000-row slice and a single row.
+#
+#   python compare_models.py --workers 0
+#   python compare_models.py --models "Random Forest,KNN" --output comparison.json
+
+REPORT_PATH = 'model_comparison.json'
+LATENCY_ROWS = 1000
+LATENCY_REPEATS = 5
+
+# name -> (estimator class, parameters); built inside the worker
+CANDIDATES = {
+    "Logistic Regression": (LogisticRegression, {'max_iter': 1000, 'random_state': 42}),
+    "Random Forest": (RandomForestClassifier, {'random_state': 42, 'n_jobs': 1}),
+    "Decision Tree": (DecisionTreeClassifier, {'random_state': 42}),
+    "KNN": (KNeighborsClassifier, {'n_jobs': 1}),
+    "Naive Bayes": (GaussianNB, {}),
+}
+
+ARRAYS = ('X_train', 'y_train', 'X_test', 'y_test')
+
+def write_arrays(directory, arrays):
+    for name in ARRAYS:
+        np.save(os.path.join(directory, name + '.npy'), np.ascontiguousarray(arrays[name]))
+
+def open_arrays(directory):
+    return {name: np.load(os.path.join(directory, name + '.npy'), mmap_mode='r') for name in ARRAYS}
+
+def best_time(fn, repeats=LATENCY_REPEATS):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def evaluate(name, data_dir, params=None):
+    # Runs in a worker: fit one candidate on the shared arrays and measure it
+    data = open_arrays(data_dir)
+    estimator_class, default_params = CANDIDATES[name]
+    model = estimator_class(**dict(default_params, **(params or {})))
+
+    start = time.perf_counter()
+    model.fit(data['X_train'], data['y_train'])
+    fit_time = time.perf_counter() - start
+
+    X_test, y_test = data['X_test'], np.asarray(data['y_test'])
+    start = time.perf_counter()
+    proba = model.predict_proba(X_test)
+    predict_time = time.perf_counter() - start
+    # Same label rule as predict() for these classifiers
+    y_pred = model.classes_.take(np.argmax(proba, axis=1))
+
+    latency_rows = X_test[:LATENCY_ROWS]
+    return {
+        "model": name,
+        "params": model.get_params(),
+        "fit_s": fit_time,
+        "test_predict_s": predict_time,
+        "predict_ms_per_1k": best_time(lambda: model.predict_proba(latency_rows)) * 1000 * LATENCY_ROWS / len(latency_rows),
+        "predict_ms_single": best_time(lambda: model.predict_proba(X_test[:1]), LATENCY_REPEATS * 4) * 1000,
+        "size_kb": len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)) / 1024,
+        "accuracy": float(accuracy_score(y_test, y_pred)),
+        "precision": float(precision_score(y_test, y_pred)),
+        "recall": float(recall_score(y_test, y_pred)),
+        "f1": float(f1_score(y_test, y_pred)),
+        "roc_auc": float(roc_auc_score(y_test, proba[:, 1])),
+        "pid": os.getpid(),
+    }
+
+def compare(X_train, X_test, y_train, y_test, names=None, workers=0, scale=True, params=None):
+    # Results for every candidate, in the order of `names`. `params` maps a
+    # candidate name to parameter overrides.
+    names = list(names or CANDIDATES)
+    params = params or {}
+    if scale:
+        scaler = StandardScaler()
+        X_train = scaler.fit_transform(X_train)
+        X_test = scaler.transform(X_test)
+    arrays = {
+        'X_train': np.asarray(X_train, dtype=np.float64), 'y_train': np.asarray(y_train),
+        'X_test': np.asarray(X_test, dtype=np.float64), 'y_test': np.asarray(y_test),
+    }
+    workers = min(workers or os.cpu_count() or 1, len(names))
+    with tempfile.TemporaryDirectory(prefix='cardio_compare_') as data_dir:
+        write_arrays(data_dir, arrays)
+        if workers <= 1:
+            return [evaluate(name, data_dir, params.get(name)) for name in names]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(evaluate, name, data_dir, params.get(name)) for name in names]
+            return [future.result() for future in futures]
+
+def print_table(results):
+    print(f"{'model':<22} {'fit s':>7} {'ms/1k rows':>10} {'ms/row':>7} {'size KB':>9} "
+          f"{'accuracy':>8} {'precision':>9} {'recall':>7} {'F1':>7} {'ROC AUC':>7}")
+    for r in sorted(results, key=lambda r: r['accuracy'], reverse=True):
+        print(f"{r['model']:<22} {r['fit_s']:>7.2f} {r['predict_ms_per_1k']:>10.2f} {r['predict_ms_single']:>7.3f} "
+              f"{r['size_kb']:>9.0f} {r['accuracy']:>8.4f} {r['precision']:>9.4f} {r['recall']:>7.4f} "
+              f"{r['f1']:>7.4f} {r['roc_auc']:>7.4f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit candidate models in parallel and compare speed, size and score.")
+    parser.add_argument('--models', help=f"Comma-separated subset of: {', '.join(CANDIDATES)}")
+    parser.add_argument('--workers', type=int, default=0, help="Worker processes (0 = all cores, 1 = in this process)")
+    parser.add_argument('--no-scale', action='store_true', help="Fit on the raw features instead of standardized ones")
+    parser.add_argument('--output', default=REPORT_PATH, help="JSON report path")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.models.split(',')] if args.models else list(CANDIDATES)
+    unknown = [name for name in names if name not in CANDIDATES]
+    if unknown:
+        raise SystemExit(f"Unknown models: {unknown}")
+
+    df = load_dataset(DATA_PATH)
+    X_train, X_test, y_train, y_test = split_data(df)
+    print(f"Training shape: {X_train.shape}, Testing shape: {X_test.shape}")
+
+    start = time.perf_counter()
+    results = compare(X_train, X_test, y_train, y_test, names, args.workers, scale=not args.no_scale)
+    wall = time.perf_counter() - start
+    print(f"\n--- Model Comparison ({len({r['pid'] for r in results})} processes, {wall:.1f} s wall, "
+          f"{sum(r['fit_s'] for r in results):.1f} s total fit) ---")
+    print_table(results)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({"wall_s": wall, "scaled": not args.no_scale, "n_train": len(X_train), "n_test": len(X_test),
+                   "results": results}, f, indent=2, default=str)
+    print(f"\nReport written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import shutil
+import time
+
+import joblib
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.preprocessing import StandardScaler
+
+from train_model_pipeline import (DATA_PATH, FEATURES, MODEL_META_PATH, MODEL_PATH, PERMUTATION_REPEATS, RF_PARAMS, SCALER_PATH,
+                                  TARGET, build_metadata, load_dataset, save_artifacts, save_metadata, split_data)
+from dataset_cache import CACHE_DIR, file_hash
+from forest_engine import compile_forest
+from compact_forest import save_compact_forest
+
+# Incremental retraining on newly labeled records.
+# Each new file (cardio_train.csv schema, e.g. one day of outcomes) is cleaned
+# and cached like the base dataset and recorded in training_manifest.json, in
+# arrival order. Instead of refitting the forest, `--trees` new trees are
+# grown with warm_start on the most recent `--window-rows` training rows (the
+# new records plus the tail of what came before), and beyond `--max-trees`
+# the oldest trees are dropped. The scaler is kept, since the existing trees
+# split on its output. The holdout is always the base split's test set.
+#
+# The result is published as a new versioned compact artifact under
+# <publish-dir>/versions/ and then swapped in as <publish-dir>/cardio_forest.bin
+# with an atomic rename: a running API keeps serving the file it mapped and
+# never sees a half-written one.
+#
+#   python incremental_train.py new_outcomes.csv --publish-dir ../api
+#   python incremental_train.py --full --publish-dir ../api   # periodic full retrain
+
+MANIFEST_PATH = 'training_manifest.json'
+COMPACT_FILE = 'cardio_forest.bin'
+VERSIONS_DIR = 'versions'
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {"base": {"path": DATA_PATH, "sha256": file_hash(DATA_PATH)}, "increments": [], "models": []}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+def training_pool(manifest):
+    # Base training split followed by every increment in arrival order, and
+    # the fixed base holdout
+    base = load_dataset(manifest["base"]["path"])
+    X_train, X_test, y_train, y_test = split_data(base)
+    parts = [base.loc[X_train.index]]
+    for increment in manifest["increments"]:
+        parts.append(load_dataset(increment["path"], cache_dir=CACHE_DIR))
+    pool = pd.concat(parts, ignore_index=True)
+    return pool, X_test, y_test
+
+def update_seed(manifest, base_seed=42):
+    # warm_start seeds the new trees from random_state after skipping one
+    # draw per existing tree. Once pruning holds the forest at max_trees the
+    # skip is the same every update, so a fixed random_state would give every
+    # update the same seeds; one per recorded model keeps them distinct.
+    return base_seed + len(manifest["models"])
+
+def grow_forest(rf, scaler, X_window, y_window, n_new, max_trees, random_state):
+    n_old = len(rf.estimators_)
+    rf.set_params(warm_start=True, n_estimators=n_old + n_new, random_state=random_state)
+    rf.fit(scaler.transform(X_window), y_window)
+    pruned = 0
+    if max_trees and len(rf.estimators_) > max_trees:
+        pruned = len(rf.estimators_) - max_trees
+        rf.estimators_ = rf.estimators_[pruned:]
+        rf.n_estimators = len(rf.estimators_)
+    return pruned
+
+def new_version():
+    return time.strftime('%Y%m%dT%H%M%S')
+
+def copy_atomic(source, target):
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+
+def publish(rf, scaler, publish_dir, version, metrics, lineage, metadata):
+    # Versioned copies first, then atomic swaps of the served files. The
+    # metadata goes first: a server reloading on the new forest finds it.
+    versions_dir = os.path.join(publish_dir, VERSIONS_DIR)
+    os.makedirs(versions_dir, exist_ok=True)
+    versioned_path = os.path.join(versions_dir, f"cardio_forest-{version}.bin")
+    versioned_meta_path = os.path.join(versions_dir, f"cardio_forest-{version}.json")
+    save_compact_forest(compile_forest(rf, scaler), versioned_path, feature_names=FEATURES,
+                        metrics=metrics, model_version=version, lineage=lineage)
+    save_metadata(dict(metadata, model_version=version, lineage=lineage), versioned_meta_path, [[versioned_path]])
+    copy_atomic(versioned_meta_path, os.path.join(publish_dir, MODEL_META_PATH))
+    copy_atomic(versioned_path, os.path.join(publish_dir, COMPACT_FILE))
+    return versioned_path
+
+def record_model(manifest, rf, scaler, version, metrics, lineage, metadata, publish_dir=None):
+    # The working artifacts the next update starts from (with the compiled
+    # forests rebuilt, so none is left describing the previous model), their
+    # sidecar, the published copy and the manifest entry, for every script
+    # that produces a model
+    save_artifacts(rf, scaler, metrics, metadata, model_version=version, lineage=lineage)
+    model_record = {"version": version, "n_estimators": len(rf.estimators_), "created_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    "metrics": metrics, "lineage": lineage}
+    if publish_dir:
+        start = time.perf_counter()
+        model_record["artifact"] = publish(rf, scaler, publish_dir, version, metrics, lineage, metadata)
+        print(f"Published version {version} to {publish_dir} in {time.perf_counter() - start:.2f} s")
+    manifest["models"].append(model_record)
+    save_manifest(manifest)
+    return model_record
+
+def evaluate(rf, scaler, X_test, y_test):
+    return float(accuracy_score(y_test, rf.predict(scaler.transform(X_test))))
+
+def main():
+    parser = argparse.ArgumentParser(description="Add newly labeled records to the forest without a full retrain.")
+    parser.add_argument('files', nargs='*', help="New labeled records (semicolon CSV, cardio_train.csv schema)")
+    parser.add_argument('--trees', type=int, default=10, help="New trees per update")
+    parser.add_argument('--max-trees', type=int, default=150, help="Drop the oldest trees beyond this many (0 = never)")
+    parser.add_argument('--window-rows', type=int, default=20000, help="Most recent training rows the new trees see")
+    parser.add_argument('--full', action='store_true', help="Retrain from scratch on the base data plus all increments")
+    parser.add_argument('--compare-full', action='store_true', help="Also time a full retrain on the same data (not saved)")
+    parser.add_argument('--publish-dir', help="Directory served by the API (e.g. ../api)")
+    parser.add_argument('--permutation-repeats', type=int,
+                        help="Repeats for the permutation importances in the metadata (0 = skip). They cost "
+                             "far more than the update itself, so incremental updates skip them by default.")
+    args = parser.parse_args()
+    if args.permutation_repeats is None:
+        args.permutation_repeats = PERMUTATION_REPEATS if args.full else 0
+
+    manifest = load_manifest()
+    known = {increment["sha256"] for increment in manifest["increments"]}
+    added = []
+    for path in args.files:
+        sha256 = file_hash(path)
+        if sha256 in known:
+            print(f"{path} is already in the training data, skipping.")
+            continue
+        rows = len(load_dataset(path, cache_dir=CACHE_DIR))
+        increment = {"path": os.path.abspath(path), "sha256": sha256, "rows": rows, "added_at": time.strftime('%Y-%m-%dT%H:%M:%S')}
+        manifest["increments"].append(increment)
+        known.add(sha256)
+        added.append(increment)
+    if not added and not args.full:
+        print("No new records.")
+        return
+
+    start = time.perf_counter()
+    pool, X_test, y_test = training_pool(manifest)
+    load_time = time.perf_counter() - start
+    print(f"Training pool: {len(pool):,} rows ({sum(i['rows'] for i in added):,} new), loaded in {load_time:.2f} s")
+
+    version = new_version()
+    parent = manifest["models"][-1]["version"] if manifest["models"] else None
+    start = time.perf_counter()
+    if args.full:
+        scaler = StandardScaler()
+        X_pool = scaler.fit_transform(pool[FEATURES])
+        rf = RandomForestClassifier(random_state=42, **RF_PARAMS)
+        rf.fit(X_pool, pool[TARGET])
+        lineage = {"kind": "full", "parent": parent, "rows": len(pool)}
+    else:
+        rf = joblib.load(MODEL_PATH)
+        scaler = joblib.load(SCALER_PATH)
+        window = pool.iloc[-args.window_rows:]
+        seed = update_seed(manifest)
+        pruned = grow_forest(rf, scaler, window[FEATURES], window[TARGET], args.trees, args.max_trees, seed)
+        lineage = {"kind": "incremental", "parent": parent, "trees_added": args.trees, "trees_pruned": pruned,
+                   "window_rows": len(window), "random_state": seed, "new_files": [i["path"] for i in added]}
+    fit_time = time.perf_counter() - start
+    accuracy = evaluate(rf, scaler, X_test, y_test)
+    print(f"{lineage['kind'].capitalize()} update: {len(rf.estimators_)} trees, fitted in {fit_time:.2f} s, "
+          f"holdout accuracy {accuracy:.4f}")
+
+    if args.compare_full and not args.full:
+        start = time.perf_counter()
+        full_scaler = StandardScaler()
+        full_rf = RandomForestClassifier(random_state=42, **dict(RF_PARAMS, n_estimators=len(rf.estimators_)))
+        full_rf.fit(full_scaler.fit_transform(pool[FEATURES]), pool[TARGET])
+        full_time = time.perf_counter() - start
+        print(f"Full retrain for comparison: {full_time:.2f} s, holdout accuracy "
+              f"{evaluate(full_rf, full_scaler, X_test, y_test):.4f} ({full_time / fit_time:.1f}x the incremental time)")
+
+    start = time.perf_counter()
+    metadata = build_metadata(rf, scaler.transform(X_test), y_test, len(pool), rf.get_params(),
+                              permutation_repeats=args.permutation_repeats, X_train=pool[FEATURES])
+    print(f"Holdout metrics and importances computed in {time.perf_counter() - start:.2f} s")
+    metrics = {"accuracy": accuracy, "n_train": len(pool), "n_test": len(X_test), "fit_seconds": round(fit_time, 3)}
+    record_model(manifest, rf, scaler, version, metrics, lineage, metadata, args.publish_dir)
+    print(f"Manifest updated: {len(manifest['increments'])} increments, model version {version}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Bulk scorer for semicolon-delimited files in the cardio_train.csv schema.
+# The file is read and scored in fixed-size chunks and each chunk is written
+# out before the next is read, so memory use does not grow with file size.
+#
+#   python score_patients.py patients.csv scores.csv
+#   python score_patients.py patients.csv scores.parquet --workers 8
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api')
+sys.path.insert(0, API_DIR)
+from model_registry import ModelRegistry
+from scoring import FEATURES, INPUT_FIELDS, build_feature_matrix, explain_matrix, risk_engine, score_matrix
+
+# Input columns copied through to the output when present
+PASSTHROUGH_COLUMNS = ['id', 'cardio']
+
+# Whole-number request fields. pandas reads a chunk with a missing value in
+# one of them as float64, which would change the risk factor text ("140.0/90")
+# and label lookups depending on the chunk, so they are cast back for the rules.
+INTEGER_FIELDS = [field for field in INPUT_FIELDS if field not in ('age', 'weight')]
+
+# Parquet type of every output column (float64 otherwise). The schema is fixed
+# up front rather than inferred from the first chunk, where an all-null column
+# would be typed null and every later chunk would fail to write.
+OUTPUT_TYPES = {'id': 'int64', 'cardio': 'int64', 'risk_prediction': 'int64', 'risk_factors': 'string'}
+
+# Scoring bundle of the current process (each pool worker loads its own),
+# and whether to add per-feature contribution columns
+_bundle = None
+_explain = False
+
+def init_worker(model_dir, explain=False):
+    global _bundle, _explain
+    _bundle = ModelRegistry(model_dir).get()
+    _explain = explain
+
+def score_chunk(chunk):
+    columns = {field: chunk[field].to_numpy() for field in INPUT_FIELDS}
+    # cardio_train.csv stores age in days; same conversion as load_and_clean_data
+    columns['age'] = np.round(chunk['age'].to_numpy() / 365.25, 1)
+    X = build_feature_matrix(columns)
+    
+    # Rows the model cannot score (e.g. height 0) are written with empty results
+    valid = np.isfinite(X).all(axis=1)
+    probability = np.full(len(X), np.nan)
+    prediction = pd.array([pd.NA] * len(X), dtype='Int64')
+    contributions = np.full((len(X), len(FEATURES)), np.nan) if _explain else None
+    if valid.any():
+        if _explain:
+            probability[valid], labels, contributions[valid] = explain_matrix(_bundle, X[valid])
+        else:
+            probability[valid], labels = score_matrix(_bundle, X[valid])
+        prediction[valid] = labels
+    
+    for field in INTEGER_FIELDS:
+        values = columns[field]
+        if values.dtype.kind == 'f' and np.array_equal(values[valid], np.floor(values[valid])):
+            # Unscored rows get no risk factors, so their placeholder is never shown
+            columns[field] = np.where(valid, values, 0).astype(np.int64)
+    risk_factors = [
+        json.dumps(factors) if ok else None
+        for factors, ok in zip(risk_engine.evaluate(columns, X[:, 11]), valid.tolist())
+    ]
+    
+    result = chunk[[column for column in PASSTHROUGH_COLUMNS if column in chunk.columns]].astype('Int64')
+    result['age_years'] = columns['age']
+    result['bmi'] = np.round(X[:, 11], 1)
+    result['risk_probability'] = probability
+    result['risk_prediction'] = prediction
+    result['risk_factors'] = risk_factors
+    if _explain:
+        for j, feature in enumerate(FEATURES):
+            result[f'contribution_{feature}'] = contributions[:, j]
+    return result
+
+def iter_scored_chunks(reader, model_dir, workers, explain=False):
+    if workers <= 1:
+        init_worker(model_dir, explain)
+        for chunk in reader:
+            yield score_chunk(chunk)
+        return
+    
+    # At most two chunks per worker are in flight, which keeps memory bounded
+    # while still keeping every core busy; results come back in input order
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(model_dir, explain)) as pool:
+        pending = deque()
+        for chunk in reader:
+            pending.append(pool.submit(score_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+class CsvWriter:
+    def __init__(self, path, sep):
+        self.path = path
+        self.sep = sep
+        self.header = True
+    
+    def write(self, frame):
+        frame.to_csv(self.path, sep=self.sep, index=False, header=self.header, mode='w' if self.header else 'a')
+        self.header = False
+    
+    def close(self):
+        pass
+
+class ParquetWriter:
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow (pip install pyarrow).")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.path = path
+        self.writer = None
+    
+    def write(self, frame):
+        if self.writer is None:
+            self.schema = self.pa.schema([(column, self.pa.type_for_alias(OUTPUT_TYPES.get(column, 'float64')))
+                                          for column in frame.columns])
+            self.writer = self.pq.ParquetWriter(self.path, self.schema)
+        self.writer.write_table(self.pa.Table.from_pandas(frame, schema=self.schema, preserve_index=False))
+    
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV of patients in the cardio_train.csv schema.")
+    parser.add_argument('input', help="Semicolon-delimited input CSV")
+    parser.add_argument('output', help="Output file (.csv or .parquet)")
+    parser.add_argument('--format', choices=['csv', 'parquet'], help="Output format (default: from the output extension)")
+    parser.add_argument('--chunk-size', type=int, default=50000, help="Rows per chunk")
+    parser.add_argument('--workers', type=int, default=1, help="Processes to score chunks in (0 = all cores)")
+    parser.add_argument('--sep', default=';', help="Delimiter for the input and CSV output")
+    parser.add_argument('--model-dir', default=API_DIR, help="Directory holding the model artifacts")
+    parser.add_argument('--contributions', action='store_true',
+                        help="Add a contribution_<feature> column per model feature (see FlatForest.predict_contributions)")
+    args = parser.parse_args()
+    
+    output_format = args.format or ('parquet' if args.output.endswith('.parquet') else 'csv')
+    writer = ParquetWriter(args.output) if output_format == 'parquet' else CsvWriter(args.output, args.sep)
+    workers = args.workers or os.cpu_count()
+    
+    start = time.perf_counter()
+    n_rows = 0
+    reader = pd.read_csv(args.input, sep=args.sep, chunksize=args.chunk_size)
+    try:
+        for result in iter_scored_chunks(reader, args.model_dir, workers, args.contributions):
+            writer.write(result)
+            n_rows += len(result)
+            print(f"\rScored {n_rows:,} rows", end='', flush=True)
+    finally:
+        writer.close()
+    
+    elapsed = time.perf_counter() - start
+    print(f"\nScored {n_rows:,} rows in {elapsed:.1f} s ({n_rows / max(elapsed, 1e-9):,.0f} rows/s) -> {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import argparse
+import copy
+import json
+import os
+import tempfile
+import time
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, roc_auc_score
+
+from train_model_pipeline import DATA_PATH, FEATURES, MODEL_PATH, SCALER_PATH, build_metadata, load_dataset, split_data
+from incremental_train import load_manifest, new_version, record_model
+from forest_engine import FlatForest, FlatScaler, compile_forest
+from compact_forest import load_compact_forest_arrays, save_compact_forest
+from model_registry import ServingBundle
+from scoring import explain_matrix, score_with_forest
+
+# Picks the model to serve under a latency and a memory budget for /predict.
+# Candidates are the trained forest (the teacher), the teacher cut down to its
+# first k trees, and smaller student forests distilled from it: each student
+# is fitted on the training rows twice, labelled 0 and 1 and weighted by the
+# teacher's probabilities, so its leaves learn the teacher's soft scores
+# rather than the raw labels. Every forest candidate is compiled into the
+# compact artifact the API serves and measured there: p99 of single-row
+# scoring through the /predict code path, and the memory the loaded model
+# takes (mapped file plus the arrays decoded at load). The most accurate
+# candidate within both budgets is selected; --publish-dir ships it and, as
+# incremental_train.py does, makes it the working model (cardio_model_final.pkl
+# and scaler.pkl) and records it in training_manifest.json, so the next
+# incremental update grows the published forest.
+#
+# A logistic regression distilled the same way is reported for reference but
+# never selected: the serving engine only runs forests.
+#
+#   python select_model.py --p99-ms 2 --memory-mb 4
+#   python select_model.py --p99-ms 1 --publish-dir ../api
+
+REPORT_PATH = 'model_selection.json'
+LATENCY_CALLS = 2000
+SUBSET_TREES = (50, 25, 10)
+# (n_estimators, max_depth) of the distilled student forests
+STUDENTS = ((100, 8), (50, 8), (50, 6), (25, 6), (10, 6), (25, 4))
+
+def soft_label_fit(model, X, teacher_proba):
+    # Fit on the teacher's probabilities: every row once per class, weighted
+    # by the teacher's probability of that class
+    n_rows = len(X)
+    X_twice = np.concatenate([X, X])
+    y_twice = np.concatenate([np.zeros(n_rows, dtype=np.int64), np.ones(n_rows, dtype=np.int64)])
+    weights = np.concatenate([teacher_proba[:, 0], teacher_proba[:, 1]])
+    keep = weights > 0
+    model.fit(X_twice[keep], y_twice[keep], sample_weight=weights[keep])
+    return model
+
+def tree_subset(forest, n_trees):
+    subset = copy.copy(forest)
+    subset.estimators_ = forest.estimators_[:n_trees]
+    subset.n_estimators = n_trees
+    return subset
+
+def serving_bundle(forest, scaler, directory, name):
+    # The candidate as the API would load it: compiled, packed and memory-mapped
+    path = os.path.join(directory, f"{name}.bin")
+    save_compact_forest(compile_forest(forest, scaler), path, feature_names=FEATURES)
+    arrays = load_compact_forest_arrays(path, mmap_mode='r')
+    flat = FlatForest(arrays)
+    bundle = ServingBundle(flat, FlatScaler.from_arrays(arrays), name)
+    # Private arrays built at load rather than mapped from the file
+    private = flat.private_nbytes
+    return bundle, os.path.getsize(path), private
+
+def measure_latency(bundle, X_raw, explain, calls=LATENCY_CALLS):
+    score = explain_matrix if explain else score_with_forest
+    for i in range(50):
+        score(bundle, X_raw[i:i + 1])
+    timings = np.empty(calls)
+    for i in range(calls):
+        row = X_raw[i % len(X_raw):i % len(X_raw) + 1]
+        start = time.perf_counter()
+        score(bundle, row)
+        timings[i] = time.perf_counter() - start
+    start = time.perf_counter()
+    score(bundle, X_raw[:1000])
+    batch = time.perf_counter() - start
+    return float(np.percentile(timings, 50) * 1000), float(np.percentile(timings, 99) * 1000), batch * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Select the most accurate model within a /predict latency and memory budget.")
+    parser.add_argument('--p99-ms', type=float, required=True, help="p99 single-row scoring latency budget")
+    parser.add_argument('--memory-mb', type=float, default=float('inf'), help="Budget for the loaded model's memory")
+    parser.add_argument('--no-contributions', action='store_true',
+                        help="Measure scoring without feature contributions (CARDIO_CONTRIBUTIONS=off)")
+    parser.add_argument('--publish-dir', help="Publish the selected model to this directory (e.g. ../api)")
+    parser.add_argument('--output', default=REPORT_PATH, help="JSON report path")
+    args = parser.parse_args()
+
+    df = load_dataset(DATA_PATH)
+    X_train, X_test, y_train, y_test = split_data(df)
+    teacher = joblib.load(MODEL_PATH)
+    scaler = joblib.load(SCALER_PATH)
+    X_train_scaled = scaler.transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+    X_test_raw = np.asarray(X_test, dtype=np.float64)
+    teacher_proba = teacher.predict_proba(X_train_scaled)
+    teacher_labels = np.argmax(teacher.predict_proba(X_test_scaled), axis=1)
+
+    print("Building candidates...")
+    candidates = [("teacher", teacher, {"kind": "teacher"})]
+    for n_trees in SUBSET_TREES:
+        if n_trees < len(teacher.estimators_):
+            candidates.append((f"teacher first {n_trees} trees", tree_subset(teacher, n_trees),
+                               {"kind": "subset", "n_trees": n_trees}))
+    for n_estimators, max_depth in STUDENTS:
+        start = time.perf_counter()
+        student = soft_label_fit(RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth, random_state=42),
+                                 X_train_scaled, teacher_proba)
+        candidates.append((f"student {n_estimators}x depth {max_depth}", student,
+                           {"kind": "distilled", "n_estimators": n_estimators, "max_depth": max_depth,
+                            "fit_s": round(time.perf_counter() - start, 2)}))
+
+    explain = not args.no_contributions
+    # None rather than Infinity in the JSON outputs
+    memory_budget = args.memory_mb if np.isfinite(args.memory_mb) else None
+    rows = []
+    with tempfile.TemporaryDirectory(prefix='cardio_select_') as directory:
+        for i, (name, forest, info) in enumerate(candidates):
+            proba = forest.predict_proba(X_test_scaled)
+            bundle, file_bytes, private_bytes = serving_bundle(forest, scaler, directory, f"candidate{i}")
+            p50, p99, batch_ms = measure_latency(bundle, X_test_raw, explain)
+            memory_mb = (file_bytes + private_bytes) / 2**20
+            rows.append(dict(info, name=name, servable=True,
+                             accuracy=float(accuracy_score(y_test, forest.classes_.take(np.argmax(proba, axis=1)))),
+                             roc_auc=float(roc_auc_score(y_test, proba[:, 1])),
+                             agreement=float(np.mean(np.argmax(proba, axis=1) == teacher_labels)),
+                             p50_ms=p50, p99_ms=p99, batch_1k_ms=batch_ms, memory_mb=memory_mb,
+                             fits=p99 <= args.p99_ms and memory_mb <= args.memory_mb))
+
+    linear = soft_label_fit(LogisticRegression(max_iter=1000), X_train_scaled, teacher_proba)
+    proba = linear.predict_proba(X_test_scaled)
+    rows.append({"kind": "distilled", "name": "logistic (not servable)", "servable": False,
+                 "accuracy": float(accuracy_score(y_test, linear.classes_.take(np.argmax(proba, axis=1)))),
+                 "roc_auc": float(roc_auc_score(y_test, proba[:, 1])),
+                 "agreement": float(np.mean(np.argmax(proba, axis=1) == teacher_labels)),
+                 "p50_ms": None, "p99_ms": None, "batch_1k_ms": None, "memory_mb": None, "fits": False})
+
+    print(f"\nBudget: p99 <= {args.p99_ms} ms per /predict row, memory <= {args.memory_mb} MB "
+          f"(contributions {'on' if explain else 'off'})")
+    print(f"{'candidate':<28} {'accuracy':>8} {'ROC AUC':>7} {'agree':>6} {'p50 ms':>7} {'p99 ms':>7} "
+          f"{'1k rows ms':>10} {'memory MB':>9} {'fits':>5}")
+    for row in rows:
+        timing = (f"{row['p50_ms']:>7.3f} {row['p99_ms']:>7.3f} {row['batch_1k_ms']:>10.1f} {row['memory_mb']:>9.2f}"
+                  if row['servable'] else f"{'-':>7} {'-':>7} {'-':>10} {'-':>9}")
+        print(f"{row['name']:<28} {row['accuracy']:>8.4f} {row['roc_auc']:>7.4f} {row['agreement']:>6.3f} {timing} "
+              f"{'yes' if row['fits'] else 'no':>5}")
+
+    fitting = [i for i, row in enumerate(rows) if row['fits']]
+    report = {"p99_budget_ms": args.p99_ms, "memory_budget_mb": memory_budget, "contributions": explain,
+              "candidates": rows, "selected": None}
+    if not fitting:
+        print("\nNo candidate fits the budget.")
+    else:
+        best = max(fitting, key=lambda i: (rows[i]['accuracy'], -rows[i]['p99_ms']))
+        report["selected"] = rows[best]["name"]
+        print(f"\nSelected: {rows[best]['name']} (accuracy {rows[best]['accuracy']:.4f}, "
+              f"p99 {rows[best]['p99_ms']:.3f} ms, {rows[best]['memory_mb']:.2f} MB)")
+        if args.publish_dir:
+            # Recorded like an incremental update, so the next one grows the
+            # published forest rather than the one it replaced
+            _, forest, info = candidates[best]
+            manifest = load_manifest()
+            version = new_version()
+            parent = manifest["models"][-1]["version"] if manifest["models"] else None
+            lineage = dict(info, parent=parent, candidate=rows[best]["name"], p99_budget_ms=args.p99_ms,
+                           memory_budget_mb=memory_budget)
+            metadata = build_metadata(forest, X_test_scaled, y_test, len(X_train), forest.get_params(),
+                                      X_train=X_train)
+            metrics = {"accuracy": rows[best]["accuracy"], "n_train": len(X_train), "n_test": len(X_test)}
+            record_model(manifest, forest, scaler, version, metrics, lineage, metadata, args.publish_dir)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
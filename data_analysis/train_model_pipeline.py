@@ -1,51 +1,127 @@
-import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, classification_report
-import joblib
+from sklearn.inspection import permutation_importance
+from sklearn.metrics import accuracy_score, classification_report, f1_score, precision_score, recall_score, roc_auc_score
+import argparse
+import json
+import os
+import sys
+import time
+
+# The flat forest engine lives with the API so it can be deployed on its own
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+from forest_engine import compile_forest, dump_atomic, save_forest
+from compact_forest import save_compact_forest
+from model_info import META_VERSION
+from drift_monitor import build_reference
+from model_registry import hash_files
+from dataset_cache import load_dataset
 
 DATA_PATH = 'cardio_train.csv'
 MODEL_PATH = 'cardio_model_final.pkl'
 SCALER_PATH = 'scaler.pkl'
+FOREST_PATH = 'cardio_forest.joblib'
+COMPACT_FOREST_PATH = 'cardio_forest.bin'
+# Holdout metrics and importances served by /model-info (see api/model_info.py)
+MODEL_META_PATH = 'cardio_model_meta.json'
+PERMUTATION_REPEATS = 5
 
-def load_and_clean_data(filepath):
-    print("Loading data...")
-    df = pd.read_csv(filepath, sep=';')
-    
-    if 'id' in df.columns:
-        df = df.drop(columns=['id'])
-        
-    df['age_years'] = (df['age'] / 365.25).round(1)
-    df['bmi'] = df['weight'] / ((df['height'] / 100) ** 2)
-    
-    df = df[(df['ap_hi'] >= 50) & (df['ap_hi'] <= 250)]
-    df = df[(df['ap_lo'] >= 30) & (df['ap_lo'] <= 150)]
-    df = df[(df['bmi'] > 10) & (df['bmi'] < 60)]
-    
-    return df
+FEATURES = ['age_years', 'gender', 'height', 'weight', 'ap_hi', 'ap_lo', 'cholesterol', 'gluc', 'smoke', 'alco', 'active', 'bmi']
+TARGET = 'cardio'
 
-def train_model():
-    df = load_and_clean_data(DATA_PATH)
-    
-    features = ['age_years', 'gender', 'height', 'weight', 'ap_hi', 'ap_lo', 'cholesterol', 'gluc', 'smoke', 'alco', 'active', 'bmi']
-    target = 'cardio'
-    
-    X = df[features]
-    y = df[target]
+# Default forest; tune_model.py writes alternatives for --params
+RF_PARAMS = {'n_estimators': 100, 'max_depth': 10}
+
+def split_data(df):
+    X = df[FEATURES]
+    y = df[TARGET]
+    return train_test_split(X, y, test_size=0.2, random_state=42)
+
+def serving_units(X):
+    # Training rows as the API receives them: age in whole years
+    return X.assign(age_years=np.floor(X['age_years']))
+
+def build_metadata(rf, X_test_scaled, y_test, n_train, params, permutation_repeats=PERMUTATION_REPEATS, X_train=None):
+    # Everything /model-info reports, computed once on the holdout set, and
+    # the training feature histograms /drift compares live inputs with
+    proba = rf.predict_proba(X_test_scaled)
+    y_pred = rf.classes_.take(np.argmax(proba, axis=1))
+    metadata = {
+        "version": META_VERSION,
+        "trained_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "n_train": int(n_train),
+        "n_test": len(y_test),
+        "params": params,
+        "feature_names": FEATURES,
+        "metrics": {
+            "accuracy": float(accuracy_score(y_test, y_pred)),
+            "precision": float(precision_score(y_test, y_pred)),
+            "recall": float(recall_score(y_test, y_pred)),
+            "f1": float(f1_score(y_test, y_pred)),
+            "roc_auc": float(roc_auc_score(y_test, proba[:, 1])),
+        },
+        "feature_importances": rf.feature_importances_.tolist(),
+        "permutation_importances": None,
+        "drift_reference": build_reference(serving_units(X_train), FEATURES) if X_train is not None else None,
+    }
+    if permutation_repeats:
+        # Drop in holdout accuracy when one feature's values are shuffled
+        result = permutation_importance(rf, X_test_scaled, y_test, scoring='accuracy',
+                                        n_repeats=permutation_repeats, random_state=42, n_jobs=-1)
+        metadata["permutation_importances"] = {
+            "mean": result.importances_mean.tolist(),
+            "std": result.importances_std.tolist(),
+            "n_repeats": permutation_repeats,
+            "scoring": "accuracy",
+        }
+    return metadata
+
+def save_metadata(metadata, path, artifact_sets):
+    # artifact_sets: the file groups a server may load this model from; the
+    # registry only uses the sidecar if its model's hash is listed
+    metadata = dict(metadata, model_hashes=[hash_files(paths) for paths in artifact_sets])
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(tmp_path, path)
+    return metadata
+
+def save_artifacts(rf, scaler, metrics, metadata, model_version=None, lineage=None):
+    # The pickles and both compiled forests always describe the same model,
+    # so whichever one a server or build_risk_table.py loads, the sidecar
+    # matches it
+    print("Saving artifacts...")
+    # Every artifact is written to a temporary file and renamed into place
+    dump_atomic(rf, MODEL_PATH)
+    dump_atomic(scaler, SCALER_PATH)
+    compiled = compile_forest(rf, scaler)
+    save_forest(compiled, FOREST_PATH)
+    save_compact_forest(compiled, COMPACT_FOREST_PATH, feature_names=FEATURES, metrics=metrics,
+                        model_version=model_version, lineage=lineage)
+    save_metadata(metadata, MODEL_META_PATH, [[COMPACT_FOREST_PATH], [FOREST_PATH], [MODEL_PATH, SCALER_PATH]])
+    print(f"Model saved to {MODEL_PATH}")
+    print(f"Scaler saved to {SCALER_PATH}")
+    print(f"Compiled forest saved to {FOREST_PATH}")
+    print(f"Compact forest saved to {COMPACT_FOREST_PATH}")
+    print(f"Model metadata saved to {MODEL_META_PATH}")
+
+def train_model(params=None):
+    df = load_dataset(DATA_PATH)
     
     print(f"Dataset shape after cleaning: {df.shape}")
     
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    X_train, X_test, y_train, y_test = split_data(df)
     
     print("Scaling features...")
     scaler = StandardScaler()
     X_train_scaled = scaler.fit_transform(X_train)
     X_test_scaled = scaler.transform(X_test)
     
-    print("Training Random Forest...")
-    rf = RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42)
+    params = dict(RF_PARAMS, **(params or {}))
+    print(f"Training Random Forest {params}...")
+    rf = RandomForestClassifier(random_state=42, **params)
     rf.fit(X_train_scaled, y_train)
     
     y_pred = rf.predict(X_test_scaled)
@@ -54,11 +130,18 @@ def train_model():
     print("\nClassification Report:")
     print(classification_report(y_test, y_pred))
     
-    print("Saving artifacts...")
-    joblib.dump(rf, MODEL_PATH)
-    joblib.dump(scaler, SCALER_PATH)
-    print(f"Model saved to {MODEL_PATH}")
-    print(f"Scaler saved to {SCALER_PATH}")
+    metrics = {"accuracy": float(acc), "n_train": len(X_train), "n_test": len(X_test), "params": params}
+    print("Computing holdout metrics and permutation importances...")
+    metadata = build_metadata(rf, X_test_scaled, y_test, len(X_train), params, X_train=X_train)
+    save_artifacts(rf, scaler, metrics, metadata)
 
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="Train and save the cardio Random Forest.")
+    parser.add_argument('--params', help="JSON file of RandomForestClassifier parameters (e.g. best_params.json from tune_model.py)")
+    args = parser.parse_args()
+    
+    params = None
+    if args.params:
+        with open(args.params, 'r', encoding='utf-8') as f:
+            params = json.load(f)
+    train_model(params)
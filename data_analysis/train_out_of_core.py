@@ -0,0 +1,259 @@
+import argparse
+import json
+import math
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+
+try:
+    import resource
+except ImportError:
+    # Windows: peak memory is not reported
+    resource = None
+
+from train_model_pipeline import DATA_PATH, FEATURES, PERMUTATION_REPEATS, RF_PARAMS, TARGET, build_metadata, save_artifacts
+from dataset_cache import CLEANING_PARAMS, iter_clean_chunks
+
+# Out-of-core training for CSVs larger than memory (cardio_train.csv schema).
+# The CSV is streamed in chunks and cleaned per chunk with the same rules as
+# dataset_cache.py; nothing ever holds the whole dataset.
+#
+#   pass 1   StandardScaler.partial_fit on the training rows, plus bounded
+#            uniform samples of the holdout (for the metrics) and of the
+#            training rows (for the drift reference)
+#   pass 2+  bagging: each tree gets a Poisson(rate) bootstrap count per
+#            training row, drawn as the row streams past, and keeps only the
+#            rows it drew (scaled, as float32, the dtype sklearn's trees use
+#            anyway) with their counts as sample weights. A pass collects the
+#            samples of as many trees as fit the memory budget, then fits them
+#            one by one and drops the samples.
+#
+# rate = max_samples / training rows, so every tree sees about max_samples
+# draws however large the file; with rate 1 this is the usual bootstrap of
+# RandomForestClassifier. The result is an ordinary RandomForestClassifier
+# and is saved like train_model_pipeline.py's. The holdout is a hash of the
+# CSV row number, so it depends on neither the chunk size nor the passes.
+#
+#   python train_out_of_core.py registry.csv --memory-mb 1024
+#   python train_out_of_core.py registry.csv --chunk-rows 200000 --max-samples 1000000 --params best_params.json
+
+CHUNK_ROWS = 100000
+TEST_SIZE = 0.2
+MEMORY_MB = 1024
+MAX_SAMPLES = 500000
+HOLDOUT_ROWS = 100000
+REFERENCE_ROWS = 100000
+# A sampled row held for a tree: float32 features, int8 label, uint8 count
+SAMPLE_ROW_BYTES = len(FEATURES) * 4 + 2
+# The tree being fitted also needs its concatenated sample, sklearn's
+# float64 labels and weights and its sample index buffers
+FIT_ROW_BYTES = SAMPLE_ROW_BYTES + 40
+# A parsed and cleaned chunk, with pandas' parser buffers and copies
+CHUNK_ROW_BYTES = 1024
+# A row of the holdout and reference samples (float64, copied on update)
+KEPT_ROW_BYTES = 2 * len(FEATURES) * 8
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+def holdout_mask(row_ids, seed, test_size=TEST_SIZE):
+    # splitmix64 of the CSV row number, compared with test_size
+    z = row_ids.astype(np.uint64) + np.uint64(seed * 0x9E3779B97F4A7C15 % (1 << 64))
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z ^= z >> np.uint64(31)
+    return (z >> np.uint64(11)) < np.uint64(int(test_size * (1 << 53)))
+
+class RowSample:
+    # Uniform sample of at most `size` streamed rows: each row gets a random
+    # priority and the `size` lowest are kept
+    def __init__(self, size, rng):
+        self.size = size
+        self.rng = rng
+        self.priority = np.empty(0)
+        self.X = np.empty((0, len(FEATURES)))
+        self.y = np.empty(0, dtype=np.int8)
+
+    def add(self, X, y):
+        priority = np.concatenate([self.priority, self.rng.random(len(X))])
+        X = np.concatenate([self.X, X])
+        y = np.concatenate([self.y, y])
+        if len(priority) > self.size:
+            keep = np.sort(np.argpartition(priority, self.size)[:self.size])
+            priority, X, y = priority[keep], X[keep], y[keep]
+        self.priority, self.X, self.y = priority, X, y
+
+    def frame(self):
+        return pd.DataFrame(self.X, columns=FEATURES)
+
+def chunk_arrays(chunk, seed):
+    test = holdout_mask(chunk.index.to_numpy(), seed)
+    return chunk[FEATURES], chunk[TARGET].to_numpy(np.int8), test
+
+def statistics_pass(path, chunk_rows, params, seed, holdout_rows, reference_rows):
+    scaler = StandardScaler()
+    rng = np.random.default_rng(seed)
+    holdout = RowSample(holdout_rows, rng)
+    reference = RowSample(reference_rows, rng)
+    n_train = n_test = positives = 0
+    for chunk in iter_clean_chunks(path, chunk_rows, params):
+        X, y, test = chunk_arrays(chunk, seed)
+        if (~test).any():
+            scaler.partial_fit(X[~test])
+        holdout.add(X[test].to_numpy(np.float64), y[test])
+        reference.add(X[~test].to_numpy(np.float64), y[~test])
+        n_train += int((~test).sum())
+        n_test += int(test.sum())
+        positives += int(y[~test].sum())
+    return scaler, holdout, reference, n_train, n_test, positives
+
+def plan_passes(n_train, n_trees, max_samples, memory_mb, chunk_rows, kept_rows):
+    # Trees per pass that keep the data held at once within memory_mb
+    rate = min(max_samples, n_train) / n_train
+    # Expected distinct rows a tree keeps, with some headroom
+    tree_rows = 1.05 * n_train * (1 - math.exp(-rate))
+    budget = (memory_mb * (1 << 20) - tree_rows * FIT_ROW_BYTES - chunk_rows * CHUNK_ROW_BYTES
+              - kept_rows * KEPT_ROW_BYTES)
+    per_pass = int(budget // (tree_rows * SAMPLE_ROW_BYTES))
+    if per_pass < 1:
+        raise ValueError(f"--memory-mb {memory_mb} is too small for one tree of {tree_rows:,.0f} rows; "
+                         f"lower --max-samples or --chunk-rows")
+    return rate, int(tree_rows), min(per_pass, n_trees)
+
+def sample_pass(path, chunk_rows, params, seed, scaler, tree_ids, rate):
+    # Each tree's Poisson bootstrap of the training rows, as lists of chunks
+    samples = {t: [] for t in tree_ids}
+    for i, chunk in enumerate(iter_clean_chunks(path, chunk_rows, params)):
+        X, y, test = chunk_arrays(chunk, seed)
+        X = scaler.transform(X[~test]).astype(np.float32)
+        y = y[~test]
+        for t in tree_ids:
+            counts = np.random.default_rng([seed, t, i]).poisson(rate, len(X))
+            keep = counts > 0
+            samples[t].append((X[keep], y[keep], np.minimum(counts[keep], 255).astype(np.uint8)))
+    return samples
+
+def fit_tree(parts, tree_params, random_state):
+    X = np.concatenate([part[0] for part in parts])
+    y = np.concatenate([part[1] for part in parts])
+    weights = np.concatenate([part[2] for part in parts])
+    parts.clear()
+    tree = DecisionTreeClassifier(random_state=random_state, **tree_params)
+    return tree.fit(X, y, sample_weight=weights)
+
+def assemble_forest(trees, params, seed):
+    # A RandomForestClassifier over trees fitted elsewhere
+    rf = RandomForestClassifier(random_state=seed, **dict(params, n_estimators=len(trees)))
+    rf.estimators_ = trees
+    rf.estimator_ = DecisionTreeClassifier()
+    rf.classes_ = trees[0].classes_
+    rf.n_classes_ = len(rf.classes_)
+    rf.n_outputs_ = 1
+    rf.n_features_in_ = len(FEATURES)
+    return rf
+
+def tree_parameters(params, seed):
+    forest = RandomForestClassifier(random_state=seed, **params)
+    if forest.class_weight is not None:
+        raise ValueError("class_weight is not supported out of core")
+    tree_keys = DecisionTreeClassifier().get_params().keys() - {'random_state', 'class_weight'}
+    return {key: value for key, value in forest.get_params().items() if key in tree_keys}
+
+def train_out_of_core(path, params=None, chunk_rows=CHUNK_ROWS, memory_mb=MEMORY_MB, max_samples=MAX_SAMPLES,
+                      holdout_rows=HOLDOUT_ROWS, reference_rows=REFERENCE_ROWS, permutation_repeats=PERMUTATION_REPEATS,
+                      seed=42, cleaning=CLEANING_PARAMS):
+    params = dict(RF_PARAMS, **(params or {}))
+    tree_params = tree_parameters(params, seed)
+    n_trees = params['n_estimators']
+    baseline_mb = peak_rss_mb()
+    report = {"chunk_rows": chunk_rows, "memory_mb": memory_mb, "max_samples": max_samples,
+              "baseline_rss_mb": baseline_mb, "phases": []}
+
+    def phase(name, seconds, **extra):
+        report["phases"].append(dict(extra, name=name, seconds=round(seconds, 3), peak_rss_mb=peak_rss_mb()))
+        peak = f", peak RSS {report['phases'][-1]['peak_rss_mb']:.0f} MB" if resource is not None else ""
+        print(f"  {name}: {seconds:.2f} s{peak}")
+
+    print(f"Streaming {path} in chunks of {chunk_rows:,} rows...")
+    start = time.perf_counter()
+    scaler, holdout, reference, n_train, n_test, positives = statistics_pass(
+        path, chunk_rows, cleaning, seed, holdout_rows, reference_rows)
+    phase("statistics", time.perf_counter() - start, n_train=n_train, n_test=n_test)
+    print(f"  {n_train:,} training rows ({positives / n_train:.1%} positive), {n_test:,} holdout rows "
+          f"({len(holdout.y):,} kept for evaluation)")
+
+    rate, tree_rows, per_pass = plan_passes(n_train, n_trees, max_samples, memory_mb, chunk_rows,
+                                               len(holdout.y) + len(reference.y))
+    n_passes = -(-n_trees // per_pass)
+    print(f"Training {n_trees} trees on ~{tree_rows:,} distinct rows each (bootstrap rate {rate:.3f}), "
+          f"{per_pass} trees per pass, {n_passes} passes, {tree_params}")
+    seeds = np.random.default_rng(seed).integers(np.iinfo(np.int32).max, size=n_trees)
+    trees = []
+    for first in range(0, n_trees, per_pass):
+        tree_ids = range(first, min(first + per_pass, n_trees))
+        start = time.perf_counter()
+        samples = sample_pass(path, chunk_rows, cleaning, seed, scaler, tree_ids, rate)
+        held_mb = sum(array.nbytes for parts in samples.values() for part in parts for array in part) / (1 << 20)
+        phase(f"sample trees {tree_ids.start}-{tree_ids.stop - 1}", time.perf_counter() - start, held_mb=round(held_mb, 1))
+        start = time.perf_counter()
+        for t in tree_ids:
+            trees.append(fit_tree(samples.pop(t), tree_params, int(seeds[t])))
+        phase(f"fit trees {tree_ids.start}-{tree_ids.stop - 1}", time.perf_counter() - start)
+        del samples
+
+    rf = assemble_forest(trees, params, seed)
+    X_test_scaled = scaler.transform(holdout.frame())
+    acc = float(accuracy_score(holdout.y, rf.predict(X_test_scaled)))
+    print(f"Model Accuracy: {acc:.4f} on {len(holdout.y):,} holdout rows")
+    start = time.perf_counter()
+    print("Computing holdout metrics and permutation importances...")
+    metadata = build_metadata(rf, X_test_scaled, holdout.y, n_train, params,
+                              permutation_repeats=permutation_repeats, X_train=reference.frame())
+    phase("metadata", time.perf_counter() - start)
+    report.update(n_train=n_train, n_test=n_test, n_passes=n_passes, trees_per_pass=per_pass,
+                  bootstrap_rate=rate, peak_rss_mb=peak_rss_mb())
+    metadata["out_of_core"] = report
+    metrics = {"accuracy": acc, "n_train": n_train, "n_test": len(holdout.y), "params": params}
+    save_artifacts(rf, scaler, metrics, metadata)
+    if resource is not None:
+        print(f"Peak RSS {report['peak_rss_mb']:.0f} MB ({report['peak_rss_mb'] - baseline_mb:.0f} MB above the "
+              f"{baseline_mb:.0f} MB at start; budget {memory_mb} MB)")
+    return rf, scaler, report
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the cardio Random Forest on a CSV larger than memory.")
+    parser.add_argument('data', nargs='?', default=DATA_PATH, help="Semicolon CSV in the cardio_train.csv schema")
+    parser.add_argument('--params', help="JSON file of RandomForestClassifier parameters (e.g. best_params.json)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="CSV rows parsed at a time")
+    parser.add_argument('--memory-mb', type=int, default=MEMORY_MB, help="Budget for the data held at once: bootstrap samples, the current chunk and the holdout")
+    parser.add_argument('--max-samples', type=int, default=MAX_SAMPLES, help="Bootstrap draws per tree")
+    parser.add_argument('--holdout-rows', type=int, default=HOLDOUT_ROWS, help="Holdout rows kept for the metrics")
+    parser.add_argument('--reference-rows', type=int, default=REFERENCE_ROWS,
+                        help="Training rows kept for the drift reference")
+    parser.add_argument('--permutation-repeats', type=int, default=PERMUTATION_REPEATS)
+    parser.add_argument('--report', help="Also write the timing and memory report to a JSON file")
+    args = parser.parse_args()
+
+    params = None
+    if args.params:
+        with open(args.params, 'r', encoding='utf-8') as f:
+            params = json.load(f)
+    _, _, report = train_out_of_core(args.data, params, chunk_rows=args.chunk_rows, memory_mb=args.memory_mb,
+                                     max_samples=args.max_samples, holdout_rows=args.holdout_rows,
+                                     reference_rows=args.reference_rows, permutation_repeats=args.permutation_repeats)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+
+from train_model_pipeline import DATA_PATH, load_dataset, split_data
+
+# Randomized successive-halving search for the Random Forest.
+# Candidates are sampled from a configurable space and evaluated with k-fold
+# CV on growing subsets of the training split; after every round only the
+# best 1/factor of the candidates go on to the next, larger, subset. Every
+# (candidate, fold, subset size) result is cached on disk as soon as its fit
+# finishes, under a key made from the data hash and the parameters, so an
+# interrupted or extended search only fits what it has not fitted before.
+#
+#   python tune_model.py --n-candidates 27 --n-jobs -1
+#   python train_model_pipeline.py --params best_params.json
+
+CACHE_DIR = 'tuning_cache'
+BEST_PARAMS_PATH = 'best_params.json'
+REPORT_PATH = 'tuning_report.json'
+
+# Each key maps to the list of values to sample from
+DEFAULT_SPACE = {
+    'n_estimators': [50, 100, 200, 300],
+    'max_depth': [None, 8, 10, 12, 16, 20],
+    'min_samples_split': [2, 5, 10, 20],
+    'min_samples_leaf': [1, 2, 4, 8],
+    'max_features': ['sqrt', 0.5, None],
+}
+
+def data_fingerprint(X, y):
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(X).tobytes())
+    digest.update(np.ascontiguousarray(y).tobytes())
+    return digest.hexdigest()
+
+def sample_candidates(space, n_candidates, seed):
+    # Distinct parameter sets, drawn without replacement from the grid. The
+    # draw order only depends on the seed, so asking for more candidates
+    # extends an earlier search instead of replacing it.
+    rng = np.random.default_rng(seed)
+    keys = sorted(space)
+    n_total = math.prod(len(space[key]) for key in keys)
+    picks = rng.permutation(n_total)[:n_candidates]
+    candidates = []
+    for pick in picks.tolist():
+        params = {}
+        for key in keys:
+            pick, i = divmod(pick, len(space[key]))
+            params[key] = space[key][i]
+        candidates.append(params)
+    return candidates
+
+class FoldCache:
+    def __init__(self, cache_dir, fingerprint):
+        self.directory = os.path.join(cache_dir, fingerprint[:16])
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        name = hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+        return os.path.join(self.directory, name + '.json')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key, result):
+        # Write then rename, so a killed search never leaves a half-written entry
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(result, key=key), f)
+        os.replace(tmp_path, path)
+
+def fit_fold(params, X, y, train_idx, val_idx, scoring, seed):
+    start = time.perf_counter()
+    model = RandomForestClassifier(random_state=seed, n_jobs=1, **params)
+    model.fit(X[train_idx], y[train_idx])
+    fit_time = time.perf_counter() - start
+    if scoring == 'roc_auc':
+        score = roc_auc_score(y[val_idx], model.predict_proba(X[val_idx])[:, 1])
+    else:
+        score = accuracy_score(y[val_idx], model.predict(X[val_idx]))
+    return {"score": float(score), "fit_time": fit_time, "wall_time": time.perf_counter() - start}
+
+def fit_and_cache(cache, key, *args):
+    # Cached by the worker as soon as the fit finishes, so an interrupted
+    # round keeps every fold it completed
+    result = fit_fold(*args)
+    cache.put(key, result)
+    return result
+
+def successive_halving(X, y, candidates, cache, factor=3, min_resources=2000, cv=3, scoring='accuracy', n_jobs=-1, seed=42):
+    folds = list(StratifiedKFold(n_splits=cv, shuffle=True, random_state=seed).split(X, y))
+    # A fixed permutation of each fold's training rows: the first n of it is
+    # the subset used at resource level n, so subsets (and cache keys) are stable
+    rng = np.random.default_rng(seed)
+    folds = [(rng.permutation(train_idx), val_idx) for train_idx, val_idx in folds]
+    max_resources = min(len(train_idx) for train_idx, _ in folds)
+
+    history = []
+    candidate_ids = list(range(len(candidates)))
+    n_resources = min(min_resources, max_resources)
+    round_index = 0
+    while True:
+        tasks, keys, results = [], [], {}
+        for cid in candidate_ids:
+            for fold, (train_idx, val_idx) in enumerate(folds):
+                key = {"params": candidates[cid], "fold": fold, "cv": cv, "n_resources": n_resources, "scoring": scoring, "seed": seed}
+                cached = cache.get(key)
+                if cached is not None:
+                    results[(cid, fold)] = dict(cached, cached=True)
+                else:
+                    keys.append((cid, fold, key))
+                    tasks.append(delayed(fit_and_cache)(cache, key, candidates[cid], X, y, train_idx[:n_resources], val_idx, scoring, seed))
+
+        print(f"\nRound {round_index}: {len(candidate_ids)} candidates x {cv} folds on {n_resources:,} rows "
+              f"({len(tasks)} fits, {len(results)} cached)")
+        start = time.perf_counter()
+        for (cid, fold, _), result in zip(keys, Parallel(n_jobs=n_jobs)(tasks)):
+            results[(cid, fold)] = dict(result, cached=False)
+        print(f"Round {round_index} took {time.perf_counter() - start:.1f} s")
+
+        scored = []
+        for cid in candidate_ids:
+            fold_results = [results[(cid, fold)] for fold in range(cv)]
+            scored.append({
+                "round": round_index,
+                "candidate": cid,
+                "params": candidates[cid],
+                "n_resources": n_resources,
+                "mean_score": float(np.mean([r["score"] for r in fold_results])),
+                "std_score": float(np.std([r["score"] for r in fold_results])),
+                # Time the candidate cost when it was (first) computed
+                "fit_time": float(sum(r["fit_time"] for r in fold_results)),
+                "wall_time": float(sum(r["wall_time"] for r in fold_results)),
+                "cached_folds": sum(r["cached"] for r in fold_results),
+            })
+        scored.sort(key=lambda entry: entry["mean_score"], reverse=True)
+        history.extend(scored)
+        print_round(scored)
+
+        if n_resources >= max_resources:
+            return scored[0], history
+        keep = max(1, math.ceil(len(candidate_ids) / factor))
+        candidate_ids = [entry["candidate"] for entry in scored[:keep]]
+        # A single survivor goes straight to the full training folds
+        n_resources = max_resources if keep == 1 else min(n_resources * factor, max_resources)
+        round_index += 1
+
+def print_round(scored):
+    print(f"{'cand':>4} {'score':>8} {'std':>7} {'wall s':>8} {'cached':>6}  params")
+    for entry in scored:
+        print(f"{entry['candidate']:>4} {entry['mean_score']:>8.4f} {entry['std_score']:>7.4f} "
+              f"{entry['wall_time']:>8.2f} {entry['cached_folds']:>6}  {json.dumps(entry['params'])}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Successive-halving random search for the Random Forest.")
+    parser.add_argument('--space', help="JSON file mapping parameter names to lists of values")
+    parser.add_argument('--n-candidates', type=int, default=27)
+    parser.add_argument('--factor', type=int, default=3, help="Keep 1/factor of the candidates each round")
+    parser.add_argument('--min-resources', type=int, default=2000, help="Training rows per fold in the first round")
+    parser.add_argument('--cv', type=int, default=3)
+    parser.add_argument('--scoring', choices=['accuracy', 'roc_auc'], default='accuracy')
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--output', default=BEST_PARAMS_PATH)
+    args = parser.parse_args()
+
+    space = DEFAULT_SPACE
+    if args.space:
+        with open(args.space, 'r', encoding='utf-8') as f:
+            space = json.load(f)
+
+    df = load_dataset(DATA_PATH)
+    # Tune on the training split only; the holdout stays untouched.
+    # Trees are insensitive to feature scaling, so the raw features are used.
+    X_train, _, y_train, _ = split_data(df)
+    X = np.ascontiguousarray(X_train.to_numpy(dtype=np.float64))
+    y = y_train.to_numpy()
+
+    fingerprint = data_fingerprint(X, y)
+    cache = FoldCache(args.cache_dir, fingerprint)
+    candidates = sample_candidates(space, args.n_candidates, args.seed)
+    print(f"Data fingerprint {fingerprint[:16]}, {len(candidates)} candidates, cache in {cache.directory}")
+
+    start = time.perf_counter()
+    best, history = successive_halving(
+        X, y, candidates, cache,
+        factor=args.factor, min_resources=args.min_resources, cv=args.cv,
+        scoring=args.scoring, n_jobs=args.n_jobs, seed=args.seed,
+    )
+    total = time.perf_counter() - start
+
+    # Where the training budget went, per candidate over all rounds
+    spent = {}
+    for entry in history:
+        spent[entry["candidate"]] = spent.get(entry["candidate"], 0.0) + entry["wall_time"]
+    print("\n--- Wall time per candidate (all rounds) ---")
+    for cid, seconds in sorted(spent.items(), key=lambda item: item[1], reverse=True):
+        print(f"{cid:>4} {seconds:>8.2f} s  {json.dumps(candidates[cid])}")
+
+    print(f"\nBest ({args.scoring} {best['mean_score']:.4f}): {json.dumps(best['params'])}")
+    print(f"Search took {total:.1f} s")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(best["params"], f, indent=2)
+    with open(REPORT_PATH, 'w', encoding='utf-8') as f:
+        json.dump({"fingerprint": fingerprint, "best": best, "history": history, "wall_time": total}, f, indent=2)
+    print(f"Best parameters saved to {args.output}, full report to {REPORT_PATH}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import os
+import time
+import numpy as np
+import joblib
+
+from train_model_pipeline import DATA_PATH, FEATURES, MODEL_PATH, SCALER_PATH, load_dataset, split_data
+from forest_engine import FlatForest, compile_forest, load_forest_arrays, save_forest
+from compact_forest import LEAF_ENCODINGS, load_compact_forest_arrays, save_compact_forest
+
+# Size, load time and bit-level parity of the compact forest format against
+# the pickled RandomForestClassifier, on the holdout split. Run after
+# train_model_pipeline.py.
+
+REPEATS = 10
+JOBLIB_PATH = 'verify_forest.joblib'
+
+def time_load(load, repeats=REPEATS):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        load()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+def main():
+    df = load_dataset(DATA_PATH)
+    _, X_test, _, _ = split_data(df)
+
+    rf = joblib.load(MODEL_PATH)
+    scaler = joblib.load(SCALER_PATH)
+    X_test_scaled = scaler.transform(X_test)
+    expected = rf.predict_proba(X_test_scaled)
+    expected_labels = rf.predict(X_test_scaled)
+
+    compiled = compile_forest(rf, scaler)
+    save_forest(compiled, JOBLIB_PATH)
+    rows = [
+        ("pickle (sklearn)", MODEL_PATH, lambda: joblib.load(MODEL_PATH), None),
+        ("joblib arrays", JOBLIB_PATH, lambda: FlatForest(load_forest_arrays(JOBLIB_PATH, mmap_mode='r')), None),
+    ]
+    for encoding in LEAF_ENCODINGS:
+        path = f'verify_forest_{encoding}.bin'
+        save_compact_forest(compiled, path, feature_names=FEATURES, leaf_encoding=encoding)
+        rows.append((f"compact ({encoding})", path, lambda path=path: FlatForest(load_compact_forest_arrays(path)), encoding))
+
+    print(f"\nHoldout rows: {len(X_test_scaled)}")
+    print(f"{'artifact':<20} {'size KB':>9} {'load ms':>9} {'bit-identical':>14} {'max abs diff':>13} {'labels':>7}")
+    all_exact = True
+    for name, path, load, encoding in rows:
+        load_time = time_load(load)
+        model = load()
+        proba = model.predict_proba(X_test_scaled)
+        # Compare the raw float64 bits, not just the values
+        identical = proba.shape == expected.shape and np.array_equal(proba.view(np.uint64), expected.view(np.uint64))
+        max_diff = float(np.max(np.abs(proba - expected)))
+        labels = bool(np.array_equal(model.predict(X_test_scaled), expected_labels))
+        if encoding == 'palette':
+            all_exact = all_exact and identical and labels
+        print(f"{name:<20} {os.path.getsize(path) / 1024:>9.1f} {load_time * 1000:>9.2f} {str(identical):>14} {max_diff:>13.3e} {str(labels):>7}")
+
+    for _, path, _, encoding in rows:
+        if path != MODEL_PATH:
+            os.remove(path)
+
+    if not all_exact:
+        raise SystemExit("Compact forest (palette) does not match the pickled model bit for bit.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import time
+import numpy as np
+import joblib
+
+from train_model_pipeline import DATA_PATH, FEATURES, MODEL_PATH, SCALER_PATH, load_dataset, split_data
+from forest_engine import FlatForest
+
+# Checks FlatForest.predict_contributions against a straightforward Saabas
+# implementation over sklearn's decision paths, checks that the contributions
+# add up to the probabilities, and compares its latency with predict_proba.
+# Run after train_model_pipeline.py.
+
+BATCH_SIZES = [1, 100, 10000]
+REPEATS = 20
+REFERENCE_ROWS = 500
+
+def reference_contributions(rf, X):
+    # Per tree, walk each row's decision path and credit every step's change
+    # in the positive-class value to the feature split on
+    X = np.asarray(X, dtype=np.float32)
+    contributions = np.zeros(X.shape)
+    for estimator in rf.estimators_:
+        tree = estimator.tree_
+        value = tree.value[:, 0, :] / tree.value[:, 0, :].sum(axis=1, keepdims=True)
+        paths = estimator.decision_path(X)
+        for i in range(X.shape[0]):
+            nodes = paths.indices[paths.indptr[i]:paths.indptr[i + 1]]
+            for parent, child in zip(nodes[:-1], nodes[1:]):
+                contributions[i, tree.feature[parent]] += value[child, -1] - value[parent, -1]
+    return contributions / len(rf.estimators_)
+
+def time_call(fn, X, repeats=REPEATS):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+def main():
+    df = load_dataset(DATA_PATH)
+    _, X_test, _, _ = split_data(df)
+
+    rf = joblib.load(MODEL_PATH)
+    scaler = joblib.load(SCALER_PATH)
+    X_test_scaled = scaler.transform(X_test)
+    forest = FlatForest.from_sklearn(rf)
+
+    proba, contributions = forest.predict_contributions(X_test_scaled)
+    proba_identical = np.array_equal(proba, rf.predict_proba(X_test_scaled))
+    additivity = float(np.max(np.abs(forest.expected_value + contributions.sum(axis=1) - proba[:, -1])))
+    expected = reference_contributions(rf, X_test_scaled[:REFERENCE_ROWS])
+    max_diff = float(np.max(np.abs(contributions[:REFERENCE_ROWS] - expected)))
+    print(f"\nHoldout rows: {len(X_test_scaled)}")
+    print(f"predict_proba identical: {proba_identical}")
+    print(f"max |base + sum(contributions) - probability|: {additivity:.3e}")
+    print(f"max diff against decision-path reference ({REFERENCE_ROWS} rows): {max_diff:.3e}")
+
+    mean_abs = np.abs(contributions).mean(axis=0)
+    print("\nMean |contribution| per feature:")
+    for j in np.argsort(-mean_abs):
+        print(f"  {FEATURES[j]:<12} {mean_abs[j]:.4f}")
+
+    print("\n--- Latency (median of %d runs) ---" % REPEATS)
+    print(f"{'batch':>8} {'proba ms':>10} {'+contrib ms':>12} {'overhead':>9}")
+    rng = np.random.default_rng(42)
+    for size in BATCH_SIZES:
+        rows = rng.choice(len(X_test_scaled), size=size, replace=size > len(X_test_scaled))
+        X = X_test_scaled[rows]
+        repeats = REPEATS if size < 10000 else 5
+        plain = time_call(forest.predict_proba, X, repeats)
+        explained = time_call(forest.predict_contributions, X, repeats)
+        print(f"{size:>8} {plain * 1000:>10.3f} {explained * 1000:>12.3f} {explained / plain - 1:>8.0%}")
+
+    if not (proba_identical and additivity < 1e-9 and max_diff < 1e-9):
+        raise SystemExit("Contributions do not match the reference.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import time
+import numpy as np
+import joblib
+
+from train_model_pipeline import DATA_PATH, MODEL_PATH, SCALER_PATH, load_dataset, split_data
+from forest_engine import FlatForest
+
+BATCH_SIZES = [1, 100, 10000]
+REPEATS = 20
+
+def time_call(fn, X, repeats=REPEATS):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+def main():
+    df = load_dataset(DATA_PATH)
+    _, X_test, _, _ = split_data(df)
+    
+    rf = joblib.load(MODEL_PATH)
+    scaler = joblib.load(SCALER_PATH)
+    X_test_scaled = scaler.transform(X_test)
+    
+    print("Compiling forest...")
+    forest = FlatForest.from_sklearn(rf)
+    print(f"{forest.n_estimators} trees, {forest.n_nodes} nodes, max depth {forest.max_depth}")
+    
+    # Parity check on the full holdout
+    expected = rf.predict_proba(X_test_scaled)
+    actual = forest.predict_proba(X_test_scaled)
+    identical = np.array_equal(expected, actual)
+    max_diff = float(np.max(np.abs(expected - actual)))
+    labels_match = np.array_equal(rf.predict(X_test_scaled), forest.predict(X_test_scaled))
+    print(f"\nHoldout rows: {len(X_test_scaled)}")
+    print(f"predict_proba identical: {identical} (max abs diff {max_diff:.3e})")
+    print(f"predict labels identical: {labels_match}")
+    
+    # Latency comparison
+    print("\n--- Latency (median of %d runs) ---" % REPEATS)
+    print(f"{'batch':>8} {'sklearn ms':>12} {'flat ms':>10} {'speedup':>8}")
+    rng = np.random.default_rng(42)
+    for size in BATCH_SIZES:
+        rows = rng.choice(len(X_test_scaled), size=size, replace=size > len(X_test_scaled))
+        X = X_test_scaled[rows]
+        repeats = REPEATS if size < 10000 else 5
+        sk = time_call(rf.predict_proba, X, repeats)
+        flat = time_call(forest.predict_proba, X, repeats)
+        print(f"{size:>8} {sk * 1000:>12.3f} {flat * 1000:>10.3f} {sk / flat:>7.1f}x")
+    
+    if not (identical and labels_match):
+        raise SystemExit("Flat forest does not match sklearn predict_proba.")
+
+if __name__ == "__main__":
+    main()
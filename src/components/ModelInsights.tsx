@@ -8,7 +8,7 @@ import { Loader2, BrainCircuit } from "lucide-react"
 
 interface ModelInfo {
     model_type: string
-    accuracy: number
+    accuracy: number | null
     feature_importances: { feature: string; importance: number }[]
 }
 
@@ -60,7 +60,7 @@ export function ModelInsights() {
                 <div className="space-y-6">
                     <div className="flex items-center justify-between p-4 bg-white/50 dark:bg-white/5 rounded-lg border backdrop-blur-sm">
                         <span className="text-sm font-medium">Model Accuracy</span>
-                        <span className="text-2xl font-bold text-blue-600">{(info.accuracy * 100).toFixed(1)}%</span>
+                        <span className="text-2xl font-bold text-blue-600">{info.accuracy == null ? "n/a" : `${(info.accuracy * 100).toFixed(1)}%`}</span>
                     </div>
 
                     <div className="h-[350px] w-full">